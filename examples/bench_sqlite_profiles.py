@@ -0,0 +1,82 @@
+"""
+Write and read throughput of each SQLite connection profile.
+
+Usage:
+    python examples/bench_sqlite_profiles.py [--entries 2000] [--threads 4]
+
+Each profile gets a fresh database in a temporary directory. Writes are
+single-entry create() calls (one transaction each, so the sync level
+dominates); reads are list() pages and get() calls, run from several
+threads at once to show contention.
+"""
+import argparse
+import random
+import tempfile
+import threading
+import time
+
+from workpad.models import Entry, EntryFilter, EntryType
+from workpad.storage.sqlite_storage import SQLITE_PROFILES, SQLiteStorage
+
+
+def run_threads(threads: int, work) -> float:
+    workers = [threading.Thread(target=work, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return time.perf_counter() - start
+
+
+def bench(profile: str, entries: int, threads: int) -> dict:
+    with tempfile.TemporaryDirectory() as data_path:
+        storage = SQLiteStorage(data_path, profile=profile)
+        storage.initialize()
+        types = list(EntryType)
+        per_thread = entries // threads
+
+        def write(n):
+            for i in range(per_thread):
+                storage.create(Entry(
+                    type=types[i % len(types)],
+                    content=f"Writer {n} entry {i} " + "lorem ipsum " * 20,
+                    tags=[f"tag{i % 10}"]
+                ))
+
+        write_seconds = run_threads(threads, write)
+        ids = [s.id for s in storage.list_summaries(EntryFilter(limit=1000))]
+
+        def read(n):
+            rng = random.Random(n)
+            for i in range(per_thread):
+                if i % 2:
+                    storage.get(rng.choice(ids))
+                else:
+                    storage.list(EntryFilter(type=rng.choice(types), limit=20))
+
+        read_seconds = run_threads(threads, read)
+        storage.engine.dispose()
+        done = per_thread * threads
+        return {"writes/s": done / write_seconds, "reads/s": done / read_seconds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{'profile':<10} {'writes/s':>10} {'reads/s':>10}")
+    for profile in SQLITE_PROFILES:
+        try:
+            result = bench(profile, args.entries, args.threads)
+        except Exception as e:
+            # The "none" profile has no busy_timeout and may fail under contention
+            print(f"{profile:<10} failed: {e}")
+            continue
+        print(f"{profile:<10} {result['writes/s']:>10.0f} {result['reads/s']:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -22,23 +22,8 @@ def storage(test_data_path):
 @pytest.fixture
 def app(storage):
     from workpad.api import create_app
-    from workpad.config import Settings
-    
-    class TestSettings(Settings):
-        DATA_PATH = str(storage.data_path)
-        
-    app = create_app()
-    # Mock/Override storage in the service?
-    # Our routes.py instantiates WorkpadService(JSONStorage(settings.DATA_PATH))
-    # So we need to ensure the app uses the test data path.
-    # The routes.py `get_service` function imports `settings` from `..config`.
-    # We need to patch that settings object or set environment variable.
-    
-    # Patch the global settings object in config module
-    import workpad.config
-    workpad.config.settings.DATA_PATH = str(storage.data_path)
-    
-    return app
+    # Serve the test storage instead of building one from settings
+    return create_app(storage=storage)
 
 @pytest.fixture
 def client(app):
@@ -0,0 +1,77 @@
+"""Scenarios shared by the storage backend tests."""
+from datetime import datetime, timezone
+from workpad.enums import HistogramGroup, Interval
+from workpad.models import ContextItem, Entry, EntryFilter, EntryType
+
+def build_graph(storage):
+    """a - b - c - d chain (stored in mixed directions), e - f, g alone, d -> a missing id."""
+    ids = {}
+    for name in "abcdefg":
+        ids[name] = storage.create(Entry(type=EntryType.note, content=name)).id
+    for a, b in [("a", "b"), ("c", "b"), ("c", "d"), ("e", "f")]:
+        storage.add_relation(ids[a], ids[b])
+    storage.add_relation(ids["d"], "ghost")
+    return ids
+
+def check_graph(storage, ids):
+    names = {v: k for k, v in ids.items()}
+    hops = lambda root, depth: {names[eid]: d for eid, d in storage.neighborhood(ids[root], depth).items()}
+    assert hops("a", 2) == {"a": 0, "b": 1, "c": 2}
+    assert hops("b", 1) == {"b": 0, "a": 1, "c": 1}
+    assert hops("d", 0) == {"d": 0}
+    assert hops("g", 3) == {"g": 0}
+    assert storage.neighborhood("missing", 2) == {}
+    assert storage.neighbors([ids["b"], ids["d"], "missing"]) == {ids["b"]: {ids["a"], ids["c"]}, ids["d"]: {ids["c"]}}
+
+    path = storage.shortest_path(ids["a"], ids["d"], 10)
+    assert [names[eid] for eid in path] == ["a", "b", "c", "d"]
+    assert storage.shortest_path(ids["d"], ids["a"], 3) == path[::-1]
+    assert storage.shortest_path(ids["a"], ids["d"], 2) is None
+    assert storage.shortest_path(ids["a"], ids["e"], 10) is None
+    assert storage.shortest_path(ids["a"], ids["a"], 0) == [ids["a"]]
+    assert storage.shortest_path("missing", "missing", 1) is None
+
+    assert storage.connected_components() == [
+        sorted(ids[n] for n in "abcd"),
+        sorted(ids[n] for n in "ef"),
+    ]
+
+    storage.delete(ids["c"])
+    assert hops("a", 5) == {"a": 0, "b": 1}
+    assert storage.shortest_path(ids["a"], ids["d"], 10) is None
+    storage.remove_relation(ids["e"], ids["f"])
+    assert storage.connected_components() == [sorted(ids[n] for n in "ab")]
+
+HISTOGRAM_TIMES = ["2024-01-01T00:30", "2024-01-01T01:15", "2024-01-01T01:45", "2024-01-03T10:00",
+                   "2024-01-08T00:00", "2024-02-29T23:59:59"]
+
+def check_histogram(storage):
+    """Six entries, alternating note/task, bucketed by each interval."""
+    storage.create_many([
+        Entry(type=EntryType.note if i % 2 == 0 else EntryType.task, content=f"Entry {i}",
+              timestamp=datetime.fromisoformat(t).replace(tzinfo=timezone.utc))
+        for i, t in enumerate(HISTOGRAM_TIMES)
+    ])
+    counts = lambda interval, **kw: [(b.start.isoformat()[:13], b.count) for b in storage.histogram(interval, **kw)]
+    assert counts(Interval.hour) == [("2024-01-01T00", 1), ("2024-01-01T01", 2), ("2024-01-03T10", 1),
+                                     ("2024-01-08T00", 1), ("2024-02-29T23", 1)]
+    assert counts(Interval.day) == [("2024-01-01T00", 3), ("2024-01-03T00", 1), ("2024-01-08T00", 1),
+                                    ("2024-02-29T00", 1)]
+    assert counts(Interval.week) == [("2024-01-01T00", 4), ("2024-01-08T00", 1), ("2024-02-26T00", 1)]
+    assert counts(Interval.month) == [("2024-01-01T00", 5), ("2024-02-01T00", 1)]
+    assert counts(Interval.month, filters=EntryFilter(type=EntryType.task, limit=1)) == [("2024-01-01T00", 2), ("2024-02-01T00", 1)]
+
+    grouped = storage.histogram(Interval.week, group_by=HistogramGroup.type)
+    assert [b.groups for b in grouped] == [{"note": 2, "task": 2}, {"note": 1}, {"task": 1}]
+    assert storage.histogram(Interval.day, EntryFilter(search="nothing")) == []
+
+def check_get_many(storage):
+    entries = [storage.create(Entry(type=EntryType.note, content=f"Entry {i}")) for i in range(5)]
+    storage.add_context(entries[3].id, ContextItem(type="note", source="test", content="Attached"))
+    ids = [entries[3].id, "missing", entries[0].id, entries[3].id, entries[4].id]
+    found = storage.get_many(ids)
+    assert [e.id for e in found] == [entries[3].id, entries[0].id, entries[4].id]
+    assert found[0].context_items[0].content == "Attached"
+    # Any iterable, read once
+    assert [e.id for e in storage.get_many(iter(ids))] == [e.id for e in found]
+    assert storage.get_many([]) == []
@@ -98,3 +98,148 @@ def test_stats(client):
     response = client.get('/api/v1/stats')
     assert response.status_code == 200
     assert response.json['total_entries'] >= 1
+    client.post('/api/v1/entries', json={"type": "task", "content": "E2", "tags": ["x"]})
+    response = client.get('/api/v1/stats?type=task')
+    assert response.json['total_entries'] == 1
+    assert response.json['by_tag'] == {"x": 1}
+
+def test_list_entries_fields(client):
+    client.post('/api/v1/entries', json={
+        "type": "note", "content": "E1", "tags": ["a"],
+        "context_items": [{"type": "note", "source": "api", "content": "Payload"}]
+    })
+    response = client.get('/api/v1/entries?fields=id,type,tags')
+    assert response.status_code == 200
+    assert set(response.json[0]) == {"id", "type", "tags"}
+
+    # Non-summary fields load whole entries, then project
+    response = client.get('/api/v1/entries?fields=id,context_items')
+    assert response.json[0]['context_items'][0]['content'] == "Payload"
+
+    assert client.get('/api/v1/entries?fields=id,bogus').status_code == 400
+
+def test_list_entries_cursor(client):
+    for i in range(5):
+        client.post('/api/v1/entries', json={"type": "note", "content": f"E{i}"})
+    first = client.get('/api/v1/entries?limit=3')
+    cursor = first.headers['X-Next-Cursor']
+    second = client.get(f'/api/v1/entries?limit=3&cursor={cursor}')
+    assert len(second.json) == 2
+    assert 'X-Next-Cursor' not in second.headers
+    assert not {e['id'] for e in first.json} & {e['id'] for e in second.json}
+
+    assert client.get('/api/v1/entries?cursor=garbage').status_code == 400
+
+def test_relation_graph(client):
+    ids = [client.post('/api/v1/entries', json={"type": "note", "content": f"E{i}"}).json['id'] for i in range(3)]
+    client.post(f"/api/v1/entries/{ids[0]}/relations/{ids[1]}")
+    client.post(f"/api/v1/entries/{ids[1]}/relations/{ids[2]}")
+
+    response = client.get(f"/api/v1/entries/{ids[0]}/graph?depth=2")
+    assert response.status_code == 200
+    assert [n['depth'] for n in response.json['nodes']] == [0, 1, 2]
+    assert len(response.json['edges']) == 2
+    assert client.get(f"/api/v1/entries/{ids[0]}/graph?depth=99").status_code == 400
+    assert client.get("/api/v1/entries/missing/graph").status_code == 404
+
+    response = client.get(f"/api/v1/graph/path?from={ids[2]}&to={ids[0]}")
+    assert response.json == {"path": ids[::-1], "length": 2}
+    assert client.get(f"/api/v1/graph/path?from={ids[2]}&to={ids[0]}&max_depth=1").status_code == 404
+    assert client.get(f"/api/v1/graph/path?from={ids[2]}").status_code == 400
+
+    assert client.get("/api/v1/graph/components").json == [sorted(ids)]
+
+def test_histogram(client):
+    client.post('/api/v1/entries', json={"type": "note", "content": "E1"})
+    client.post('/api/v1/entries', json={"type": "task", "content": "E2"})
+    response = client.get('/api/v1/stats/histogram?interval=day&group_by=type')
+    assert response.status_code == 200
+    assert len(response.json) == 1
+    assert response.json[0]['count'] == 2
+    assert response.json[0]['groups'] == {"note": 1, "task": 1}
+    assert response.json[0]['start'].endswith("T00:00:00Z")
+    assert client.get('/api/v1/stats/histogram?interval=fortnight').status_code == 400
+    assert client.get('/api/v1/stats/histogram?type=observation').json == []
+
+def test_batch_get(client):
+    ids = [client.post('/api/v1/entries', json={"type": "note", "content": f"E{i}"}).json['id'] for i in range(3)]
+    response = client.post('/api/v1/entries/batch-get', json={"ids": [ids[2], "missing", ids[0]]})
+    assert response.status_code == 200
+    assert [e['id'] for e in response.json['entries']] == [ids[2], ids[0]]
+    assert response.json['missing'] == ["missing"]
+    assert client.post('/api/v1/entries/batch-get', json={"ids": "nope"}).status_code == 400
+    assert client.post('/api/v1/entries/batch-get', json={"ids": ["x"] * 1001}).status_code == 400
+
+def test_batch(client):
+    target = client.post('/api/v1/entries', json={"type": "note", "content": "Target"}).json['id']
+    response = client.post('/api/v1/batch', json={"operations": [
+        {"op": "create", "data": {"type": "note", "content": "Batched"}},
+        {"op": "update", "id": target, "data": {"tags": ["batched"]}},
+        {"op": "delete", "id": "missing"},
+    ]})
+    assert response.status_code == 200
+    results = response.json['results']
+    assert [r['ok'] for r in results] == [True, True, False]
+    assert client.get(f"/api/v1/entries/{results[0]['id']}").json['content'] == "Batched"
+    assert client.get(f"/api/v1/entries/{target}").json['tags'] == ["batched"]
+
+    assert client.post('/api/v1/batch', json={"operations": [{"op": "explode"}]}).status_code == 400
+    assert client.post('/api/v1/batch', json={"operations": []}).status_code == 400
+
+@pytest.mark.parametrize("storage_type", ["json", "sqlite", "segment"])
+def test_create_app_builds_configured_storage(tmp_path, monkeypatch, storage_type):
+    from workpad.api import create_app
+    from workpad.api.routes import STORAGE_EXTENSION
+    from workpad.config import settings
+    monkeypatch.setattr(settings, "DATA_PATH", str(tmp_path / "data"))
+    monkeypatch.setattr(settings, "STORAGE_TYPE", storage_type)
+    monkeypatch.setattr(settings, "SQLITE_PRAGMAS", "synchronous=FULL")
+    app = create_app()
+    storage = app.extensions[STORAGE_EXTENSION]
+    try:
+        client = app.test_client()
+        created = client.post('/api/v1/entries', json={"type": "note", "content": "Shared"}).json
+        # Every request sees the same storage instance
+        assert client.get(f"/api/v1/entries/{created['id']}").status_code == 200
+        assert app.extensions[STORAGE_EXTENSION] is storage
+        if storage_type == "sqlite":
+            assert storage.pragmas["synchronous"] == "FULL"
+        if storage_type == "json":
+            assert storage._file_lock is None  # MULTIPROCESS is opt-in
+            assert storage.index_mode == "journal"
+    finally:
+        storage.close()
+
+def test_create_storage_applies_json_settings(tmp_path, monkeypatch):
+    from workpad.config import settings
+    from workpad.storage.factory import create_storage
+    monkeypatch.setattr(settings, "DATA_PATH", str(tmp_path))
+    monkeypatch.setattr(settings, "SEARCH_INDEX", True)
+    monkeypatch.setattr(settings, "SEARCH_CONTEXT", True)
+    monkeypatch.setattr(settings, "JSON_CACHE_ENTRIES", 100)
+    monkeypatch.setattr(settings, "JSON_LAYOUT", "sharded")
+    monkeypatch.setattr(settings, "MULTIPROCESS", True)
+    storage = create_storage(settings)
+    assert storage._file_lock is not None
+    assert storage._search is not None and storage._search.include_context
+    assert storage.cache_stats() is not None
+    assert storage.layout == "sharded"
+
+@pytest.mark.parametrize("setting, value", [("STORAGE_TYPE", "segment"), ("JSON_INDEX_MODE", "snapshot")])
+def test_create_storage_refuses_single_process_setups(tmp_path, monkeypatch, setting, value):
+    from workpad.config import settings
+    from workpad.storage.factory import create_storage
+    monkeypatch.setattr(settings, "DATA_PATH", str(tmp_path))
+    monkeypatch.setattr(settings, "MULTIPROCESS", True)
+    monkeypatch.setattr(settings, setting, value)
+    with pytest.raises(ValueError):
+        create_storage(settings)
+    monkeypatch.setattr(settings, "MULTIPROCESS", False)
+    create_storage(settings).close()
+
+def test_create_app_rejects_unknown_storage_type(monkeypatch):
+    from workpad.api import create_app
+    from workpad.config import settings
+    monkeypatch.setattr(settings, "STORAGE_TYPE", "nosuch")
+    with pytest.raises(ValueError):
+        create_app()
@@ -0,0 +1,123 @@
+import pytest
+from workpad.storage.segment_storage import SegmentStorage
+from workpad.models import Entry, EntryUpdate, EntryFilter, EntryType, EntryStatus
+
+@pytest.fixture
+def storage(test_data_path):
+    s = SegmentStorage(str(test_data_path))
+    s.initialize()
+    yield s
+    s.close()
+
+def reopen(path, **kwargs):
+    s = SegmentStorage(str(path), **kwargs)
+    s.initialize()
+    return s
+
+def test_create_and_get(storage, sample_entry):
+    storage.create(sample_entry)
+    loaded = storage.get(sample_entry.id)
+    assert loaded.content == sample_entry.content
+    assert loaded.tags == ["test", "sample"]
+    assert storage.get("missing") is None
+
+def test_list_filters(storage):
+    e1 = storage.create(Entry(type=EntryType.note, content="Note 1", tags=["a"]))
+    e2 = storage.create(Entry(type=EntryType.task, content="Task 1", tags=["b"]))
+
+    assert [e.id for e in storage.list(EntryFilter())] == [e2.id, e1.id]
+    assert [e.id for e in storage.list(EntryFilter(type=EntryType.note))] == [e1.id]
+    assert [e.id for e in storage.list(EntryFilter(tags=["b"]))] == [e2.id]
+    assert [e.id for e in storage.list(EntryFilter(search="task"))] == [e2.id]
+    assert [e.id for e in storage.list(EntryFilter(limit=1, offset=1))] == [e1.id]
+
+def test_update_and_delete_survive_reopen(storage, test_data_path):
+    e1 = storage.create(Entry(type=EntryType.note, content="Original"))
+    e2 = storage.create(Entry(type=EntryType.note, content="Doomed"))
+    storage.update(e1.id, EntryUpdate(content="Updated", status=EntryStatus.completed))
+    assert storage.delete(e2.id) is True
+    assert storage.delete(e2.id) is False
+    storage.close()
+
+    reopened = reopen(test_data_path)
+    assert reopened.get(e1.id).content == "Updated"
+    assert reopened.get(e1.id).status == EntryStatus.completed
+    assert reopened.get(e2.id) is None
+    reopened.close()
+
+def test_segment_rollover_uses_hints(test_data_path):
+    storage = reopen(test_data_path, segment_size=512)
+    entries = [storage.create(Entry(type=EntryType.note, content=f"Entry {i} " + "x" * 200)) for i in range(6)]
+    storage.close()
+
+    segments = sorted((test_data_path / "segments").glob("*.seg"))
+    hints = sorted((test_data_path / "segments").glob("*.hint"))
+    assert len(segments) > 1
+    assert len(hints) == len(segments) - 1
+
+    reopened = reopen(test_data_path, segment_size=512)
+    assert {e.id for e in reopened.list(EntryFilter())} == {e.id for e in entries}
+    reopened.close()
+
+def test_compaction_reclaims_space(test_data_path):
+    storage = reopen(test_data_path, compact_min_bytes=10**9)
+    keep = storage.create(Entry(type=EntryType.note, content="Keep"))
+    doomed = storage.create(Entry(type=EntryType.note, content="Doomed"))
+    for i in range(20):
+        storage.update(keep.id, EntryUpdate(content=f"Revision {i}"))
+    storage.delete(doomed.id)
+    before = sum(p.stat().st_size for p in (test_data_path / "segments").glob("*.seg"))
+
+    storage.compact()
+    after = sum(p.stat().st_size for p in (test_data_path / "segments").glob("*.seg"))
+    assert after < before / 5
+    assert storage.get(keep.id).content == "Revision 19"
+    assert storage.get(doomed.id) is None
+    storage.close()
+
+    reopened = reopen(test_data_path)
+    assert [e.content for e in reopened.list(EntryFilter())] == ["Revision 19"]
+    reopened.close()
+
+def test_torn_tail_is_discarded(storage, test_data_path):
+    entry = storage.create(Entry(type=EntryType.note, content="Kept"))
+    storage.close()
+    with open(test_data_path / "segments" / "00000001.seg", "ab") as f:
+        f.write(b'{"op":"put","entry":{"id":"half')
+
+    reopened = reopen(test_data_path)
+    other = reopened.create(Entry(type=EntryType.note, content="After"))
+    reopened.close()
+    again = reopen(test_data_path)
+    assert {e.id for e in again.list(EntryFilter())} == {entry.id, other.id}
+    again.close()
+
+def test_cursor_pagination(storage):
+    from workpad.utils import encode_cursor
+    for i in range(10):
+        storage.create(Entry(type=EntryType.note, content=f"Entry {i}"))
+    expected = [e.id for e in storage.list(EntryFilter())]
+    page = storage.list(EntryFilter(limit=4))
+    rest = storage.list(EntryFilter(cursor=encode_cursor(page[-1].timestamp, page[-1].id)))
+    assert [e.id for e in page + rest] == expected
+
+def test_relation_graph(storage):
+    # Served by the StorageInterface defaults
+    from .scenarios import build_graph, check_graph
+    check_graph(storage, build_graph(storage))
+
+def test_aggregate(storage):
+    # Served by the StorageInterface default, which pages through list_summaries()
+    for i in range(3):
+        storage.create(Entry(type=EntryType.note, content=f"Note {i}", tags=["a"] if i else []))
+    stats = storage.aggregate()
+    assert (stats.total, stats.by_type, stats.by_tag) == (3, {"note": 3}, {"a": 2})
+    assert storage.aggregate(EntryFilter(search="note 2")).total == 1
+
+def test_histogram(storage):
+    from .scenarios import check_histogram
+    check_histogram(storage)
+
+def test_get_many(storage):
+    from .scenarios import check_get_many
+    check_get_many(storage)
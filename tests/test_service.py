@@ -82,3 +82,119 @@ def test_relations_self_reference(service):
     e1 = service.create_entry(EntryCreate(type=EntryType.note, content="Entry 1"))
     with pytest.raises(ValidationError):
         service.add_relation(e1.id, e1.id)
+
+def test_create_entries(service):
+    entries = service.create_entries([
+        EntryCreate(type=EntryType.observation, content=f"Observation {i}", tags=["bulk"])
+        for i in range(3)
+    ])
+    assert len(entries) == 3
+    assert service.get_entry(entries[1].id).content == "Observation 1"
+
+def test_relation_to_missing_entry(service):
+    e1 = service.create_entry(EntryCreate(type=EntryType.note, content="Entry 1"))
+    with pytest.raises(NotFoundError):
+        service.add_relation(e1.id, "missing")
+    assert service.get_entry(e1.id).related_entries == []
+
+def test_relation_to_deleted_entry_keeps_existing_link(service):
+    e1 = service.create_entry(EntryCreate(type=EntryType.note, content="Entry 1"))
+    e2 = service.create_entry(EntryCreate(type=EntryType.note, content="Entry 2"))
+    service.add_relation(e1.id, e2.id)
+    service.storage.delete(e2.id)
+
+    with pytest.raises(NotFoundError):
+        service.add_relation(e1.id, e2.id)
+    assert service.get_entry(e1.id).related_entries == [e2.id]
+
+def test_remove_missing_context(service):
+    entry = service.create_entry(EntryCreate(type=EntryType.note, content="Entry"))
+    assert service.remove_context(entry.id, "missing") is False
+    with pytest.raises(NotFoundError):
+        service.remove_context("missing", "missing")
+
+def test_relation_graph(service):
+    a, b, c = (service.create_entry(EntryCreate(type=EntryType.note, content=n)) for n in "abc")
+    service.add_relation(a.id, b.id)
+    service.add_relation(b.id, c.id)
+
+    graph = service.get_neighborhood(a.id, depth=2)
+    assert graph["nodes"] == [{"id": a.id, "depth": 0}, {"id": b.id, "depth": 1}, {"id": c.id, "depth": 2}]
+    assert graph["edges"] == sorted([sorted([a.id, b.id]), sorted([b.id, c.id])])
+    assert [n["id"] for n in service.get_neighborhood(a.id, depth=1)["nodes"]] == [a.id, b.id]
+
+    assert service.find_path(a.id, c.id) == [a.id, b.id, c.id]
+    assert service.find_path(a.id, c.id, max_depth=1) is None
+    assert service.get_components() == [sorted([a.id, b.id, c.id])]
+
+    with pytest.raises(NotFoundError):
+        service.get_neighborhood("missing")
+    with pytest.raises(NotFoundError):
+        service.find_path(a.id, "missing")
+    with pytest.raises(ValidationError):
+        service.get_neighborhood(a.id, depth=100)
+
+def test_get_stats(service):
+    for i in range(120):
+        service.create_entry(EntryCreate(type=EntryType.note, content=f"Entry {i}", tags=["bulk"]))
+    stats = service.get_stats()
+    assert stats["total_entries"] == 120
+    assert stats["by_tag"] == {"bulk": 120}
+    assert stats["date_range"]["oldest"] <= stats["date_range"]["newest"]
+
+def test_get_histogram(service):
+    from datetime import timezone
+    from workpad.enums import Interval
+    from workpad.models import Entry, EntryFilter
+    for day in (1, 4):
+        service.storage.create(Entry(type=EntryType.note, content=f"Day {day}",
+                                     timestamp=datetime(2024, 3, day, 12, tzinfo=timezone.utc)))
+    buckets = service.get_histogram(Interval.day)
+    assert [(b.start.day, b.count) for b in buckets] == [(1, 1), (2, 0), (3, 0), (4, 1)]
+
+    ranged = service.get_histogram(Interval.day, EntryFilter(
+        from_date=datetime(2024, 2, 28, tzinfo=timezone.utc), to_date=datetime(2024, 3, 2, tzinfo=timezone.utc)
+    ))
+    assert [(b.start.day, b.count) for b in ranged] == [(28, 0), (29, 0), (1, 1), (2, 0)]
+
+    with pytest.raises(ValidationError):
+        service.get_histogram(Interval.hour, EntryFilter(
+            from_date=datetime(2000, 1, 1, tzinfo=timezone.utc), to_date=datetime(2024, 1, 1, tzinfo=timezone.utc)
+        ))
+    assert service.get_histogram(Interval.week, EntryFilter(type=EntryType.task)) == []
+
+def test_get_entries(service):
+    e1 = service.create_entry(EntryCreate(type=EntryType.note, content="Entry 1"))
+    e2 = service.create_entry(EntryCreate(type=EntryType.note, content="Entry 2"))
+    assert [e.id for e in service.get_entries([e2.id, "missing", e1.id])] == [e2.id, e1.id]
+    with pytest.raises(ValidationError):
+        service.get_entries([e1.id] * 1001)
+
+def test_apply_batch(service):
+    from workpad.models import BatchRequest
+    existing = service.create_entry(EntryCreate(type=EntryType.note, content="Existing"))
+    batch = BatchRequest(operations=[
+        {"op": "create", "data": {"type": "note", "content": "New 1"}},
+        {"op": "create", "data": {"type": "task", "content": "New 2"}},
+        {"op": "update", "id": existing.id, "data": {"status": "completed"}},
+        {"op": "add_context", "id": existing.id, "data": {"type": "note", "source": "batch", "content": "Ctx"}},
+        {"op": "delete", "id": "missing"},
+        {"op": "add_relation", "id": existing.id, "related_id": "missing"},
+    ])
+    results = service.apply_batch(batch.operations)
+    assert [r["ok"] for r in results] == [True, True, True, True, False, False]
+    assert results[4]["type"] == "NotFoundError"
+    assert service.get_entry(results[1]["id"]).content == "New 2"
+    loaded = service.get_entry(existing.id)
+    assert loaded.status == EntryStatus.completed
+    assert loaded.context_items[0].id == results[3]["context_id"]
+    assert loaded.related_entries == []
+
+    # Invalid operations reject the whole batch before anything is written
+    invalid = BatchRequest(operations=[
+        {"op": "create", "data": {"type": "note", "content": "Not written"}},
+        {"op": "create", "data": {"type": "note", "content": "Too many tags", "tags": [f"t{i}" for i in range(30)]}},
+    ])
+    with pytest.raises(ValidationError):
+        service.apply_batch(invalid.operations)
+    assert service.get_stats()["total_entries"] == 3
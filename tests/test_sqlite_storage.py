@@ -1,7 +1,9 @@
+import itertools
 import pytest
-from datetime import datetime
+from datetime import datetime, timezone
 from workpad.storage.sqlite_storage import SQLiteStorage
 from workpad.models import Entry, EntryCreate, EntryUpdate, EntryFilter, EntryType, EntryStatus, ContextItem
+from workpad.utils import encode_cursor
 
 @pytest.fixture
 def storage():
@@ -84,3 +86,364 @@ def test_delete(storage, sample_entry_domain):
     assert storage.delete(entry.id) is True
     assert storage.get(entry.id) is None
     assert storage.delete(entry.id) is False
+
+def test_create_many(storage):
+    entries = [
+        Entry(type=EntryType.note, content=f"Bulk {i}",
+              context_items=[ContextItem(type="log_excerpt", source="ingest", content=f"line {i}")])
+        for i in range(5)
+    ]
+    storage.create_many(entries)
+
+    assert len(storage.list(EntryFilter())) == 5
+    loaded = storage.get(entries[2].id)
+    assert loaded.content == "Bulk 2"
+    assert loaded.context_items[0].content == "line 2"
+
+def test_compressed_context_items(tmp_path):
+    storage = SQLiteStorage(str(tmp_path), compression="lzma", compression_min_bytes=1024)
+    storage.initialize()
+    log = "2024-01-01 ERROR worker crashed\n" * 500
+    entry = storage.create(Entry(
+        type=EntryType.observation,
+        content="Crash",
+        context_items=[
+            ContextItem(type="log_excerpt", source="worker.log", content=log),
+            ContextItem(type="note", source="user", content="short"),
+        ]
+    ))
+
+    with storage.engine.connect() as conn:
+        rows = conn.exec_driver_sql("SELECT content, length(content_compressed) FROM context_items ORDER BY content").all()
+    assert rows[0][0] == ""
+    assert rows[0][1] < len(log) / 10
+    assert rows[1] == ("short", None)
+
+    loaded = storage.get(entry.id)
+    assert [c.content for c in loaded.context_items] == [log, "short"]
+
+def test_migrates_existing_database(tmp_path):
+    import sqlite3
+    conn = sqlite3.connect(tmp_path / "workpad.db")
+    conn.executescript("""
+        CREATE TABLE entries (id VARCHAR PRIMARY KEY, type VARCHAR, content VARCHAR, status VARCHAR,
+            timestamp DATETIME, created_at DATETIME, updated_at DATETIME,
+            tags_json VARCHAR, metadata_json VARCHAR, related_entries_json VARCHAR);
+        CREATE TABLE context_items (id VARCHAR PRIMARY KEY, entry_id VARCHAR REFERENCES entries(id),
+            type VARCHAR, source VARCHAR, content VARCHAR, metadata_json VARCHAR, created_at DATETIME);
+        INSERT INTO entries VALUES ('old', 'note', 'Old entry', 'active', '2024-01-01 00:00:00.000000',
+            '2024-01-01 00:00:00.000000', '2024-01-01 00:00:00.000000', '["legacy"]', '{}', '[]');
+        INSERT INTO context_items VALUES ('ctx', 'old', 'note', 'user', 'Old context', '{}',
+            '2024-01-01 00:00:00.000000');
+        INSERT INTO entries VALUES ('linked', 'note', 'Linked entry', 'active', '2024-01-02 00:00:00.000000',
+            '2024-01-02 00:00:00.000000', '2024-01-02 00:00:00.000000', '[]', '{}', '["old"]');
+    """)
+    conn.close()
+
+    storage = SQLiteStorage(str(tmp_path), compression="zlib", compression_min_bytes=1)
+    storage.initialize()
+    assert [e.id for e in storage.list(EntryFilter(tags=["legacy"]))] == ["old"]
+    assert [e.id for e in storage.list(EntryFilter(search="old"))] == ["old"]
+    assert not any(step.startswith("USE TEMP B-TREE") for step in storage.query_plan(EntryFilter(status="active")))
+    assert storage.neighborhood("old", 1) == {"old": 0, "linked": 1}
+    loaded = storage.get("old")
+    assert loaded.context_items[0].content == "Old context"
+    storage.update("old", EntryUpdate(context_items=loaded.context_items))
+    assert storage.get("old").context_items[0].content == "Old context"
+
+def test_dedup_context_payloads(tmp_path):
+    storage = SQLiteStorage(str(tmp_path), compression="zlib", dedup_context=True, dedup_min_bytes=100)
+    storage.initialize()
+    log = "2024-01-01 ERROR worker crashed\n" * 200
+
+    def crash():
+        return Entry(type=EntryType.observation, content="Crash", context_items=[
+            ContextItem(type="log_excerpt", source="worker.log", content=log),
+        ])
+
+    first = storage.create(crash())
+    second, third = storage.create_many([crash(), crash()])
+
+    def blobs():
+        with storage.engine.connect() as conn:
+            return conn.exec_driver_sql("SELECT refcount, length(content_compressed) FROM context_blobs").all()
+
+    assert len(blobs()) == 1
+    assert blobs()[0][0] == 3
+    assert blobs()[0][1] < len(log) / 10
+    assert storage.get(second.id).context_items[0].content == log
+
+    storage.update(first.id, EntryUpdate(context_items=[]))
+    storage.delete(second.id)
+    assert blobs()[0][0] == 1
+    storage.delete(third.id)
+    assert blobs() == []
+
+def test_list_summaries(tmp_path):
+    storage = SQLiteStorage(str(tmp_path))
+    storage.initialize()
+    entry = storage.create(Entry(
+        type=EntryType.task, content="Task", tags=["ops"],
+        context_items=[ContextItem(type="note", source="user", content="big")]
+    ))
+    summaries = storage.list_summaries(EntryFilter(tags=["ops"]))
+    assert [(s.id, s.type, s.tags) for s in summaries] == [(entry.id, EntryType.task, ["ops"])]
+    assert summaries[0].timestamp == entry.timestamp
+
+def test_full_text_search(tmp_path):
+    storage = SQLiteStorage(str(tmp_path), search_context=True)
+    storage.initialize()
+    timeout = storage.create(Entry(type=EntryType.observation, content="Worker TIMEOUT after retry"))
+    retry = storage.create(Entry(
+        type=EntryType.note, content="Retry retry retry policy",
+        context_items=[ContextItem(type="log_excerpt", source="worker.log", content="connection_reset")]
+    ))
+
+    # Case-insensitive, prefix match on every word
+    assert [e.id for e in storage.list(EntryFilter(search="timeout ret"))] == [timeout.id]
+    assert [e.id for e in storage.list(EntryFilter(search="connection_res"))] == [retry.id]
+    once = storage.create(Entry(type=EntryType.note, content="Retried once, then gave up on the retry budget"))
+    assert [e.id for e in storage.list(EntryFilter(search="retry"))] == [once.id, retry.id, timeout.id]
+    ranked = storage.list(EntryFilter(search="retry", sort_by="relevance"))
+    assert ranked[0].id == retry.id
+    storage.delete(once.id)
+
+    storage.update(timeout.id, EntryUpdate(content="Worker crashed"))
+    assert storage.list(EntryFilter(search="timeout")) == []
+    storage.delete(retry.id)
+    assert storage.list(EntryFilter(search="retry")) == []
+
+    # Rebuild from the entries table
+    assert storage.rebuild_search_index() == 1
+    assert [e.id for e in storage.list(EntryFilter(search="crash"))] == [timeout.id]
+
+def test_tags_mode(storage):
+    both = storage.create(Entry(type=EntryType.note, content="Both", tags=["db", "perf"]))
+    db = storage.create(Entry(type=EntryType.note, content="DB", tags=["db"]))
+    storage.create_many([Entry(type=EntryType.note, content="Other", tags=["ui"])])
+
+    assert {e.id for e in storage.list(EntryFilter(tags=["db", "perf"]))} == {both.id, db.id}
+    assert [e.id for e in storage.list(EntryFilter(tags=["db", "perf"], tags_mode="all"))] == [both.id]
+    assert len(storage.list(EntryFilter(tags=["ui"]))) == 1
+
+    storage.update(db.id, EntryUpdate(tags=["db", "perf"]))
+    assert len(storage.list(EntryFilter(tags=["db", "perf"], tags_mode="all"))) == 2
+    storage.delete(both.id)
+    assert [e.id for e in storage.list(EntryFilter(tags=["perf"]))] == [db.id]
+
+FILTER_OPTIONS = dict(
+    type=[None, EntryType.note],
+    status=[None, EntryStatus.active],
+    tags=[None, ["a"], ["a", "b"]],
+    tags_mode=["any", "all"],
+    search=[None, "timeout"],
+    from_date=[None, datetime(2024, 1, 1, tzinfo=timezone.utc)],
+    to_date=[None, datetime(2025, 1, 1, tzinfo=timezone.utc)],
+    sort_by=["timestamp", "relevance"],
+    cursor=[None, encode_cursor(datetime(2024, 6, 1, tzinfo=timezone.utc), "some-id")],
+)
+
+FILTER_COMBINATIONS = [
+    f for f in (
+        EntryFilter(**{k: v for k, v in zip(FILTER_OPTIONS, values) if v is not None})
+        for values in itertools.product(*FILTER_OPTIONS.values())
+        # Cursors only apply to timestamp order
+        if not (values[-1] and values[-2] == "relevance")
+    )
+    # tags_mode and sort_by only change the query alongside tags and search
+    if (f.tags or f.tags_mode == "any") and (f.search or f.sort_by == "timestamp")
+]
+
+@pytest.mark.parametrize("filters", FILTER_COMBINATIONS)
+def test_list_query_plan_uses_indexes(storage, filters):
+    plan = storage.query_plan(filters)
+    # "SCAN <table>" without an index is a full table scan; FTS5 lookups show as SCAN ... VIRTUAL TABLE
+    full_scans = [step for step in plan if step.startswith("SCAN ") and " USING " not in step and "VIRTUAL TABLE" not in step]
+    assert full_scans == [], plan
+    if not (filters.search or filters.tags):
+        assert "USE TEMP B-TREE FOR ORDER BY" not in plan, plan
+
+def test_connection_profile(tmp_path):
+    storage = SQLiteStorage(str(tmp_path), profile="safe", pragmas={"cache_size": -2048})
+    storage.initialize()
+    with storage.engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 2  # FULL
+        assert conn.exec_driver_sql("PRAGMA cache_size").scalar() == -2048
+
+    with pytest.raises(ValueError):
+        SQLiteStorage(str(tmp_path), profile="turbo")
+    with pytest.raises(ValueError):
+        SQLiteStorage(str(tmp_path), pragmas={"synchronous": "OFF; DROP TABLE entries"})
+
+def test_concurrent_writers(tmp_path):
+    import threading
+    storage = SQLiteStorage(str(tmp_path))
+    storage.initialize()
+    errors = []
+
+    def write(n):
+        try:
+            for i in range(20):
+                storage.create(Entry(type=EntryType.note, content=f"Writer {n} entry {i}"))
+                storage.list(EntryFilter(limit=5))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert len(storage.list(EntryFilter(limit=1000))) == 80
+
+def test_list_statement_count_is_constant(storage):
+    from sqlalchemy import event
+    for i in range(40):
+        storage.create(Entry(type=EntryType.note, content=f"Entry {i}", context_items=[
+            ContextItem(type="note", source="user", content=f"Context {i}"),
+            ContextItem(type="url", source="user", content="https://example.com"),
+        ]))
+    statements = []
+    event.listen(storage.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    counts = []
+    for limit in (1, 10, 40):
+        statements.clear()
+        page = storage.list(EntryFilter(limit=limit))
+        assert len(page) == limit
+        assert all(len(e.context_items) == 2 for e in page)
+        counts.append(len(statements))
+    assert counts[0] == counts[1] == counts[2], counts
+
+def test_cursor_pagination(storage):
+    same = datetime(2024, 5, 1, tzinfo=timezone.utc)
+    storage.create_many([Entry(type=EntryType.note, content=f"Entry {i}", timestamp=same) for i in range(6)])
+    storage.create(Entry(type=EntryType.note, content="Newest"))
+    expected = [e.id for e in storage.list(EntryFilter())]
+
+    seen = []
+    filters = EntryFilter(limit=3)
+    while True:
+        page = storage.list(filters)
+        seen.extend(e.id for e in page)
+        if len(page) < filters.limit:
+            break
+        filters = filters.model_copy(update={"cursor": encode_cursor(page[-1].timestamp, page[-1].id)})
+    assert seen == expected
+
+def test_context_and_relation_operations(tmp_path):
+    import threading
+    storage = SQLiteStorage(str(tmp_path), search_context=True, dedup_context=True, dedup_min_bytes=10)
+    storage.initialize()
+    entry = storage.create(Entry(type=EntryType.note, content="Shared"))
+    errors = []
+
+    def work(n):
+        try:
+            for i in range(10):
+                storage.add_context(entry.id, ContextItem(type="note", source=f"t{n}", content=f"shared payload {n}"))
+                storage.add_relation(entry.id, f"rel-{n}-{i}")
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+
+    loaded = storage.get(entry.id)
+    assert len(loaded.context_items) == 40
+    assert len(loaded.related_entries) == 40
+    assert storage.add_relation(entry.id, "rel-0-0")  # Already there
+    assert len(storage.get(entry.id).related_entries) == 40
+    assert [e.id for e in storage.list(EntryFilter(search="payload"))] == [entry.id]
+
+    for item in loaded.context_items:
+        assert storage.remove_context(entry.id, item.id)
+    assert not storage.remove_context(entry.id, loaded.context_items[0].id)
+    assert storage.list(EntryFilter(search="payload")) == []
+    with storage.engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT count(*) FROM context_blobs").scalar() == 0
+
+    assert storage.remove_relation(entry.id, "rel-1-5")
+    assert "rel-1-5" not in storage.get(entry.id).related_entries
+    assert not storage.add_relation("missing", entry.id)
+    assert not storage.add_context("missing", loaded.context_items[0])
+
+def test_relation_graph(storage):
+    from .scenarios import build_graph, check_graph
+    check_graph(storage, build_graph(storage))
+
+def test_relation_rows_follow_updates(storage):
+    a = storage.create(Entry(type=EntryType.note, content="A"))
+    b, c = storage.create_many([
+        Entry(type=EntryType.note, content="B", related_entries=[a.id]),
+        Entry(type=EntryType.note, content="C"),
+    ])
+    assert storage.neighbors([a.id]) == {a.id: {b.id}}
+    storage.update(b.id, EntryUpdate(related_entries=[c.id]))
+    assert storage.neighbors([a.id, c.id]) == {a.id: set(), c.id: {b.id}}
+    assert storage.neighborhood(a.id, 10) == {a.id: 0}
+
+def test_aggregate(storage):
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    storage.create_many([
+        Entry(type=EntryType.note if i % 3 else EntryType.task, content=f"Entry {i}",
+              tags=["even", "all"] if i % 2 == 0 else ["all"], timestamp=base.replace(hour=i))
+        for i in range(12)
+    ])
+    stats = storage.aggregate()
+    assert stats.total == 12
+    assert stats.by_type == {"note": 8, "task": 4}
+    assert stats.by_status == {"active": 12}
+    assert stats.by_tag == {"all": 12, "even": 6}
+    assert (stats.oldest, stats.newest) == (base, base.replace(hour=11))
+
+    narrowed = storage.aggregate(EntryFilter(tags=["even"], type=EntryType.task, cursor=encode_cursor(base, "x")))
+    assert (narrowed.total, narrowed.by_tag) == (2, {"all": 2, "even": 2})  # Cursor ignored
+    assert storage.aggregate(EntryFilter(search="nothing")).total == 0
+
+def test_histogram(storage):
+    from .scenarios import check_histogram
+    check_histogram(storage)
+
+def test_get_many(storage):
+    from .scenarios import check_get_many
+    check_get_many(storage)
+
+def test_batch_is_one_transaction(tmp_path):
+    from sqlalchemy import event
+    from workpad.errors import StorageError
+    storage = SQLiteStorage(str(tmp_path))
+    storage.initialize()
+    existing = storage.create(Entry(type=EntryType.note, content="Existing"))
+    commits = []
+    event.listen(storage.engine, "commit", lambda conn: commits.append(1))
+
+    with storage.batch():
+        a = storage.create(Entry(type=EntryType.note, content="A"))
+        assert storage.get(a.id).content == "A"  # Reads see the batch
+        with pytest.raises(StorageError):
+            storage.create(Entry(id=a.id, type=EntryType.note, content="Duplicate"))
+        storage.update(a.id, EntryUpdate(status=EntryStatus.completed))
+        storage.add_context(a.id, ContextItem(type="note", source="test", content="Attached"))
+        storage.add_relation(a.id, existing.id)
+        storage.delete(existing.id)
+    assert commits == [1]
+
+    # The failed create was rolled back on its own
+    loaded = storage.get(a.id)
+    assert (loaded.content, loaded.status) == ("A", EntryStatus.completed)
+    assert loaded.related_entries == [existing.id]
+    assert len(loaded.context_items) == 1
+    assert storage.get(existing.id) is None
+
+    with pytest.raises(RuntimeError):
+        with storage.batch():
+            storage.update(a.id, EntryUpdate(content="Changed"))
+            raise RuntimeError("abort")
+    assert storage.get(a.id).content == "A"
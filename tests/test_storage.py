@@ -1,6 +1,8 @@
 import pytest
+from datetime import datetime, timedelta, timezone
 from workpad.models import Entry, EntryUpdate, EntryFilter, EntryType, EntryStatus
 from workpad.storage.json_storage import JSONStorage
+from workpad.errors import StorageError
 
 def test_storage_initialize(test_data_path):
     store = JSONStorage(str(test_data_path))
@@ -60,3 +62,689 @@ def test_delete_entry(storage, sample_entry):
     result = storage.delete(sample_entry.id)
     assert result is True
     assert storage.get(sample_entry.id) is None
+
+def test_journal_mode_appends_instead_of_rewriting(test_data_path):
+    store = JSONStorage(str(test_data_path), index_mode="journal")
+    store.initialize()
+    snapshot = (test_data_path / "metadata.json").read_text()
+
+    e1 = store.create(Entry(type=EntryType.note, content="One"))
+    e2 = store.create(Entry(type=EntryType.note, content="Two"))
+    store.update(e1.id, EntryUpdate(status=EntryStatus.completed))
+    store.delete(e2.id)
+
+    # Snapshot untouched, changes live in the log
+    assert (test_data_path / "metadata.json").read_text() == snapshot
+    # Generation header + one record per write
+    assert len((test_data_path / "metadata.log").read_text().splitlines()) == 5
+
+    # A fresh instance replays the log on top of the snapshot
+    reopened = JSONStorage(str(test_data_path), index_mode="journal")
+    reopened.initialize()
+    assert list(reopened._index) == [e1.id]
+    assert reopened._index[e1.id]["status"] == "completed"
+
+def test_journal_compaction(test_data_path):
+    store = JSONStorage(str(test_data_path), index_mode="journal", compact_threshold=3)
+    store.initialize()
+    for i in range(4):
+        store.create(Entry(type=EntryType.note, content=f"Entry {i}"))
+
+    # Third write triggered a checkpoint, fourth is back in the log
+    assert len((test_data_path / "metadata.log").read_text().splitlines()) == 2
+
+    store.compact()
+    assert len((test_data_path / "metadata.log").read_text().splitlines()) == 1
+    reopened = JSONStorage(str(test_data_path))
+    reopened.initialize()
+    assert len(reopened.list(EntryFilter())) == 4
+
+def test_journal_ignores_torn_tail(test_data_path):
+    store = JSONStorage(str(test_data_path), index_mode="journal")
+    store.initialize()
+    entry = store.create(Entry(type=EntryType.note, content="Kept"))
+    with open(test_data_path / "metadata.log", "a") as f:
+        f.write('{"op": "put", "id": "half')
+
+    reopened = JSONStorage(str(test_data_path), index_mode="journal")
+    reopened.initialize()
+    assert list(reopened._index) == [entry.id]
+    # Later appends must not be glued to the torn record
+    other = reopened.create(Entry(type=EntryType.note, content="After"))
+    again = JSONStorage(str(test_data_path), index_mode="journal")
+    again.initialize()
+    assert set(again._index) == {entry.id, other.id}
+
+def test_search_index(test_data_path):
+    store = JSONStorage(str(test_data_path), search_index=True)
+    store.initialize()
+    e1 = store.create(Entry(type=EntryType.note, content="Database connection timeout"))
+    e2 = store.create(Entry(type=EntryType.note, content="Cache warmup finished"))
+
+    res = store.list(EntryFilter(search="connection"))
+    assert [e.id for e in res] == [e1.id]
+    # Case-insensitive, word prefixes
+    assert [e.id for e in store.list(EntryFilter(search="DATA time"))] == [e1.id]
+    assert store.list(EntryFilter(search="database warmup")) == []
+
+    store.update(e2.id, EntryUpdate(content="Connection pool resized"))
+    assert {e.id for e in store.list(EntryFilter(search="connection"))} == {e1.id, e2.id}
+
+    store.delete(e1.id)
+    assert [e.id for e in store.list(EntryFilter(search="connection"))] == [e2.id]
+
+    reopened = JSONStorage(str(test_data_path), search_index=True)
+    reopened.initialize()
+    assert reopened._search.search("connection") == {e2.id}
+
+def test_search_index_built_for_existing_store(test_data_path):
+    plain = JSONStorage(str(test_data_path))
+    plain.initialize()
+    entry = plain.create(Entry(type=EntryType.note, content="Legacy entry"))
+
+    indexed = JSONStorage(str(test_data_path), search_index=True)
+    indexed.initialize()
+    assert (test_data_path / "search_index.json").exists()
+    assert [e.id for e in indexed.list(EntryFilter(search="legacy"))] == [entry.id]
+
+def test_search_index_kept_current_by_plain_instances(test_data_path):
+    indexed = JSONStorage(str(test_data_path), search_index=True)
+    indexed.initialize()
+    old = indexed.create(Entry(type=EntryType.note, content="Original wording"))
+
+    plain = JSONStorage(str(test_data_path))
+    plain.initialize()
+    new = plain.create(Entry(type=EntryType.note, content="Fresh entry"))
+    plain.update(old.id, EntryUpdate(content="Replaced wording"))
+
+    reopened = JSONStorage(str(test_data_path), search_index=True)
+    reopened.initialize()
+    assert reopened._search.search("fresh") == {new.id}
+    assert reopened._search.search("original") == set()
+
+def test_search_ignores_ids_missing_from_index(test_data_path):
+    store = JSONStorage(str(test_data_path), search_index=True)
+    store.initialize()
+    store.create_many([Entry(type=EntryType.note, content=f"Entry {i}") for i in range(8)])
+    match = store.create(Entry(type=EntryType.note, content="Needle"))
+    # Left behind by a crash between the index commit and the search index update
+    store._search.add(Entry(type=EntryType.note, content="Needle orphan"))
+
+    assert [e.id for e in store.list(EntryFilter(search="needle"))] == [match.id]
+    assert [s.id for s in store.list_summaries(EntryFilter(search="needle"))] == [match.id]
+    assert store.aggregate(EntryFilter(search="needle")).total == 1
+
+def test_unrecorded_search_index_is_rebuilt(test_data_path):
+    indexed = JSONStorage(str(test_data_path), search_index=True)
+    indexed.initialize()
+    entry = indexed.create(Entry(type=EntryType.note, content="Original wording"))
+    # An index left behind without the store.json record, as older versions wrote it
+    indexed._update_store_info(search_index=None)
+
+    plain = JSONStorage(str(test_data_path))
+    plain.initialize()
+    assert plain._search is None
+    plain.update(entry.id, EntryUpdate(content="Replaced wording"))
+
+    reopened = JSONStorage(str(test_data_path), search_index=True)
+    reopened.initialize()
+    assert reopened._search.search("replaced") == {entry.id}
+    assert reopened._search.search("original") == set()
+
+def test_rebuild_search_index_command(test_data_path):
+    from workpad.maintenance import main
+
+    plain = JSONStorage(str(test_data_path))
+    plain.initialize()
+    entry = plain.create(Entry(type=EntryType.note, content="Rebuilt entry"))
+
+    assert main(["rebuild-search-index", str(test_data_path)]) == 0
+    indexed = JSONStorage(str(test_data_path), search_index=True)
+    indexed.initialize()
+    assert indexed._search.search("rebuilt") == {entry.id}
+
+def test_entry_cache(test_data_path):
+    store = JSONStorage(str(test_data_path), cache_entries=2)
+    store.initialize()
+    entries = [store.create(Entry(type=EntryType.note, content=f"Cached {i}")) for i in range(3)]
+
+    # Writes populate the cache; the oldest was evicted by the count bound
+    assert store.cache_stats()["evictions"] == 1
+    store.get(entries[2].id)
+    store.get(entries[0].id)
+    stats = store.cache_stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+    # Returned entries are copies
+    loaded = store.get(entries[0].id)
+    loaded.tags.append("mutated")
+    assert store.get(entries[0].id).tags == []
+
+    # Changes made behind our back are picked up via mtime/size
+    path = store._get_entry_path(entries[0].id)
+    external = Entry.model_validate_json(path.read_text())
+    external.content = "Edited elsewhere"
+    path.write_text(external.model_dump_json(indent=2))
+    assert store.get(entries[0].id).content == "Edited elsewhere"
+
+    store.delete(entries[0].id)
+    assert store.get(entries[0].id) is None
+
+def test_entry_cache_accounting_under_threads():
+    import os
+    import threading
+    from workpad.storage.cache import EntryCache
+    cache = EntryCache(max_entries=5, max_bytes=10 * 1024)
+    entries = [Entry(type=EntryType.note, content=f"E{i}") for i in range(10)]
+
+    def work(n):
+        for i in range(300):
+            entry = entries[(n + i) % len(entries)]
+            stat = os.stat_result((0, 0, 0, 0, 0, 0, 700 + i % 3, 0, 0, 0))
+            cache.put(entry, stat)
+            cache.get(entry.id, stat)
+            if i % 7 == 0:
+                cache.invalidate(entry.id)
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stats = cache.stats()
+    assert stats["entries"] <= 5
+    assert stats["bytes"] == sum(size for _, _, size in cache._slots.values())
+
+def test_entry_cache_byte_bound(test_data_path):
+    store = JSONStorage(str(test_data_path), cache_entries=100, cache_bytes=1500)
+    store.initialize()
+    for i in range(5):
+        store.create(Entry(type=EntryType.note, content="x" * 400))
+    stats = store.cache_stats()
+    assert stats["bytes"] <= 1500
+    assert stats["entries"] < 5
+    assert JSONStorage(str(test_data_path)).cache_stats() is None
+
+def test_sharded_layout(test_data_path, monkeypatch):
+    store = JSONStorage(str(test_data_path), layout="sharded")
+    store.initialize()
+    entry = store.create(Entry(type=EntryType.note, content="Sharded"))
+
+    path = store._get_entry_path(entry.id)
+    assert path.parent.parent.parent == test_data_path / "entries"
+    assert len(path.parent.name) == 2
+
+    # Unknown IDs resolve to a path without walking the tree
+    def no_scan(*args):
+        raise AssertionError("tree scanned")
+    monkeypatch.setattr(type(store.entries_path), "rglob", no_scan)
+    assert store.get("missing-id") is None
+    assert store.delete("missing-id") is False
+    monkeypatch.undo()
+
+    # The layout is recorded with the store
+    reopened = JSONStorage(str(test_data_path))
+    reopened.initialize()
+    assert reopened.layout == "sharded"
+    with pytest.raises(StorageError):
+        JSONStorage(str(test_data_path), layout="monthly").initialize()
+
+def test_migrate_layout_command(test_data_path):
+    from workpad.maintenance import main
+
+    store = JSONStorage(str(test_data_path))
+    store.initialize()
+    entries = [store.create(Entry(type=EntryType.note, content=f"Move {i}")) for i in range(3)]
+    assert store.layout == "monthly"
+
+    assert main(["migrate-layout", str(test_data_path), "--layout", "sharded"]) == 0
+
+    migrated = JSONStorage(str(test_data_path))
+    migrated.initialize()
+    assert migrated.layout == "sharded"
+    for e in entries:
+        assert migrated.get(e.id).content == e.content
+    assert not list((test_data_path / "entries").glob("????-??"))
+
+def test_create_many_flushes_index_once(storage, monkeypatch):
+    saves = []
+    original = storage._save_index
+    monkeypatch.setattr(storage, "_save_index", lambda: saves.append(1) or original())
+
+    entries = [Entry(type=EntryType.note, content=f"Bulk {i}") for i in range(10)]
+    assert storage.create_many(entries) == entries
+    assert len(saves) == 1
+    assert len(storage.list(EntryFilter())) == 10
+
+    reopened = JSONStorage(str(storage.data_path))
+    reopened.initialize()
+    assert reopened.get(entries[3].id).content == "Bulk 3"
+
+def test_list_date_range_and_order(storage):
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    entries = [
+        storage.create(Entry(type=EntryType.note, content=f"Day {i}", timestamp=base + timedelta(days=i)))
+        for i in range(10)
+    ]
+
+    res = storage.list(EntryFilter(from_date=base + timedelta(days=3), to_date=base + timedelta(days=5)))
+    assert [e.content for e in res] == ["Day 5", "Day 4", "Day 3"]
+
+    res = storage.list(EntryFilter(limit=2, offset=1))
+    assert [e.id for e in res] == [entries[8].id, entries[7].id]
+
+    # Naive bounds are read as UTC
+    res = storage.list(EntryFilter(from_date=datetime(2024, 1, 9)))
+    assert [e.content for e in res] == ["Day 9", "Day 8"]
+
+def test_list_loads_only_the_page(storage, monkeypatch):
+    for i in range(20):
+        storage.create(Entry(type=EntryType.note, content=f"Entry {i}"))
+    loaded = []
+    original = storage._read_entry_file
+    monkeypatch.setattr(storage, "_read_entry_file", lambda path: loaded.append(path) or original(path))
+
+    assert len(storage.list(EntryFilter(limit=5))) == 5
+    assert len(loaded) == 5
+
+def test_posting_list_filters(storage):
+    common = [storage.create(Entry(type=EntryType.note, content=f"Common {i}", tags=["bulk"])) for i in range(12)]
+    rare = storage.create(Entry(type=EntryType.hypothesis, content="Rare", tags=["bulk", "rare"]))
+    task = storage.create(Entry(type=EntryType.task, content="Task", tags=["other"]))
+
+    assert [e.id for e in storage.list(EntryFilter(tags=["rare"]))] == [rare.id]
+    assert {e.id for e in storage.list(EntryFilter(tags=["rare", "other"]))} == {rare.id, task.id}
+    assert len(storage.list(EntryFilter(type=EntryType.note, tags=["bulk"]))) == 12
+    assert storage.list(EntryFilter(type=EntryType.task, tags=["bulk"])) == []
+    assert [e.id for e in storage.list(EntryFilter(tags=["bulk", "rare"], tags_mode="all"))] == [rare.id]
+
+    # Postings follow updates and deletes
+    storage.update(common[0].id, EntryUpdate(status=EntryStatus.archived, tags=["rare"]))
+    res = storage.list(EntryFilter(status=EntryStatus.archived, tags=["rare"]))
+    assert [e.id for e in res] == [common[0].id]
+    assert len(storage.list(EntryFilter(tags=["bulk"]))) == 12
+
+    storage.delete(rare.id)
+    assert [e.id for e in storage.list(EntryFilter(tags=["rare"]))] == [common[0].id]
+    assert storage.list(EntryFilter(type=EntryType.hypothesis)) == []
+
+def test_common_filter_walks_timeline(storage, monkeypatch):
+    import workpad.storage.json_storage as json_storage
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    entries = storage.create_many([
+        Entry(type=EntryType.note, content=f"Note {i}", tags=["bulk"], timestamp=base.replace(minute=i)) for i in range(10)
+    ])
+
+    def no_intersect(sets):
+        raise AssertionError("posting lists copied")
+    monkeypatch.setattr(json_storage, "intersect", no_intersect)
+    res = storage.list(EntryFilter(type=EntryType.note, tags=["bulk"], limit=3))
+    assert [e.id for e in res] == [e.id for e in entries[::-1][:3]]
+
+def test_readers_never_see_partial_entry_files(test_data_path):
+    import threading
+    store = JSONStorage(str(test_data_path))
+    store.initialize()
+    entries = store.create_many([Entry(type=EntryType.note, content="x" * 2000) for _ in range(4)])
+    ids = [e.id for e in entries]
+    errors = []
+    done = threading.Event()
+
+    def write(n):
+        try:
+            for i in range(100):
+                store.update(ids[(n + i) % len(ids)], EntryUpdate(content=f"{n}-{i} " * 500))
+        except Exception as e:
+            errors.append(e)
+
+    def read():
+        try:
+            while not done.is_set():
+                store.get_many(ids)
+                store.get(ids[0])
+        except Exception as e:
+            errors.append(e)
+
+    readers = [threading.Thread(target=read) for _ in range(6)]
+    writers = [threading.Thread(target=write, args=(n,)) for n in range(2)]
+    for t in readers + writers:
+        t.start()
+    for t in writers:
+        t.join()
+    done.set()
+    for t in readers:
+        t.join()
+    assert errors == []
+    assert not list(test_data_path.rglob("*.tmp"))
+
+def test_shared_instance_reads_during_writes(test_data_path):
+    import threading
+    store = JSONStorage(str(test_data_path), cache_entries=50)
+    store.initialize()
+    seed = store.create_many([Entry(type=EntryType.note, content=f"Seed {i}") for i in range(5)])
+    errors = []
+    done = threading.Event()
+
+    def write(n):
+        try:
+            for i in range(60):
+                entry = store.create(Entry(type=EntryType.note, content=f"W{n} {i}", related_entries=[seed[i % 5].id]))
+                store.add_relation(seed[i % 5].id, entry.id)
+                if i % 3 == 0:
+                    store.delete(entry.id)
+        except Exception as e:
+            errors.append(e)
+
+    def read():
+        try:
+            while not done.is_set():
+                store.get(seed[0].id)
+                store.list(EntryFilter(limit=20))
+                store.neighbors([e.id for e in seed])
+                list(store.relation_edges())
+        except Exception as e:
+            errors.append(e)
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    writers = [threading.Thread(target=write, args=(n,)) for n in range(2)]
+    for t in readers + writers:
+        t.start()
+    for t in writers:
+        t.join()
+    done.set()
+    for t in readers:
+        t.join()
+    assert errors == []
+
+def _create_worker(path, worker, count):
+    store = JSONStorage(path, index_mode="journal", compact_threshold=7, multiprocess=True)
+    store.initialize()
+    for i in range(count):
+        store.create(Entry(type=EntryType.note, content=f"Worker {worker} entry {i}"))
+
+def test_multiprocess_creates_are_not_lost(test_data_path):
+    import multiprocessing
+
+    ctx = multiprocessing.get_context("spawn")
+    procs = [ctx.Process(target=_create_worker, args=(str(test_data_path), w, 15)) for w in range(3)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(timeout=60)
+        assert p.exitcode == 0
+
+    store = JSONStorage(str(test_data_path), index_mode="journal")
+    store.initialize()
+    assert len(store.list(EntryFilter(limit=1000))) == 45
+
+def test_multiprocess_writer_adopts_new_search_index(test_data_path):
+    plain = JSONStorage(str(test_data_path), index_mode="journal", multiprocess=True)
+    plain.initialize()
+    indexed = JSONStorage(str(test_data_path), index_mode="journal", multiprocess=True, search_index=True)
+    indexed.initialize()
+
+    entry = plain.create(Entry(type=EntryType.note, content="Written later"))
+    assert [e.id for e in indexed.list(EntryFilter(search="later"))] == [entry.id]
+
+def test_multiprocess_reload_holds_file_lock(test_data_path, monkeypatch):
+    a = JSONStorage(str(test_data_path), index_mode="journal", multiprocess=True)
+    a.initialize()
+    b = JSONStorage(str(test_data_path), index_mode="journal", multiprocess=True)
+    b.initialize()
+    entry = a.create(Entry(type=EntryType.note, content="Folded"))
+    a.compact()
+
+    depths = []
+    original = b._journal._load
+    monkeypatch.setattr(b._journal, "_load", lambda: depths.append(b._file_lock._depth) or original())
+    assert [e.id for e in b.list(EntryFilter())] == [entry.id]
+    assert depths == [1]
+
+def test_multiprocess_applies_deltas(test_data_path, monkeypatch):
+    a = JSONStorage(str(test_data_path), index_mode="journal", multiprocess=True, search_index=True)
+    a.initialize()
+    b = JSONStorage(str(test_data_path), index_mode="journal", multiprocess=True, search_index=True)
+    b.initialize()
+
+    def no_reload():
+        raise AssertionError("full reload")
+    monkeypatch.setattr(b, "_reload_index", no_reload)
+
+    e1 = a.create(Entry(type=EntryType.note, content="Written by A", tags=["a"]))
+    assert [e.id for e in b.list(EntryFilter(tags=["a"]))] == [e1.id]
+    assert [e.id for e in b.list(EntryFilter(search="written"))] == [e1.id]
+
+    e2 = b.create(Entry(type=EntryType.note, content="Written by B"))
+    a.delete(e1.id)
+    assert [e.id for e in b.list(EntryFilter())] == [e2.id]
+    assert b.list(EntryFilter(search="written")) == [b.get(e2.id)]
+    monkeypatch.undo()
+
+    # After a compaction elsewhere, the next access reloads the snapshot
+    a.compact()
+    assert [e.id for e in b.list(EntryFilter())] == [e2.id]
+    assert b.get(e2.id).content == "Written by B"
+
+def test_compressed_entry_files(test_data_path):
+    store = JSONStorage(str(test_data_path), compression="zlib", compression_min_bytes=1024)
+    store.initialize()
+    small = store.create(Entry(type=EntryType.note, content="Small"))
+    trace = "Traceback (most recent call last):\n  File \"app.py\", line 1\n" * 200
+    big = store.create(Entry(type=EntryType.observation, content=trace))
+
+    small_path = store._get_entry_path(small.id)
+    big_path = store._get_entry_path(big.id)
+    assert small_path.read_bytes().startswith(b"{")
+    assert big_path.stat().st_size < len(trace) / 10
+
+    assert store.get(big.id).content == trace
+    store.update(big.id, EntryUpdate(tags=["crash"]))
+    assert [e.id for e in store.list(EntryFilter(tags=["crash"]))] == [big.id]
+
+    # Readable without compression configured
+    plain = JSONStorage(str(test_data_path))
+    plain.initialize()
+    assert plain.get(big.id).content == trace
+
+def test_unknown_compression_codec(test_data_path):
+    with pytest.raises(ValueError):
+        JSONStorage(str(test_data_path), compression="brotli")
+
+def test_dedup_context_payloads(test_data_path):
+    from workpad.models import ContextItem
+    store = JSONStorage(str(test_data_path), dedup_context=True, dedup_min_bytes=100)
+    store.initialize()
+    trace = "Traceback (most recent call last):\n  File \"app.py\", line 1\n" * 50
+
+    def crash(n):
+        return Entry(type=EntryType.observation, content=f"Crash {n}", context_items=[
+            ContextItem(type="stacktrace", source="app", content=trace),
+            ContextItem(type="note", source="user", content="short"),
+        ])
+
+    first = store.create(crash(1))
+    second, third = store.create_many([crash(2), crash(3)])
+    blobs = list((test_data_path / "blobs").rglob("*"))
+    assert len([b for b in blobs if b.is_file()]) == 1
+    assert trace not in store._get_entry_path(first.id).read_text()
+
+    assert [c.content for c in store.get(second.id).context_items] == [trace, "short"]
+    store.update(first.id, EntryUpdate(context_items=[]))
+    store.delete(second.id)
+
+    # Counts survive a reopen, and the last reference removes the blob
+    reopened = JSONStorage(str(test_data_path))
+    reopened.initialize()
+    assert reopened.get(third.id).context_items[0].content == trace
+    reopened.delete(third.id)
+    assert not [b for b in (test_data_path / "blobs").rglob("*") if b.is_file()]
+
+def test_list_summaries_from_index(storage, monkeypatch):
+    for i in range(5):
+        storage.create(Entry(type=EntryType.note, content=f"Entry {i}", tags=[f"t{i}"]))
+    monkeypatch.setattr(storage, "_get", lambda eid: pytest.fail("entry file opened"))
+
+    summaries = storage.list_summaries(EntryFilter(limit=2, offset=1))
+    assert [s.tags for s in summaries] == [["t3"], ["t2"]]
+    assert summaries[0].type == EntryType.note
+    assert summaries[0].timestamp > summaries[1].timestamp
+
+def test_cursor_pagination(storage):
+    from workpad.utils import encode_cursor
+    same = datetime(2024, 5, 1, tzinfo=timezone.utc)
+    for i in range(25):
+        # Some entries share a timestamp; the id breaks the tie
+        ts = same if i % 3 == 0 else same + timedelta(minutes=i)
+        storage.create(Entry(type=EntryType.note if i % 2 else EntryType.task, content=f"Entry {i}", timestamp=ts))
+
+    for filters in (EntryFilter(limit=7), EntryFilter(type=EntryType.note, limit=4)):
+        expected = [e.id for e in storage.list(filters.model_copy(update={"limit": 1000}))]
+        seen = []
+        while True:
+            page = storage.list(filters)
+            seen.extend(e.id for e in page)
+            if len(page) < filters.limit:
+                break
+            filters = filters.model_copy(update={"cursor": encode_cursor(page[-1].timestamp, page[-1].id)})
+        assert seen == expected
+
+    first = storage.list_summaries(EntryFilter(limit=3))
+    after = storage.list_summaries(EntryFilter(limit=3, cursor=encode_cursor(first[-1].timestamp, first[-1].id)))
+    assert [s.id for s in first + after] == [e.id for e in storage.list(EntryFilter(limit=6))]
+
+def test_concurrent_context_and_relation_edits(test_data_path):
+    import threading
+    from workpad.models import ContextItem
+    store = JSONStorage(str(test_data_path), index_mode="journal")
+    store.initialize()
+    entry = store.create(Entry(type=EntryType.note, content="Shared"))
+    pending = store._journal.pending
+
+    def work(n):
+        for i in range(10):
+            store.add_context(entry.id, ContextItem(type="note", source=f"t{n}", content=f"{n}-{i}"))
+            store.add_relation(entry.id, f"rel-{n}-{i}")
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    loaded = store.get(entry.id)
+    assert len(loaded.context_items) == 40
+    assert len(loaded.related_entries) == 40
+    # Context is not indexed; each new relation appends one index record
+    assert store._journal.pending == pending + 40
+    assert len(store._index[entry.id]['related']) == 40
+
+    assert store.remove_context(entry.id, loaded.context_items[0].id)
+    assert not store.remove_context(entry.id, loaded.context_items[0].id)
+    assert store.remove_relation(entry.id, "rel-0-0")
+    assert len(store.get(entry.id).related_entries) == 39
+    assert not store.add_context("missing", loaded.context_items[1])
+
+def test_relation_graph(storage):
+    from .scenarios import build_graph, check_graph
+    check_graph(storage, build_graph(storage))
+
+def test_relation_graph_backfills_old_index(test_data_path):
+    import json
+    store = JSONStorage(str(test_data_path))
+    store.initialize()
+    a = store.create(Entry(type=EntryType.note, content="A"))
+    b = store.create(Entry(type=EntryType.note, content="B", related_entries=[a.id]))
+    # Index written before related ids were indexed
+    index_file = test_data_path / "metadata.json"
+    index = json.loads(index_file.read_text())
+    for meta in index.values():
+        del meta['related']
+    index_file.write_text(json.dumps(index))
+
+    reopened = JSONStorage(str(test_data_path))
+    reopened.initialize()
+    assert reopened.neighbors([a.id]) == {a.id: {b.id}}
+    assert json.loads(index_file.read_text())[b.id]['related'] == [a.id]
+
+def test_aggregate(storage):
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    storage.create_many([
+        Entry(type=EntryType.note if i % 3 else EntryType.task, content=f"Entry {i}",
+              tags=["even"] if i % 2 == 0 else [], timestamp=base + timedelta(hours=i))
+        for i in range(150)
+    ])
+    storage.update(storage.list(EntryFilter(limit=1))[0].id, EntryUpdate(status=EntryStatus.archived))
+
+    stats = storage.aggregate()
+    assert stats.total == 150  # Not capped by EntryFilter.limit
+    assert stats.by_type == {"note": 100, "task": 50}
+    assert stats.by_status == {"active": 149, "archived": 1}
+    assert stats.by_tag == {"even": 75}
+    assert (stats.oldest, stats.newest) == (base, base + timedelta(hours=149))
+
+    narrowed = storage.aggregate(EntryFilter(type=EntryType.task, to_date=base + timedelta(hours=10), limit=1))
+    assert narrowed.total == 4
+    assert narrowed.by_tag == {"even": 2}
+    assert (narrowed.oldest, narrowed.newest) == (base, base + timedelta(hours=9))
+    # Without a search index, search reads the entry files
+    assert storage.aggregate(EntryFilter(search="entry 14")).total == 11
+
+def test_histogram(storage):
+    from .scenarios import check_histogram
+    check_histogram(storage)
+
+def test_get_many(storage):
+    from .scenarios import check_get_many
+    check_get_many(storage)
+
+def test_get_many_reads_in_parallel_and_fills_cache(test_data_path):
+    store = JSONStorage(str(test_data_path), cache_entries=100, read_workers=4)
+    store.initialize()
+    ids = [e.id for e in store.create_many([Entry(type=EntryType.note, content=f"E{i}") for i in range(20)])]
+    store._cache.clear()
+    assert [e.id for e in store.get_many(ids)] == ids
+    assert store.cache_stats()["misses"] == 20
+    assert [e.id for e in store.get_many(ids[::-1])] == ids[::-1]
+    assert store.cache_stats()["hits"] == 20
+
+    # One pool for the store's lifetime; list pages do not use it
+    store.close()
+    store._cache.clear()
+    assert len(store.list(EntryFilter(limit=5))) == 5
+    assert store._readers is None
+    store.get_many(ids)
+    pool = store._readers
+    assert pool is not None
+    store._cache.clear()
+    store.get_many(ids)
+    assert store._readers is pool
+
+def test_batch_saves_index_once(storage, monkeypatch):
+    saves = []
+    original = storage._save_index
+    monkeypatch.setattr(storage, "_save_index", lambda: saves.append(1) or original())
+    with storage.batch():
+        a = storage.create(Entry(type=EntryType.note, content="A"))
+        b = storage.create(Entry(type=EntryType.note, content="B"))
+        storage.update(a.id, EntryUpdate(status=EntryStatus.completed))
+        storage.add_relation(a.id, b.id)
+        storage.delete(b.id)
+        assert saves == []
+    assert saves == [1]
+
+    reopened = JSONStorage(str(storage.data_path))
+    reopened.initialize()
+    assert [e.id for e in reopened.list(EntryFilter())] == [a.id]
+    assert reopened.list(EntryFilter(status=EntryStatus.completed))[0].related_entries == [b.id]
+
+def test_batch_journal_keeps_records_on_error(test_data_path):
+    store = JSONStorage(str(test_data_path), index_mode="journal")
+    store.initialize()
+    with pytest.raises(RuntimeError):
+        with store.batch():
+            entry = store.create(Entry(type=EntryType.note, content="Kept"))
+            raise RuntimeError("boom")
+    reopened = JSONStorage(str(test_data_path), index_mode="journal")
+    reopened.initialize()
+    assert reopened.get(entry.id) is not None
+    assert [e.id for e in reopened.list(EntryFilter())] == [entry.id]
@@ -1,20 +1,36 @@
+import atexit
+from typing import Optional
+
 from flask import Flask
 from flask_cors import CORS
 from ..config import settings
+from ..storage.base import StorageInterface
+from ..storage.factory import create_storage
 from .errors import errors_bp
-from .routes import bp as api_bp
+from .routes import bp as api_bp, STORAGE_EXTENSION
+
+def create_app(config_object=None, storage: Optional[StorageInterface] = None):
+    """Build the Flask app.
 
-def create_app(config_object=None):
+    `storage` defaults to the backend selected by settings.STORAGE_TYPE,
+    initialized once here and closed when the process exits. A storage
+    passed in is used as is and stays owned by the caller.
+    """
     # Configure logging first
     settings.configure_logging()
     
     app = Flask(__name__)
     
     # Enable CORS
-    CORS(app, resources={r"/api/*": {"origins": settings.CORS_ORIGINS}})
+    CORS(app, resources={r"/api/*": {"origins": settings.CORS_ORIGINS}}, expose_headers=["X-Next-Cursor"])
     
     if config_object:
         app.config.from_object(config_object)
+
+    if storage is None:
+        storage = create_storage(settings)
+        atexit.register(storage.close)
+    app.extensions[STORAGE_EXTENSION] = storage
         
     app.register_blueprint(errors_bp)
     app.register_blueprint(api_bp)
@@ -20,7 +20,7 @@ def handle_workpad_error(e):
 
 @errors_bp.app_errorhandler(PydanticValidationError)
 def handle_pydantic_error(e):
-    return jsonify({"error": "Validation error", "details": e.errors()}), 400
+    return jsonify({"error": "Validation error", "details": e.errors(include_context=False)}), 400
 
 @errors_bp.app_errorhandler(HTTPException)
 def handle_http_exception(e):
@@ -1,21 +1,15 @@
 from flask import Blueprint, request, jsonify, current_app
-from ..models import EntryCreate, EntryUpdate, EntryFilter, ContextItemCreate
-from ..service import WorkpadService
-from ..storage.json_storage import JSONStorage
+from ..models import EntryCreate, EntryUpdate, EntryFilter, ContextItemCreate, BatchRequest
+from ..enums import Interval, HistogramGroup
+from ..service import MAX_GRAPH_DEPTH, WorkpadService
+
+STORAGE_EXTENSION = "workpad_storage"
 
 bp = Blueprint('api', __name__, url_prefix='/api/v1')
 
 def get_service() -> WorkpadService:
-    # In a real app, use dependency injection or g
-    # For now, simple instantiation per request or global if stateless?
-    # Service is stateless but storage is stateful (files).
-    # We can rely on settings.
-    from ..config import settings
-    storage = JSONStorage(settings.DATA_PATH)
-    # Optimization: storage.initialize() should be called once on app startup, 
-    # but here safe to call or rely on it being idempotent.
-    storage.initialize()
-    return WorkpadService(storage)
+    # The service is stateless; the storage is built once by create_app()
+    return WorkpadService(current_app.extensions[STORAGE_EXTENSION])
 
 @bp.route('/health', methods=['GET'])
 def health():
@@ -30,10 +24,8 @@ def create_entry():
     entry = service.create_entry(entry_create)
     return jsonify(entry.model_dump(mode='json')), 201
 
-@bp.route('/entries', methods=['GET'])
-def list_entries():
-    service = get_service()
-    # Parse query params to EntryFilter
+def filter_args() -> dict:
+    """EntryFilter fields from the query string."""
     # This is a bit manual, ideally pydantic can parse dict from args
     # But request.args is ImmutableMultiDict.
     args = request.args.to_dict()
@@ -41,10 +33,38 @@ def list_entries():
     tags = request.args.getlist('tags')
     if tags:
         args['tags'] = tags
+    return args
+
+@bp.route('/entries', methods=['GET'])
+def list_entries():
+    service = get_service()
+    args = filter_args()
+    # ?fields=id,type,status projects the response onto those fields
+    if 'fields' in args:
+        args['fields'] = [f for f in args['fields'].split(',') if f]
         
     filters = EntryFilter(**args)
     entries = service.list_entries(filters)
-    return jsonify([e.model_dump(mode='json') for e in entries]), 200
+    include = set(filters.fields) if filters.fields else None
+    response = jsonify([e.model_dump(mode='json', include=include) for e in entries])
+    # Pass back as ?cursor= to fetch the next page
+    next_cursor = service.next_cursor(filters, entries)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response, 200
+
+@bp.route('/entries/batch-get', methods=['POST'])
+def get_entries():
+    service = get_service()
+    ids = (request.get_json() or {}).get('ids')
+    if not isinstance(ids, list) or not all(isinstance(i, str) for i in ids):
+        return jsonify({"error": "'ids' must be a list of entry ids"}), 400
+    entries = service.get_entries(ids)
+    found = {e.id for e in entries}
+    return jsonify({
+        "entries": [e.model_dump(mode='json') for e in entries],
+        "missing": [i for i in dict.fromkeys(ids) if i not in found]
+    }), 200
 
 @bp.route('/entries/<entry_id>', methods=['GET'])
 def get_entry(entry_id):
@@ -98,9 +118,59 @@ def remove_relation(entry_id, related_id):
     service.remove_relation(entry_id, related_id)
     return '', 204
 
+# --- Batch ---
+
+@bp.route('/batch', methods=['POST'])
+def apply_batch():
+    service = get_service()
+    batch = BatchRequest(**(request.get_json() or {}))
+    return jsonify({"results": service.apply_batch(batch.operations)}), 200
+
+# --- Relation graph ---
+
+@bp.route('/entries/<entry_id>/graph', methods=['GET'])
+def get_graph(entry_id):
+    service = get_service()
+    depth = request.args.get('depth', 1, type=int)
+    return jsonify(service.get_neighborhood(entry_id, depth)), 200
+
+@bp.route('/graph/path', methods=['GET'])
+def find_path():
+    service = get_service()
+    source_id = request.args.get('from')
+    target_id = request.args.get('to')
+    if not source_id or not target_id:
+        return jsonify({"error": "Both 'from' and 'to' are required"}), 400
+    max_depth = request.args.get('max_depth', MAX_GRAPH_DEPTH, type=int)
+    path = service.find_path(source_id, target_id, max_depth)
+    if path is None:
+        return jsonify({"error": "No path found"}), 404
+    return jsonify({"path": path, "length": len(path) - 1}), 200
+
+@bp.route('/graph/components', methods=['GET'])
+def get_components():
+    service = get_service()
+    return jsonify(service.get_components()), 200
+
 # --- Stats ---
 
 @bp.route('/stats', methods=['GET'])
 def get_stats():
     service = get_service()
-    return jsonify(service.get_stats()), 200
+    # Same filters as GET /entries; no filters counts the whole store
+    args = filter_args()
+    filters = EntryFilter(**args) if args else None
+    return jsonify(service.get_stats(filters)), 200
+
+@bp.route('/stats/histogram', methods=['GET'])
+def get_histogram():
+    service = get_service()
+    # ?interval=hour|day|week|month&group_by=type|status plus the GET /entries filters
+    args = filter_args()
+    try:
+        interval = Interval(args.pop('interval', Interval.day.value))
+        group_by = HistogramGroup(args.pop('group_by')) if 'group_by' in args else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    buckets = service.get_histogram(interval, EntryFilter(**args), group_by)
+    return jsonify([b.model_dump(mode='json') for b in buckets]), 200
@@ -14,6 +14,31 @@ class Settings:
         self.STORAGE_TYPE = "json"
         self.LOG_LEVEL = "INFO"
         self.CORS_ORIGINS = "*"
+        # Compression codec per backend: "none", "zlib" or "lzma"
+        self.JSON_COMPRESSION = "none"
+        self.SQLITE_COMPRESSION = "none"
+        self.COMPRESSION_MIN_BYTES = 4096
+        # Store repeated context payloads once, by hash
+        self.DEDUP_CONTEXT = False
+        # SQLite connection profile ("safe", "balanced", "fast", "none") and
+        # PRAGMA overrides as "name=value,name=value"
+        self.SQLITE_PROFILE = "balanced"
+        self.SQLITE_PRAGMAS = ""
+        # Several server processes (e.g. gunicorn workers) share DATA_PATH;
+        # the JSON backend then coordinates them through a lock file.
+        # Opt-in: a single process does not need the locking
+        self.MULTIPROCESS = False
+        # JSON backend: index persistence ("journal" or "snapshot"; journal is
+        # required with MULTIPROCESS), directory layout ("monthly", "sharded",
+        # or empty for the one the store records) and entry cache bounds
+        self.JSON_INDEX_MODE = "journal"
+        self.JSON_LAYOUT = ""
+        self.JSON_CACHE_ENTRIES = 0
+        self.JSON_CACHE_BYTES = 64 * 1024 * 1024
+        # Word index for search (JSON backend; SQLite always has one), and
+        # whether searches also match context item content
+        self.SEARCH_INDEX = False
+        self.SEARCH_CONTEXT = False
         
         # Load from config.yaml if present
         self._load_from_yaml()
@@ -23,6 +48,19 @@ class Settings:
         self.STORAGE_TYPE = os.environ.get("WORKPAD_STORAGE_TYPE", self.STORAGE_TYPE)
         self.LOG_LEVEL = os.environ.get("WORKPAD_LOG_LEVEL", self.LOG_LEVEL)
         self.CORS_ORIGINS = os.environ.get("WORKPAD_CORS_ORIGINS", self.CORS_ORIGINS)
+        self.JSON_COMPRESSION = os.environ.get("WORKPAD_JSON_COMPRESSION", self.JSON_COMPRESSION)
+        self.SQLITE_COMPRESSION = os.environ.get("WORKPAD_SQLITE_COMPRESSION", self.SQLITE_COMPRESSION)
+        self.COMPRESSION_MIN_BYTES = int(os.environ.get("WORKPAD_COMPRESSION_MIN_BYTES", self.COMPRESSION_MIN_BYTES))
+        self.DEDUP_CONTEXT = os.environ.get("WORKPAD_DEDUP_CONTEXT", str(self.DEDUP_CONTEXT)).lower() in ("1", "true", "yes")
+        self.SQLITE_PROFILE = os.environ.get("WORKPAD_SQLITE_PROFILE", self.SQLITE_PROFILE)
+        self.SQLITE_PRAGMAS = os.environ.get("WORKPAD_SQLITE_PRAGMAS", self.SQLITE_PRAGMAS)
+        self.MULTIPROCESS = os.environ.get("WORKPAD_MULTIPROCESS", str(self.MULTIPROCESS)).lower() in ("1", "true", "yes")
+        self.JSON_INDEX_MODE = os.environ.get("WORKPAD_JSON_INDEX_MODE", self.JSON_INDEX_MODE)
+        self.JSON_LAYOUT = os.environ.get("WORKPAD_JSON_LAYOUT", self.JSON_LAYOUT)
+        self.JSON_CACHE_ENTRIES = int(os.environ.get("WORKPAD_JSON_CACHE_ENTRIES", self.JSON_CACHE_ENTRIES))
+        self.JSON_CACHE_BYTES = int(os.environ.get("WORKPAD_JSON_CACHE_BYTES", self.JSON_CACHE_BYTES))
+        self.SEARCH_INDEX = os.environ.get("WORKPAD_SEARCH_INDEX", str(self.SEARCH_INDEX)).lower() in ("1", "true", "yes")
+        self.SEARCH_CONTEXT = os.environ.get("WORKPAD_SEARCH_CONTEXT", str(self.SEARCH_CONTEXT)).lower() in ("1", "true", "yes")
 
     def _load_from_yaml(self):
         config_path = Path("config.yaml")
@@ -34,6 +72,19 @@ class Settings:
                     self.STORAGE_TYPE = config.get("storage_type", self.STORAGE_TYPE)
                     self.LOG_LEVEL = config.get("log_level", self.LOG_LEVEL)
                     self.CORS_ORIGINS = config.get("cors_origins", self.CORS_ORIGINS)
+                    self.JSON_COMPRESSION = config.get("json_compression", self.JSON_COMPRESSION)
+                    self.SQLITE_COMPRESSION = config.get("sqlite_compression", self.SQLITE_COMPRESSION)
+                    self.COMPRESSION_MIN_BYTES = config.get("compression_min_bytes", self.COMPRESSION_MIN_BYTES)
+                    self.DEDUP_CONTEXT = config.get("dedup_context", self.DEDUP_CONTEXT)
+                    self.SQLITE_PROFILE = config.get("sqlite_profile", self.SQLITE_PROFILE)
+                    self.SQLITE_PRAGMAS = config.get("sqlite_pragmas", self.SQLITE_PRAGMAS)
+                    self.MULTIPROCESS = config.get("multiprocess", self.MULTIPROCESS)
+                    self.JSON_INDEX_MODE = config.get("json_index_mode", self.JSON_INDEX_MODE)
+                    self.JSON_LAYOUT = config.get("json_layout", self.JSON_LAYOUT)
+                    self.JSON_CACHE_ENTRIES = config.get("json_cache_entries", self.JSON_CACHE_ENTRIES)
+                    self.JSON_CACHE_BYTES = config.get("json_cache_bytes", self.JSON_CACHE_BYTES)
+                    self.SEARCH_INDEX = config.get("search_index", self.SEARCH_INDEX)
+                    self.SEARCH_CONTEXT = config.get("search_context", self.SEARCH_CONTEXT)
             except Exception as e:
                 print(f"Warning: Failed to load config.yaml: {e}")
 
@@ -23,3 +23,21 @@ class ContextType(str, Enum):
     url = "url"
     commit = "commit"
     note = "note"
+
+class SortBy(str, Enum):
+    timestamp = "timestamp"
+    relevance = "relevance" # Full-text rank of `search`; backends without one fall back to timestamp
+
+class TagsMode(str, Enum):
+    any = "any" # Entries with at least one of the tags
+    all = "all" # Entries with every tag
+
+class Interval(str, Enum):
+    hour = "hour"
+    day = "day"
+    week = "week" # ISO weeks, starting on Monday
+    month = "month"
+
+class HistogramGroup(str, Enum):
+    type = "type"
+    status = "status"
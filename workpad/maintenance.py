@@ -0,0 +1,63 @@
+"""
+Offline maintenance commands for Workpad stores.
+
+Usage:
+    python -m workpad.maintenance rebuild-search-index ./data [--include-context] [--backend sqlite]
+    python -m workpad.maintenance migrate-layout ./data --layout sharded
+
+Stop the API (and any other writer) before running them.
+"""
+import argparse
+import sys
+from typing import List, Optional
+
+from .storage.json_storage import JSONStorage, LAYOUTS
+from .storage.sqlite_storage import SQLiteStorage
+
+
+def rebuild_search_index(args) -> None:
+    if args.backend == "sqlite":
+        storage = SQLiteStorage(args.data_path, search_context=args.include_context)
+        storage.initialize()
+        count = storage.rebuild_search_index()
+    else:
+        storage = JSONStorage(args.data_path, search_index=True, search_context=args.include_context)
+        storage.initialize()
+        storage.rebuild_search_index()
+        count = len(storage._index)
+    print(f"Indexed {count} entries")
+
+
+def migrate_layout(args) -> None:
+    storage = JSONStorage(args.data_path)
+    storage.initialize()
+    moved = storage.migrate_layout(args.layout)
+    print(f"Moved {moved} entry files to the {args.layout} layout")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m workpad.maintenance", description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("rebuild-search-index", help="Rebuild the full-text search index")
+    p.add_argument("data_path")
+    p.add_argument("--include-context", action="store_true", help="Also index context item content")
+    p.add_argument("--backend", choices=("json", "sqlite"), default="json")
+    p.set_defaults(func=rebuild_search_index)
+
+    p = commands.add_parser("migrate-layout", help="Move JSON storage entry files to another directory layout")
+    p.add_argument("data_path")
+    p.add_argument("--layout", choices=LAYOUTS, required=True)
+    p.set_defaults(func=migrate_layout)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    args.func(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
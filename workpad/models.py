@@ -1,9 +1,9 @@
 from datetime import datetime
-from typing import List, Optional, Dict
-from pydantic import BaseModel, Field, ConfigDict, field_validator
+from typing import Annotated, List, Literal, Optional, Dict, Tuple, Union
+from pydantic import BaseModel, Field, ConfigDict, field_validator, model_validator
 
-from .enums import EntryType, EntryStatus, ContextType
-from .utils import generate_uuid, now_utc
+from .enums import EntryType, EntryStatus, ContextType, SortBy, TagsMode
+from .utils import generate_uuid, now_utc, decode_cursor
 
 class ContextItem(BaseModel):
     id: str = Field(default_factory=generate_uuid)
@@ -55,12 +55,108 @@ class EntryUpdate(BaseModel):
     context_items: Optional[List[ContextItem]] = None
     related_entries: Optional[List[str]] = None
 
+class EntrySummary(BaseModel):
+    """The indexed fields of an entry, listed without loading its content."""
+    id: str
+    timestamp: datetime
+    type: EntryType
+    status: EntryStatus
+    tags: List[str] = Field(default_factory=list)
+
+SUMMARY_FIELDS = frozenset(EntrySummary.model_fields)
+
+class EntryStats(BaseModel):
+    """Counts over the entries matching a filter, from StorageInterface.aggregate()."""
+    total: int = 0
+    by_type: Dict[str, int] = Field(default_factory=dict)
+    by_status: Dict[str, int] = Field(default_factory=dict)
+    by_tag: Dict[str, int] = Field(default_factory=dict)
+    oldest: Optional[datetime] = None
+    newest: Optional[datetime] = None
+
+class HistogramBucket(BaseModel):
+    """Entries whose timestamp falls in [start, start + interval), from StorageInterface.histogram()."""
+    start: datetime
+    count: int = 0
+    groups: Dict[str, int] = Field(default_factory=dict) # Per type or status, when grouped
+
 class EntryFilter(BaseModel):
     type: Optional[EntryType] = None
     status: Optional[EntryStatus] = None
     tags: Optional[List[str]] = None
+    tags_mode: TagsMode = TagsMode.any
     search: Optional[str] = None
     from_date: Optional[datetime] = None
     to_date: Optional[datetime] = None
     limit: int = Field(default=100, ge=1, le=1000)
     offset: int = Field(default=0, ge=0)
+    sort_by: SortBy = SortBy.timestamp
+    # Keyset pagination: return entries after this position (see utils.encode_cursor)
+    cursor: Optional[str] = None
+    # Entry fields to return; None returns whole entries
+    fields: Optional[List[str]] = None
+
+    @field_validator('fields')
+    def validate_fields(cls, v):
+        if v is not None:
+            unknown = set(v) - set(Entry.model_fields)
+            if unknown:
+                raise ValueError(f"Unknown entry fields: {sorted(unknown)}")
+        return v
+
+    @field_validator('cursor')
+    def validate_cursor(cls, v):
+        if v is not None:
+            decode_cursor(v)
+        return v
+
+    @model_validator(mode='after')
+    def check_cursor_order(self):
+        if self.cursor is not None and self.sort_by != SortBy.timestamp:
+            raise ValueError("cursor pagination requires sort_by=timestamp")
+        return self
+
+    @property
+    def after(self) -> Optional[Tuple[datetime, str]]:
+        """The decoded cursor: (timestamp, id) of the last entry already returned."""
+        return decode_cursor(self.cursor) if self.cursor is not None else None
+
+    @property
+    def summary_only(self) -> bool:
+        """True if the requested fields can be answered from an EntrySummary."""
+        return self.fields is not None and set(self.fields) <= SUMMARY_FIELDS
+
+# --- Batch writes ---
+
+MAX_BATCH_OPERATIONS = 1000
+
+class CreateOperation(BaseModel):
+    op: Literal["create"]
+    data: EntryCreate
+
+class UpdateOperation(BaseModel):
+    op: Literal["update"]
+    id: str
+    data: EntryUpdate
+
+class DeleteOperation(BaseModel):
+    op: Literal["delete"]
+    id: str
+
+class AddContextOperation(BaseModel):
+    op: Literal["add_context"]
+    id: str
+    data: ContextItemCreate
+
+class AddRelationOperation(BaseModel):
+    op: Literal["add_relation"]
+    id: str
+    related_id: str
+
+BatchOperation = Annotated[
+    Union[CreateOperation, UpdateOperation, DeleteOperation, AddContextOperation, AddRelationOperation],
+    Field(discriminator="op")
+]
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation] = Field(min_length=1, max_length=MAX_BATCH_OPERATIONS)
@@ -1,13 +1,25 @@
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Union
 from datetime import datetime, timezone
 
+from pydantic import ValidationError as PydanticValidationError
+
 from .models import (
-    Entry, EntryCreate, EntryUpdate, EntryFilter, 
+    Entry, EntryCreate, EntryUpdate, EntryFilter, EntrySummary, HistogramBucket,
+    BatchOperation, CreateOperation, UpdateOperation, DeleteOperation, AddContextOperation, AddRelationOperation,
     ContextItem, ContextItemCreate, 
     EntryType, EntryStatus
 )
+from .enums import SortBy, Interval, HistogramGroup
+from .utils import encode_cursor, bucket_start, next_bucket
 from .storage.base import StorageInterface
-from .errors import NotFoundError, ValidationError
+from .errors import NotFoundError, ValidationError, WorkpadError
+
+# Upper bound on hops for graph traversals, which otherwise may visit the whole store
+MAX_GRAPH_DEPTH = 10
+# Upper bound on the ids of one get_entries() call
+MAX_BATCH_IDS = 1000
+# Upper bound on the buckets of one histogram, counting the empty ones filled in
+MAX_HISTOGRAM_BUCKETS = 10000
 
 class WorkpadService:
     def __init__(self, storage: StorageInterface):
@@ -15,8 +27,7 @@ class WorkpadService:
 
     # --- CRUD Operations ---
 
-    def create_entry(self, data: EntryCreate) -> Entry:
-        """Create a new entry."""
+    def _build_entry(self, data: EntryCreate) -> Entry:
         # Convert ContextItemCreate list to ContextItem list
         context_items = []
         if data.context_items:
@@ -28,15 +39,21 @@ class WorkpadService:
                     metadata=item.metadata or {}
                 ))
 
-        entry = Entry(
+        return Entry(
             type=data.type,
             content=data.content,
             context_items=context_items,
             tags=data.tags or [],
             metadata=data.metadata or {}
         )
-        
-        return self.storage.create(entry)
+
+    def create_entry(self, data: EntryCreate) -> Entry:
+        """Create a new entry."""
+        return self.storage.create(self._build_entry(data))
+
+    def create_entries(self, data: List[EntryCreate]) -> List[Entry]:
+        """Create several entries in one storage batch."""
+        return self.storage.create_many([self._build_entry(d) for d in data])
 
     def get_entry(self, entry_id: str) -> Entry:
         """Get an entry by ID. Raises NotFoundError if not found."""
@@ -45,10 +62,28 @@ class WorkpadService:
             raise NotFoundError(f"Entry {entry_id} not found")
         return entry
 
-    def list_entries(self, filters: EntryFilter) -> List[Entry]:
-        """List entries matching filters."""
+    def get_entries(self, entry_ids: List[str]) -> List[Entry]:
+        """Get several entries at once, in the order given. Missing ids are skipped."""
+        if len(entry_ids) > MAX_BATCH_IDS:
+            raise ValidationError(f"At most {MAX_BATCH_IDS} ids per request")
+        return self.storage.get_many(entry_ids)
+
+    def list_entries(self, filters: EntryFilter) -> List[Union[Entry, EntrySummary]]:
+        """List entries matching filters.
+
+        If `filters.fields` only asks for summary fields, summaries are
+        returned and entry content is never loaded.
+        """
+        if filters.summary_only:
+            return self.storage.list_summaries(filters)
         return self.storage.list(filters)
 
+    def next_cursor(self, filters: EntryFilter, page: List[Union[Entry, EntrySummary]]) -> Optional[str]:
+        """Cursor for the page after `page`, or None if it was the last one."""
+        if len(page) < filters.limit or filters.sort_by != SortBy.timestamp:
+            return None
+        return encode_cursor(page[-1].timestamp, page[-1].id)
+
     def update_entry(self, entry_id: str, data: EntryUpdate) -> Entry:
         """Update an existing entry."""
         # Check existence (implicitly done by update usually, but let's be safe)
@@ -73,8 +108,6 @@ class WorkpadService:
 
     def add_context(self, entry_id: str, data: ContextItemCreate) -> ContextItem:
         """Add a context item to an entry."""
-        entry = self.get_entry(entry_id)
-        
         new_item = ContextItem(
             type=data.type,
             source=data.source,
@@ -82,25 +115,18 @@ class WorkpadService:
             metadata=data.metadata or {}
         )
         
-        entry.context_items.append(new_item)
-        
-        # Persist using update
-        self.storage.update(entry_id, EntryUpdate(context_items=entry.context_items))
+        if not self.storage.add_context(entry_id, new_item):
+            raise NotFoundError(f"Entry {entry_id} not found")
         
         return new_item
 
     def remove_context(self, entry_id: str, context_id: str) -> bool:
         """Remove a context item from an entry."""
-        entry = self.get_entry(entry_id)
+        if self.storage.remove_context(entry_id, context_id):
+            return True
         
-        initial_count = len(entry.context_items)
-        entry.context_items = [item for item in entry.context_items if item.id != context_id]
-        
-        if len(entry.context_items) == initial_count:
-            return False # Context item not found
-            
-        self.storage.update(entry_id, EntryUpdate(context_items=entry.context_items))
-        return True
+        self.get_entry(entry_id) # Raises NotFoundError if the entry itself is missing
+        return False # Context item not found
 
     # --- Relations ---
 
@@ -109,86 +135,173 @@ class WorkpadService:
         if entry_id == related_id:
             raise ValidationError("Cannot link entry to itself")
             
-        entry1 = self.get_entry(entry_id)
-        entry2 = self.get_entry(related_id)
-        
-        updated1 = False
-        updated2 = False
+        with self.storage.batch():
+            # Check both ends first, so a missing entry leaves nothing to undo
+            found = {e.id: e for e in self.storage.get_many([entry_id, related_id])}
+            for eid in (entry_id, related_id):
+                if eid not in found:
+                    raise NotFoundError(f"Entry {eid} not found")
+            linked = related_id in found[entry_id].related_entries
+
+            if not self.storage.add_relation(entry_id, related_id):
+                raise NotFoundError(f"Entry {entry_id} not found")
+            if not self.storage.add_relation(related_id, entry_id):
+                # Deleted in the meantime: undo the first link, unless it was there before
+                if not linked:
+                    self.storage.remove_relation(entry_id, related_id)
+                raise NotFoundError(f"Entry {related_id} not found")
 
-        if related_id not in entry1.related_entries:
-            entry1.related_entries.append(related_id)
-            updated1 = True
-        
-        if entry_id not in entry2.related_entries:
-            entry2.related_entries.append(entry_id)
-            updated2 = True
-            
-        if updated1:
-            self.storage.update(entry_id, EntryUpdate(related_entries=entry1.related_entries))
-        if updated2:
-            self.storage.update(related_id, EntryUpdate(related_entries=entry2.related_entries))
-        
         return True
 
     def remove_relation(self, entry_id: str, related_id: str) -> bool:
         """Remove a bidirectional relation."""
-        entry1 = self.get_entry(entry_id)
+        if not self.storage.remove_relation(entry_id, related_id):
+            raise NotFoundError(f"Entry {entry_id} not found")
         
-        # We try to get entry2, but if it doesn't exist, we still clean up entry1
-        try:
-            entry2 = self.storage.get(related_id)
-        except Exception:
-            entry2 = None
-            
-        updated1 = False
-        if related_id in entry1.related_entries:
-            entry1.related_entries.remove(related_id)
-            updated1 = True
-            
-        if updated1:
-             self.storage.update(entry_id, EntryUpdate(related_entries=entry1.related_entries))
-
-        if entry2:
-            updated2 = False
-            if entry_id in entry2.related_entries:
-                entry2.related_entries.remove(entry_id)
-                updated2 = True
-            
-            if updated2:
-                self.storage.update(related_id, EntryUpdate(related_entries=entry2.related_entries))
+        # The related entry may already be gone; clean up its side if not
+        self.storage.remove_relation(related_id, entry_id)
             
         return True
 
+    # --- Batch ---
+
+    def apply_batch(self, operations: List[BatchOperation]) -> List[Dict]:
+        """Apply create/update/delete/add_context/add_relation operations in order.
+
+        Every operation is validated before any is applied; an invalid one
+        rejects the whole batch with a ValidationError. The rest run inside
+        one storage batch (a group commit where the backend supports it),
+        with consecutive creates written by a single create_many(). A
+        failing operation does not stop the others; each gets a result dict
+        with "op", "ok" and either "id" or "error"/"type".
+        """
+        built: Dict[int, Entry] = {}
+        for i, op in enumerate(operations):
+            if isinstance(op, CreateOperation):
+                try:
+                    built[i] = self._build_entry(op.data)
+                except PydanticValidationError as e:
+                    raise ValidationError(f"Operation {i}: {e}")
+            elif isinstance(op, AddRelationOperation) and op.id == op.related_id:
+                raise ValidationError(f"Operation {i}: Cannot link entry to itself")
+
+        results: List[Dict] = []
+        with self.storage.batch():
+            i = 0
+            while i < len(operations):
+                op = operations[i]
+                if isinstance(op, CreateOperation):
+                    run = []
+                    while i < len(operations) and isinstance(operations[i], CreateOperation):
+                        run.append(built[i])
+                        i += 1
+                    try:
+                        self.storage.create_many(run)
+                        results.extend({"op": "create", "ok": True, "id": e.id} for e in run)
+                    except WorkpadError as e:
+                        results.extend(self._batch_error("create", e) for _ in run)
+                    continue
+                try:
+                    results.append(dict(self._apply_operation(op), op=op.op, ok=True))
+                except WorkpadError as e:
+                    results.append(self._batch_error(op.op, e))
+                i += 1
+        return results
+
+    def _apply_operation(self, op: BatchOperation) -> Dict:
+        if isinstance(op, UpdateOperation):
+            if self.storage.update(op.id, op.data) is None:
+                raise NotFoundError(f"Entry {op.id} not found")
+        elif isinstance(op, DeleteOperation):
+            if not self.storage.delete(op.id):
+                raise NotFoundError(f"Entry {op.id} not found")
+        elif isinstance(op, AddContextOperation):
+            return {"id": op.id, "context_id": self.add_context(op.id, op.data).id}
+        elif isinstance(op, AddRelationOperation):
+            self.add_relation(op.id, op.related_id)
+        return {"id": op.id}
+
+    @staticmethod
+    def _batch_error(op: str, error: WorkpadError) -> Dict:
+        return {"op": op, "ok": False, "error": str(error), "type": error.__class__.__name__}
+
+    # --- Relation graph ---
+
+    def _check_depth(self, depth: int):
+        if not 0 <= depth <= MAX_GRAPH_DEPTH:
+            raise ValidationError(f"Depth must be between 0 and {MAX_GRAPH_DEPTH}")
+
+    def get_neighborhood(self, entry_id: str, depth: int = 1) -> Dict:
+        """Entries within `depth` relation hops of an entry, and the relations between them."""
+        self._check_depth(depth)
+        distances = self.storage.neighborhood(entry_id, depth)
+        if not distances:
+            raise NotFoundError(f"Entry {entry_id} not found")
+        edges = {
+            tuple(sorted((a, b)))
+            for a, adjacent in self.storage.neighbors(distances).items()
+            for b in adjacent if b in distances
+        }
+        return {
+            "root": entry_id,
+            "depth": depth,
+            "nodes": [{"id": eid, "depth": d} for eid, d in sorted(distances.items(), key=lambda n: (n[1], n[0]))],
+            "edges": [list(e) for e in sorted(edges)]
+        }
+
+    def find_path(self, source_id: str, target_id: str, max_depth: int = MAX_GRAPH_DEPTH) -> Optional[List[str]]:
+        """Entry ids along a shortest relation path, or None if the entries are not connected within max_depth hops."""
+        self._check_depth(max_depth)
+        found = self.storage.neighbors([source_id, target_id])
+        for eid in (source_id, target_id):
+            if eid not in found:
+                raise NotFoundError(f"Entry {eid} not found")
+        return self.storage.shortest_path(source_id, target_id, max_depth)
+
+    def get_components(self) -> List[List[str]]:
+        """Groups of entries linked by relations, largest first."""
+        return self.storage.connected_components()
+
     # --- Stats ---
 
-    def get_stats(self) -> Dict:
-        """Get statistics about entries."""
-        # Using list with empty filter to get all index metadata (if implementation optimized)
-        # JSONStorage implementation reads all metadata.json matches.
-        all_entries = self.storage.list(EntryFilter())
-        
-        stats = {
-            "total_entries": len(all_entries),
-            "by_type": {},
-            "by_status": {},
-            "date_range": {"oldest": None, "newest": None}
+    def get_stats(self, filters: Optional[EntryFilter] = None) -> Dict:
+        """Get statistics about entries, optionally only those matching `filters`."""
+        stats = self.storage.aggregate(filters)
+        return {
+            "total_entries": stats.total,
+            "by_type": stats.by_type,
+            "by_status": stats.by_status,
+            "by_tag": stats.by_tag,
+            "date_range": {
+                "oldest": stats.oldest.isoformat() if stats.oldest else None,
+                "newest": stats.newest.isoformat() if stats.newest else None
+            }
         }
-        
-        if not all_entries:
-            return stats
-            
-        timestamps = []
-        for e in all_entries:
-            t = e.type.value
-            stats["by_type"][t] = stats["by_type"].get(t, 0) + 1
-            
-            s = e.status.value
-            stats["by_status"][s] = stats["by_status"].get(s, 0) + 1
-            
-            timestamps.append(e.timestamp)
-            
-        if timestamps:
-            stats["date_range"]["oldest"] = min(timestamps).isoformat()
-            stats["date_range"]["newest"] = max(timestamps).isoformat()
-            
-        return stats
+
+    def get_histogram(self, interval: Interval, filters: Optional[EntryFilter] = None,
+                      group_by: Optional[HistogramGroup] = None) -> List[HistogramBucket]:
+        """Entries per time bucket, oldest first.
+
+        Buckets run from filters.from_date (or the first entry) to
+        filters.to_date (or the last entry); empty ones are included with a
+        count of 0.
+        """
+        filters = filters or EntryFilter()
+        if filters.from_date and filters.to_date and filters.from_date > filters.to_date:
+            raise ValidationError("from_date must not be after to_date")
+        counted = self.storage.histogram(interval, filters, group_by)
+        if not counted and not (filters.from_date and filters.to_date):
+            return []
+        start = bucket_start(filters.from_date or counted[0].start, interval)
+        end = bucket_start(filters.to_date or counted[-1].start, interval)
+
+        by_start = {b.start: b for b in counted}
+        buckets = []
+        while start <= end:
+            if len(buckets) >= MAX_HISTOGRAM_BUCKETS:
+                raise ValidationError(
+                    f"Histogram would have more than {MAX_HISTOGRAM_BUCKETS} buckets; use a larger interval or a shorter range"
+                )
+            buckets.append(by_start.get(start) or HistogramBucket(start=start))
+            start = next_bucket(start, interval)
+        return buckets
@@ -1,7 +1,74 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
-from ..models import Entry, EntryFilter, EntryUpdate
+from ..models import ContextItem, Entry, EntryFilter, EntryStats, EntrySummary, EntryUpdate, HistogramBucket
+from ..enums import HistogramGroup, Interval, SortBy
+from ..utils import bucket_start, encode_cursor
+
+def apply_update(entry: Entry, updates: EntryUpdate) -> bool:
+    """Apply the fields set in `updates` to `entry` in place. Returns True if anything changed."""
+    updated = False
+    if updates.content is not None:
+        entry.content = updates.content
+        updated = True
+    if updates.type is not None:
+        entry.type = updates.type
+        updated = True
+    if updates.status is not None:
+        entry.status = updates.status
+        updated = True
+    if updates.tags is not None:
+        entry.tags = updates.tags
+        updated = True
+    if updates.metadata is not None:
+        entry.metadata.update(updates.metadata)
+        updated = True
+    if updates.context_items is not None:
+        entry.context_items = updates.context_items
+        updated = True
+    if updates.related_entries is not None:
+        entry.related_entries = updates.related_entries
+        updated = True
+    return updated
+
+def tally(summaries: Iterable[EntrySummary]) -> EntryStats:
+    """Aggregate counts over summaries (see StorageInterface.aggregate)."""
+    stats = EntryStats()
+    for s in summaries:
+        stats.total += 1
+        stats.by_type[s.type.value] = stats.by_type.get(s.type.value, 0) + 1
+        stats.by_status[s.status.value] = stats.by_status.get(s.status.value, 0) + 1
+        for tag in dict.fromkeys(s.tags):
+            stats.by_tag[tag] = stats.by_tag.get(tag, 0) + 1
+        if stats.oldest is None or s.timestamp < stats.oldest:
+            stats.oldest = s.timestamp
+        if stats.newest is None or s.timestamp > stats.newest:
+            stats.newest = s.timestamp
+    return stats
+
+def count_buckets(rows: Iterable[Tuple[datetime, Optional[str]]], interval: Interval) -> List[HistogramBucket]:
+    """Histogram of (timestamp, group) rows, oldest bucket first. Empty buckets are left out."""
+    buckets: Dict[datetime, HistogramBucket] = {}
+    for timestamp, group in rows:
+        start = bucket_start(timestamp, interval)
+        bucket = buckets.get(start)
+        if bucket is None:
+            bucket = buckets[start] = HistogramBucket(start=start)
+        bucket.count += 1
+        if group is not None:
+            bucket.groups[group] = bucket.groups.get(group, 0) + 1
+    return [buckets[start] for start in sorted(buckets)]
+
+def summarize(entry: Entry) -> EntrySummary:
+    return EntrySummary(
+        id=entry.id,
+        timestamp=entry.timestamp,
+        type=entry.type,
+        status=entry.status,
+        tags=entry.tags
+    )
 
 class StorageInterface(ABC):
     """Abstract interface for storage backends."""
@@ -11,21 +78,45 @@ class StorageInterface(ABC):
         """Initialize the storage (create directories, tables, etc)."""
         pass
 
+    def close(self) -> None:
+        """Release files, connections and other resources. The storage is not used afterwards."""
+        pass
+
     @abstractmethod
     def create(self, entry: Entry) -> Entry:
         """Persist a new entry."""
         pass
 
+    def create_many(self, entries: List[Entry]) -> List[Entry]:
+        """Persist several new entries. Backends override this to batch the writes."""
+        return [self.create(entry) for entry in entries]
+
     @abstractmethod
     def get(self, entry_id: str) -> Optional[Entry]:
         """Retrieve an entry by ID."""
         pass
 
+    def get_many(self, entry_ids: Iterable[str]) -> List[Entry]:
+        """Get several entries, in the order asked for. Missing ids are skipped and repeated ones returned once.
+
+        Backends override this to fetch them in one query or in parallel.
+        """
+        entries = (self.get(entry_id) for entry_id in dict.fromkeys(entry_ids))
+        return [entry for entry in entries if entry is not None]
+
     @abstractmethod
     def list(self, filters: EntryFilter) -> List[Entry]:
         """List entries matching filters."""
         pass
 
+    def list_summaries(self, filters: EntryFilter) -> List[EntrySummary]:
+        """List the summaries of entries matching filters.
+
+        Backends override this to answer from their indexes without loading
+        entry content or context items.
+        """
+        return [summarize(entry) for entry in self.list(filters)]
+
     @abstractmethod
     def update(self, entry_id: str, updates: EntryUpdate) -> Optional[Entry]:
         """Update an existing entry."""
@@ -35,3 +126,175 @@ class StorageInterface(ABC):
     def delete(self, entry_id: str) -> bool:
         """Delete an entry."""
         pass
+
+    def _pages(self, filters: EntryFilter, fetch):
+        """Yield every page of fetch(filters) from the first, following cursors."""
+        filters = filters.model_copy(update={
+            "limit": 1000, "offset": 0, "cursor": None, "fields": None, "sort_by": SortBy.timestamp
+        })
+        while True:
+            page = fetch(filters)
+            yield page
+            if len(page) < filters.limit:
+                return
+            filters = filters.model_copy(update={"cursor": encode_cursor(page[-1].timestamp, page[-1].id)})
+
+    def aggregate(self, filters: Optional[EntryFilter] = None) -> EntryStats:
+        """Counts by type, status and tag plus the timestamp range of the entries matching `filters`.
+
+        Pagination (limit, offset, cursor) is ignored. The default pages through list_summaries().
+        """
+        pages = self._pages(filters or EntryFilter(), self.list_summaries)
+        return tally(s for page in pages for s in page)
+
+    def histogram(self, interval: Interval, filters: Optional[EntryFilter] = None,
+                  group_by: Optional[HistogramGroup] = None) -> List[HistogramBucket]:
+        """Entries matching `filters` counted per UTC time bucket, oldest first, optionally split by type or status.
+
+        Pagination is ignored and empty buckets are left out. The default pages through list_summaries().
+        """
+        pages = self._pages(filters or EntryFilter(), self.list_summaries)
+        return count_buckets(
+            ((s.timestamp, getattr(s, group_by.value).value if group_by else None) for page in pages for s in page),
+            interval
+        )
+
+    @contextmanager
+    def batch(self):
+        """Group the writes made inside the block.
+
+        Writes still apply one by one, and stay applied if the block raises.
+        Backends override this to persist shared state once, at the end.
+        """
+        yield
+
+    # Fine-grained mutations. The defaults read and rewrite the whole entry;
+    # backends override them with atomic, incremental writes.
+
+    def add_context(self, entry_id: str, item: ContextItem) -> bool:
+        """Append a context item. Returns False if the entry does not exist."""
+        entry = self.get(entry_id)
+        if entry is None:
+            return False
+        self.update(entry_id, EntryUpdate(context_items=entry.context_items + [item]))
+        return True
+
+    def remove_context(self, entry_id: str, context_id: str) -> bool:
+        """Remove a context item. Returns False if the entry or the item does not exist."""
+        entry = self.get(entry_id)
+        if entry is None:
+            return False
+        remaining = [c for c in entry.context_items if c.id != context_id]
+        if len(remaining) == len(entry.context_items):
+            return False
+        self.update(entry_id, EntryUpdate(context_items=remaining))
+        return True
+
+    def add_relation(self, entry_id: str, related_id: str) -> bool:
+        """Add `related_id` to the entry's relations (one direction). Returns False if the entry does not exist."""
+        entry = self.get(entry_id)
+        if entry is None:
+            return False
+        if related_id not in entry.related_entries:
+            self.update(entry_id, EntryUpdate(related_entries=entry.related_entries + [related_id]))
+        return True
+
+    def remove_relation(self, entry_id: str, related_id: str) -> bool:
+        """Remove `related_id` from the entry's relations. Returns False if the entry does not exist."""
+        entry = self.get(entry_id)
+        if entry is None:
+            return False
+        if related_id in entry.related_entries:
+            self.update(entry_id, EntryUpdate(related_entries=[r for r in entry.related_entries if r != related_id]))
+        return True
+
+    # Relation graph. Relations are treated as undirected edges between
+    # existing entries, whichever side stores them. The defaults scan every
+    # entry for each BFS level; backends override neighbors() and
+    # relation_edges() with an index, or the traversals with native queries.
+
+    def neighbors(self, entry_ids: Iterable[str]) -> Dict[str, Set[str]]:
+        """Adjacent entry ids of each existing entry in `entry_ids`."""
+        result = {entry_id: set() for entry_id in entry_ids if self.get(entry_id) is not None}
+        for a, b in self.relation_edges():
+            if a in result:
+                result[a].add(b)
+            if b in result:
+                result[b].add(a)
+        return result
+
+    def relation_edges(self) -> Iterator[Tuple[str, str]]:
+        """Every (entry_id, related_id) edge between existing entries."""
+        ids = set()
+        entries = []
+        for page in self._pages(EntryFilter(), self.list):
+            ids.update(e.id for e in page)
+            entries.extend((e.id, e.related_entries) for e in page if e.related_entries)
+        for entry_id, related in entries:
+            for related_id in related:
+                if related_id in ids and related_id != entry_id:
+                    yield entry_id, related_id
+
+    def neighborhood(self, entry_id: str, depth: int) -> Dict[str, int]:
+        """Entries within `depth` hops of `entry_id`, mapped to their distance. Empty if it does not exist."""
+        distances = {entry_id: 0} if self.neighbors([entry_id]) else {}
+        frontier = set(distances)
+        for hop in range(1, depth + 1):
+            if not frontier:
+                break
+            found = set().union(*self.neighbors(frontier).values()) - distances.keys()
+            distances.update(dict.fromkeys(found, hop))
+            frontier = found
+        return distances
+
+    def shortest_path(self, source_id: str, target_id: str, max_depth: int) -> Optional[List[str]]:
+        """Entry ids along a shortest path from source to target, or None if none within max_depth hops."""
+        if not self.neighbors([source_id]):
+            return None
+        parents: Dict[str, Optional[str]] = {source_id: None}
+        frontier = [source_id]
+        for _ in range(max_depth + 1):
+            if target_id in parents:
+                path = [target_id]
+                while parents[path[-1]] is not None:
+                    path.append(parents[path[-1]])
+                return path[::-1]
+            adjacent = self.neighbors(frontier)
+            if not adjacent:
+                break
+            next_frontier = []
+            for node in frontier:
+                for neighbor in sorted(adjacent.get(node, ())):
+                    if neighbor not in parents:
+                        parents[neighbor] = node
+                        next_frontier.append(neighbor)
+            frontier = next_frontier
+        return None
+
+    def connected_components(self) -> List[List[str]]:
+        """Groups of entries connected by relations, largest first. Entries without relations are left out."""
+        return components(self.relation_edges())
+
+def components(edges: Iterable[Tuple[str, str]]) -> List[List[str]]:
+    """Connected components of an edge list (union-find), largest first, each sorted."""
+    parent: Dict[str, str] = {}
+
+    def find(node):
+        root = node
+        while parent[root] != root:
+            root = parent[root]
+        while parent[node] != root:
+            parent[node], node = root, parent[node]
+        return root
+
+    for a, b in edges:
+        parent.setdefault(a, a)
+        parent.setdefault(b, b)
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[ra] = rb
+
+    groups: Dict[str, List[str]] = {}
+    for node in parent:
+        groups.setdefault(find(node), []).append(node)
+    return sorted((sorted(g) for g in groups.values()), key=lambda g: (-len(g), g[0]))
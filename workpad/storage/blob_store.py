@@ -0,0 +1,93 @@
+import hashlib
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from .compression import compress, decompress
+from .journal import IndexJournal, put_record, delete_record
+
+
+def content_key(content: str) -> str:
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+class BlobStore:
+    """Content-addressed, reference-counted store for context payloads.
+
+    Each payload is written once to blobs/<key[:2]>/<key> where key is its
+    SHA-256, behind a one-byte marker saying whether it is compressed.
+    Reference counts live in blob_refs.json plus blob_refs.log (an
+    IndexJournal); a blob is deleted when its count drops to zero.
+    """
+
+    def __init__(self, data_path: Path, compression: Optional[str] = None, compression_min_bytes: int = 4096,
+                 lock=None):
+        self.blobs_path = Path(data_path) / "blobs"
+        self.compression = compression
+        self.compression_min_bytes = compression_min_bytes
+        self._journal = IndexJournal(Path(data_path) / "blob_refs.json", Path(data_path) / "blob_refs.log", lock=lock)
+        self.refcounts: Dict[str, int] = {}
+
+    @property
+    def pending(self) -> int:
+        return self._journal.pending
+
+    def load(self) -> None:
+        self.refcounts = self._journal.load()
+
+    def sync(self) -> None:
+        """Apply reference changes other processes appended to the log."""
+        records = self._journal.changes()
+        if records is None:
+            self.load()
+            return
+        for record in records:
+            IndexJournal.apply(self.refcounts, record)
+
+    def checkpoint(self) -> None:
+        self._journal.checkpoint(self.refcounts)
+
+    def _path(self, key: str) -> Path:
+        return self.blobs_path / key[:2] / key
+
+    def incref(self, contents: Iterable[str]) -> List[str]:
+        """Take a reference on each payload, writing new blobs. Returns their keys."""
+        keys = []
+        records = []
+        for content in contents:
+            key = content_key(content)
+            count = self.refcounts.get(key, 0)
+            if count == 0:
+                path = self._path(key)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                data = b'\x00' + content.encode('utf-8')
+                if self.compression and len(data) > self.compression_min_bytes:
+                    data = b'\x01' + compress(data[1:], self.compression)
+                tmp = path.with_name(key + '.tmp')
+                with open(tmp, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp, path)
+            self.refcounts[key] = count + 1
+            records.append(put_record(key, count + 1))
+            keys.append(key)
+        self._journal.append(records)
+        return keys
+
+    def decref(self, keys: Iterable[str]) -> None:
+        records = []
+        for key in keys:
+            count = self.refcounts.get(key, 0) - 1
+            if count > 0:
+                self.refcounts[key] = count
+                records.append(put_record(key, count))
+            else:
+                self.refcounts.pop(key, None)
+                self._path(key).unlink(missing_ok=True)
+                records.append(delete_record(key))
+        self._journal.append(records)
+
+    def read(self, key: str) -> str:
+        with open(self._path(key), 'rb') as f:
+            data = f.read()
+        payload = decompress(data[1:]) if data[:1] == b'\x01' else data[1:]
+        return payload.decode('utf-8')
@@ -0,0 +1,83 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from ..models import Entry
+
+# (entry, file mtime_ns, file size)
+_CacheSlot = Tuple[Entry, int, int]
+
+
+class EntryCache:
+    """LRU cache of validated entries, bounded by count and by bytes.
+
+    Slots are keyed by entry id and remember the mtime/size of the file they
+    were read from; a lookup whose file no longer matches is a miss. The
+    byte budget is accounted using the on-disk file size. Safe to share
+    between threads.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._slots: "OrderedDict[str, _CacheSlot]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def get(self, entry_id: str, stat: os.stat_result) -> Optional[Entry]:
+        with self._lock:
+            slot = self._slots.get(entry_id)
+            if slot is None or slot[1] != stat.st_mtime_ns or slot[2] != stat.st_size:
+                if slot is not None:
+                    self._drop(entry_id)
+                self.misses += 1
+                return None
+            self._slots.move_to_end(entry_id)
+            self.hits += 1
+            entry = slot[0]
+        # Callers mutate what they get back. Cached entries are never changed, so copy outside the lock
+        return entry.model_copy(deep=True)
+
+    def put(self, entry: Entry, stat: os.stat_result) -> None:
+        copy = entry.model_copy(deep=True)
+        with self._lock:
+            self._drop(entry.id)
+            if stat.st_size > self.max_bytes:
+                return
+            self._slots[entry.id] = (copy, stat.st_mtime_ns, stat.st_size)
+            self._bytes += stat.st_size
+            while len(self._slots) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, _, size) = self._slots.popitem(last=False)
+                self._bytes -= size
+                self.evictions += 1
+
+    def invalidate(self, entry_id: str) -> None:
+        with self._lock:
+            self._drop(entry_id)
+
+    def _drop(self, entry_id: str) -> None:
+        slot = self._slots.pop(entry_id, None)
+        if slot is not None:
+            self._bytes -= slot[2]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._slots.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._slots),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
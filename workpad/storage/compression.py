@@ -0,0 +1,40 @@
+import lzma
+import zlib
+from typing import Optional
+
+CODECS = ("zlib", "lzma")
+
+_XZ_MAGIC = b"\xfd7zXZ\x00"
+
+
+def check_codec(codec: Optional[str]) -> Optional[str]:
+    """Validate a codec name; "none" and "" mean no compression."""
+    if codec in (None, "", "none"):
+        return None
+    if codec not in CODECS:
+        raise ValueError(f"Unknown compression codec {codec!r}, expected one of {CODECS} or 'none'")
+    return codec
+
+
+def compress(data: bytes, codec: str) -> bytes:
+    if codec == "zlib":
+        return zlib.compress(data, 6)
+    if codec == "lzma":
+        return lzma.compress(data)
+    raise ValueError(f"Unknown compression codec {codec!r}")
+
+
+def is_compressed(data: bytes) -> bool:
+    if data.startswith(_XZ_MAGIC):
+        return True
+    # zlib header: CM=8 (deflate) and a header checksum divisible by 31
+    return len(data) >= 2 and data[0] & 0x0F == 8 and (data[0] << 8 | data[1]) % 31 == 0
+
+
+def decompress(data: bytes) -> bytes:
+    """Decode data written by compress(); anything else is returned unchanged."""
+    if data.startswith(_XZ_MAGIC):
+        return lzma.decompress(data)
+    if is_compressed(data):
+        return zlib.decompress(data)
+    return data
@@ -0,0 +1,78 @@
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict
+
+from .base import StorageInterface
+
+if TYPE_CHECKING:
+    from ..config import Settings
+
+StorageBuilder = Callable[["Settings"], StorageInterface]
+
+# Backend name (settings.STORAGE_TYPE) -> function building an uninitialized storage
+STORAGE_BACKENDS: Dict[str, StorageBuilder] = {}
+
+
+def register_backend(name: str, builder: StorageBuilder) -> None:
+    """Make a backend available as STORAGE_TYPE=name. Replaces any earlier registration."""
+    STORAGE_BACKENDS[name] = builder
+
+
+def create_storage(settings: "Settings") -> StorageInterface:
+    """Build and initialize the backend selected by settings.STORAGE_TYPE."""
+    builder = STORAGE_BACKENDS.get(settings.STORAGE_TYPE)
+    if builder is None:
+        raise ValueError(
+            f"Unknown storage type {settings.STORAGE_TYPE!r}, expected one of {tuple(STORAGE_BACKENDS)}"
+        )
+    storage = builder(settings)
+    storage.initialize()
+    return storage
+
+
+def _json_storage(settings: "Settings") -> StorageInterface:
+    from .json_storage import JSONStorage
+    if settings.MULTIPROCESS and settings.JSON_INDEX_MODE != "journal":
+        # Every write would rewrite the whole index and make every other worker reload it
+        raise ValueError(
+            f"JSON_INDEX_MODE={settings.JSON_INDEX_MODE!r} cannot be shared by several processes; "
+            f"use 'journal' or turn MULTIPROCESS off"
+        )
+    return JSONStorage(
+        settings.DATA_PATH,
+        index_mode=settings.JSON_INDEX_MODE,
+        search_index=settings.SEARCH_INDEX,
+        search_context=settings.SEARCH_CONTEXT,
+        cache_entries=settings.JSON_CACHE_ENTRIES,
+        cache_bytes=settings.JSON_CACHE_BYTES,
+        layout=settings.JSON_LAYOUT or None,
+        compression=settings.JSON_COMPRESSION,
+        compression_min_bytes=settings.COMPRESSION_MIN_BYTES,
+        dedup_context=settings.DEDUP_CONTEXT,
+        multiprocess=settings.MULTIPROCESS
+    )
+
+
+def _sqlite_storage(settings: "Settings") -> StorageInterface:
+    from .sqlite_storage import SQLiteStorage, parse_pragmas
+    Path(settings.DATA_PATH).mkdir(parents=True, exist_ok=True)
+    return SQLiteStorage(
+        settings.DATA_PATH,
+        compression=settings.SQLITE_COMPRESSION,
+        compression_min_bytes=settings.COMPRESSION_MIN_BYTES,
+        dedup_context=settings.DEDUP_CONTEXT,
+        search_context=settings.SEARCH_CONTEXT,
+        profile=settings.SQLITE_PROFILE,
+        pragmas=parse_pragmas(settings.SQLITE_PRAGMAS)
+    )
+
+
+def _segment_storage(settings: "Settings") -> StorageInterface:
+    from .segment_storage import SegmentStorage
+    if settings.MULTIPROCESS:
+        raise ValueError("The segment backend keeps its index in one process; turn MULTIPROCESS off to use it")
+    return SegmentStorage(settings.DATA_PATH)
+
+
+register_backend("json", _json_storage)
+register_backend("sqlite", _sqlite_storage)
+register_backend("segment", _segment_storage)
@@ -0,0 +1,136 @@
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+
+def parse_timestamp(value: str) -> datetime:
+    """Parse an ISO timestamp from an index, treating naive values as UTC."""
+    return as_utc(datetime.fromisoformat(value))
+
+
+def as_utc(dt: datetime) -> datetime:
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt
+
+
+class TimestampIndex:
+    """Entry ids kept sorted by (timestamp, id), with timestamps pre-parsed.
+
+    Date ranges are located by bisection and walked newest first, so callers
+    can stop as soon as they have enough matches.
+    """
+
+    def __init__(self):
+        self._keys: List[Tuple[datetime, str]] = []
+        self._by_id: Dict[str, datetime] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def load(self, items: Iterable[Tuple[str, datetime]]) -> None:
+        self._by_id = {entry_id: as_utc(ts) for entry_id, ts in items}
+        self._keys = sorted((ts, entry_id) for entry_id, ts in self._by_id.items())
+
+    def add(self, entry_id: str, ts: datetime) -> None:
+        self.remove(entry_id)
+        ts = as_utc(ts)
+        self._by_id[entry_id] = ts
+        insort(self._keys, (ts, entry_id))
+
+    def remove(self, entry_id: str) -> None:
+        ts = self._by_id.pop(entry_id, None)
+        if ts is not None:
+            i = bisect_left(self._keys, (ts, entry_id))
+            del self._keys[i]
+
+    def timestamp(self, entry_id: str) -> Optional[datetime]:
+        return self._by_id.get(entry_id)
+
+    def oldest(self) -> Optional[datetime]:
+        return self._keys[0][0] if self._keys else None
+
+    def newest(self) -> Optional[datetime]:
+        return self._keys[-1][0] if self._keys else None
+
+    def _bounds(self, from_date: Optional[datetime], to_date: Optional[datetime],
+                before: Optional[Tuple[datetime, str]] = None) -> Tuple[int, int]:
+        lo = 0 if from_date is None else bisect_left(self._keys, (as_utc(from_date), ""))
+        # Every id sorts below chr(0x10FFFF), so this includes all keys at to_date
+        hi = len(self._keys) if to_date is None else bisect_right(self._keys, (as_utc(to_date), "\U0010ffff"))
+        if before is not None:
+            hi = min(hi, bisect_left(self._keys, (as_utc(before[0]), before[1])))
+        return lo, hi
+
+    def iter_desc(self, from_date: Optional[datetime] = None, to_date: Optional[datetime] = None,
+                  before: Optional[Tuple[datetime, str]] = None) -> Iterator[str]:
+        """Yield ids with from_date <= timestamp <= to_date, newest first.
+
+        `before` = (timestamp, id) starts strictly below that key, for cursor pagination.
+        """
+        lo, hi = self._bounds(from_date, to_date, before)
+        for i in range(hi - 1, lo - 1, -1):
+            yield self._keys[i][1]
+
+    def sort_desc(self, ids: Iterable[str], from_date: Optional[datetime] = None,
+                  to_date: Optional[datetime] = None, before: Optional[Tuple[datetime, str]] = None) -> List[str]:
+        """Order a subset of ids newest first, keeping those inside the date range (and below `before`).
+
+        Ids the index does not hold are dropped.
+        """
+        lo = as_utc(from_date) if from_date is not None else None
+        hi = as_utc(to_date) if to_date is not None else None
+        limit = (as_utc(before[0]), before[1]) if before is not None else None
+        keys = []
+        for eid in ids:
+            ts = self._by_id.get(eid)
+            if ts is None:
+                continue
+            if (lo is None or ts >= lo) and (hi is None or ts <= hi) and (limit is None or (ts, eid) < limit):
+                keys.append((ts, eid))
+        keys.sort(reverse=True)
+        return [eid for _, eid in keys]
+
+
+class PostingIndex:
+    """Maps each value of a field to the set of entry ids that have it."""
+
+    def __init__(self):
+        self._postings: Dict[str, Set[str]] = {}
+
+    def add(self, entry_id: str, values: Iterable[str]) -> None:
+        for value in values:
+            self._postings.setdefault(value, set()).add(entry_id)
+
+    def remove(self, entry_id: str, values: Iterable[str]) -> None:
+        for value in values:
+            ids = self._postings.get(value)
+            if ids is not None:
+                ids.discard(entry_id)
+                if not ids:
+                    del self._postings[value]
+
+    def clear(self) -> None:
+        self._postings = {}
+
+    def get(self, value: str) -> Set[str]:
+        return self._postings.get(value, set())
+
+    def counts(self) -> Dict[str, int]:
+        """Number of ids per value, without touching the ids."""
+        return {value: len(ids) for value, ids in self._postings.items()}
+
+    def union(self, values: Iterable[str]) -> Set[str]:
+        result: Set[str] = set()
+        for value in values:
+            result |= self.get(value)
+        return result
+
+
+def intersect(sets: List[Set[str]]) -> Set[str]:
+    """Intersect id sets, smallest first."""
+    sets = sorted(sets, key=len)
+    result = set(sets[0])
+    for s in sets[1:]:
+        if not result:
+            break
+        result &= s
+    return result
@@ -0,0 +1,159 @@
+import json
+import os
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class IndexJournal:
+    """A JSON snapshot of an index plus an append-only log of changes.
+
+    Each log line is a JSON record, either ``{"op": "put", "id": ..., "meta": {...}}``
+    or ``{"op": "del", "id": ...}``. Loading reads the snapshot and replays
+    the log on top of it. Replay is idempotent, so a crash between writing a
+    new snapshot and replacing the log loses nothing.
+
+    A checkpoint starts a new log whose first line is
+    ``{"op": "checkpoint", "gen": N}``. Readers in other processes remember
+    the generation and byte offset they have applied; `changes()` then
+    returns only the records appended since, or None once a checkpoint has
+    replaced the log and the snapshot must be reloaded.
+
+    Writers must hold the store lock and be up to date (see `changes()`)
+    before calling `append()` or `checkpoint()`. `lock`, when given, is the
+    store's file lock: `load()` holds it so a checkpoint by another process
+    cannot land between reading the snapshot and reading the log.
+    """
+
+    def __init__(self, snapshot_path: Path, log_path: Path, indent: Optional[int] = None, lock=None):
+        self.snapshot_path = Path(snapshot_path)
+        self.log_path = Path(log_path)
+        self.indent = indent
+        self.lock = lock
+        self.pending = 0  # Records in the log since the last checkpoint
+        self.generation = 0
+        self.offset = 0  # End of the last complete log line applied
+        self._snapshot_stat: Optional[Tuple[int, int, int]] = None
+
+    def _stat_snapshot(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = self.snapshot_path.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def load(self) -> Dict[str, dict]:
+        with self.lock or nullcontext():
+            return self._load()
+
+    def _load(self) -> Dict[str, dict]:
+        index: Dict[str, dict] = {}
+        self._snapshot_stat = self._stat_snapshot()
+        if self.snapshot_path.exists():
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+
+        self.generation = 0
+        self.offset = 0
+        self.pending = 0
+        if self.log_path.exists():
+            with open(self.log_path, 'rb') as f:
+                records = self._read_records(f)
+            for record in records:
+                self.apply(index, record)
+        return index
+
+    def _read_records(self, f) -> List[dict]:
+        """Read complete records from the current position, advancing self.offset."""
+        records = []
+        for line in f:
+            if not line.endswith(b'\n'):
+                break  # Being written, or torn by a crash
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            self.offset += len(line)
+            if record['op'] == 'checkpoint':
+                self.generation = record['gen']
+                continue
+            records.append(record)
+        self.pending += len(records)
+        return records
+
+    def changes(self) -> Optional[List[dict]]:
+        """Records appended by others since we last read, or None if the log was replaced."""
+        try:
+            f = open(self.log_path, 'rb')
+        except FileNotFoundError:
+            return [] if self.generation == 0 else None
+        with f:
+            first = f.readline()
+            generation = 0
+            if first.endswith(b'\n'):
+                header = json.loads(first)
+                if header['op'] == 'checkpoint':
+                    generation = header['gen']
+            if generation != self.generation:
+                return None
+            f.seek(self.offset)
+            return self._read_records(f)
+
+    def snapshot_changed(self) -> bool:
+        return self._stat_snapshot() != self._snapshot_stat
+
+    @staticmethod
+    def apply(index: Dict[str, dict], record: dict) -> None:
+        if record['op'] == 'put':
+            index[record['id']] = record['meta']
+        elif record['op'] == 'del':
+            index.pop(record['id'], None)
+
+    def append(self, records: Iterable[dict]) -> None:
+        data = ''.join(json.dumps(r, separators=(',', ':')) + '\n' for r in records).encode('utf-8')
+        if not data:
+            return
+        with open(self.log_path, 'ab') as f:
+            if f.tell() > self.offset:
+                # Torn record left by a crashed writer; drop it so it is not
+                # glued to ours
+                f.truncate(self.offset)
+                f.seek(self.offset)
+            f.write(data)
+            self.offset = f.tell()
+        self.pending += data.count(b'\n')
+
+    def checkpoint(self, index: Dict[str, dict], keep_log: bool = True) -> None:
+        """Write a full snapshot, then start a new log generation. Both replaces are atomic.
+
+        With keep_log=False (snapshot-only stores) the folded log is removed instead.
+        """
+        tmp_path = self.snapshot_path.with_name(self.snapshot_path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=self.indent)
+        os.replace(tmp_path, self.snapshot_path)
+        self._snapshot_stat = self._stat_snapshot()
+
+        if not keep_log:
+            self.log_path.unlink(missing_ok=True)
+            self.generation = 0
+            self.offset = 0
+            self.pending = 0
+            return
+
+        header = json.dumps({"op": "checkpoint", "gen": self.generation + 1}) + '\n'
+        tmp_path = self.log_path.with_name(self.log_path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(header)
+        os.replace(tmp_path, self.log_path)
+        self.generation += 1
+        self.offset = len(header.encode('utf-8'))
+        self.pending = 0
+
+
+def put_record(entry_id: str, meta: dict) -> dict:
+    return {"op": "put", "id": entry_id, "meta": meta}
+
+
+def delete_record(entry_id: str) -> dict:
+    return {"op": "del", "id": entry_id}
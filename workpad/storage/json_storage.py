@@ -1,202 +1,880 @@
+import hashlib
 import json
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
 from pathlib import Path
-from typing import List, Optional, Dict
+from typing import Callable, Dict, Iterator, Iterable, List, Optional, Set, Tuple
 from datetime import datetime, timezone
 
-from ..models import Entry, EntryFilter, EntryUpdate
+from ..models import ContextItem, Entry, EntryFilter, EntryStats, EntrySummary, EntryUpdate, HistogramBucket
+from ..enums import HistogramGroup, Interval, TagsMode
 from ..errors import StorageError, NotFoundError
-from .base import StorageInterface
+from .base import StorageInterface, apply_update, count_buckets
+from .journal import IndexJournal, put_record, delete_record
+from .search_index import SearchIndex
+from .cache import EntryCache
+from .indexes import TimestampIndex, PostingIndex, intersect, parse_timestamp
+from .locking import FileLock
+from .compression import check_codec, compress, decompress
+from .blob_store import BlobStore
+
+INDEX_MODES = ("snapshot", "journal")
+LAYOUTS = ("monthly", "sharded")
 
 class JSONStorage(StorageInterface):
-    def __init__(self, data_path: str):
+    def __init__(self, data_path: str, index_mode: str = "snapshot", compact_threshold: int = 10000,
+                 search_index: bool = False, search_context: bool = False,
+                 cache_entries: int = 0, cache_bytes: int = 64 * 1024 * 1024,
+                 layout: Optional[str] = None, multiprocess: bool = False,
+                 compression: Optional[str] = None, compression_min_bytes: int = 4096,
+                 dedup_context: bool = False, dedup_min_bytes: int = 1024, read_workers: int = 8):
+        """
+        index_mode:
+            "snapshot" rewrites metadata.json on every write (simple, O(N) per write).
+            "journal" appends each change to metadata.log and folds the log back
+            into metadata.json once it holds `compact_threshold` records.
+        search_index:
+            Maintain a word-level inverted index so `EntryFilter.search` is
+            answered without reading entry files. `search_context` also indexes
+            context item content. Once a store has an index, instances opened
+            without this flag keep it up to date as well.
+        cache_entries / cache_bytes:
+            Keep up to this many validated entries (and bytes of entry files)
+            in an in-process LRU cache. 0 disables the cache.
+        layout:
+            "monthly" stores entries/YYYY-MM/<id>.json. "sharded" stores
+            entries/<h[:2]>/<h[2:4]>/<id>.json with h = sha1(id), so a file's
+            location follows from its ID alone. The layout is recorded in
+            store.json; None uses the recorded one (or "monthly" for a new store).
+        multiprocess:
+            Share the store safely between processes (e.g. gunicorn workers).
+            Writes take an advisory lock on metadata.lock, and every operation
+            first applies index changes made by other processes: in journal
+            mode only the new log records, in snapshot mode a full reload when
+            metadata.json changed.
+        compression / compression_min_bytes:
+            "zlib" or "lzma" compresses entry files whose JSON is at least
+            `compression_min_bytes` long. Files are decoded transparently
+            on read, whatever the current setting.
+        dedup_context / dedup_min_bytes:
+            Store context item content of at least `dedup_min_bytes` bytes
+            once in a content-addressed blob store (blobs/), referenced by
+            hash from the entry file and reference-counted.
+        read_workers:
+            Threads reading the uncached entry files of a get_many() call in
+            parallel, from a pool kept until close(). 1 reads them one after
+            another. List pages are always read sequentially: for a few dozen
+            warm files, handing them to threads costs more than it saves.
+        """
+        if index_mode not in INDEX_MODES:
+            raise ValueError(f"Unknown index_mode {index_mode!r}, expected one of {INDEX_MODES}")
+        if layout is not None and layout not in LAYOUTS:
+            raise ValueError(f"Unknown layout {layout!r}, expected one of {LAYOUTS}")
         self.data_path = Path(data_path)
         self.entries_path = self.data_path / "entries"
         self.index_path = self.data_path / "metadata.json"
+        self.journal_path = self.data_path / "metadata.log"
+        self.store_path = self.data_path / "store.json"
+        self.layout = layout
+        self.compression = check_codec(compression)
+        self.compression_min_bytes = compression_min_bytes
+        self.dedup_context = dedup_context
+        self.dedup_min_bytes = dedup_min_bytes
+        self.read_workers = read_workers
+        self.index_mode = index_mode
+        self.compact_threshold = compact_threshold
+        self._lock = threading.RLock()
+        self._file_lock = FileLock(self.data_path / "metadata.lock") if multiprocess else None
+        # Reloads take the file lock, so they never mix a snapshot with a newer log
+        self._journal = IndexJournal(self.index_path, self.journal_path, indent=2, lock=self._file_lock)
         self._index: Dict[str, dict] = {}
+        self._timeline = TimestampIndex()
+        self._by_type = PostingIndex()
+        self._by_status = PostingIndex()
+        self._by_tag = PostingIndex()
+        self._by_related = PostingIndex()  # Related id -> ids that list it
+        self._search = SearchIndex(self.data_path, search_context, self._file_lock) if search_index else None
+        self._cache = EntryCache(cache_entries, cache_bytes) if cache_entries > 0 else None
+        # Always present so references written earlier stay readable
+        self._blobs = BlobStore(self.data_path, self.compression, compression_min_bytes, self._file_lock)
+        self._batch_records: Optional[List[dict]] = None  # Index records held back by batch()
+        self._readers: Optional[ThreadPoolExecutor] = None  # Started by the first parallel get_many()
 
     def initialize(self) -> None:
         try:
             self.entries_path.mkdir(parents=True, exist_ok=True)
-            if self.index_path.exists():
-                with open(self.index_path, 'r', encoding='utf-8') as f:
-                    self._index = json.load(f)
-            else:
-                self._index = {}
-                self._save_index()
+            with self._locked(refresh=False):
+                existed = self.index_path.exists()
+                self._reload_index()
+                self._blobs.load()
+                self._resolve_layout()
+                backfilled = self._backfill_relations()
+                # A leftover log is folded back in snapshot mode; in journal mode
+                # only once it is due for compaction.
+                if not existed or backfilled or (self._journal.pending and self.index_mode == "snapshot"):
+                    self._save_index()
+                elif self._journal.pending >= self.compact_threshold:
+                    self.compact()
+
+                self._open_search_index()
         except Exception as e:
             raise StorageError(f"Failed to initialize storage: {e}")
 
+    def _open_search_index(self):
+        """Load the search index if it is current, otherwise (re)build it.
+
+        store.json records the settings of an index that every write has kept
+        up to date. Once a store has one, instances opened without
+        `search_index` maintain it too, with the recorded settings.
+        """
+        recorded = self._read_store_info().get("search_index")
+        if self._search is None:
+            self._adopt_search_index(recorded)
+        elif self._search.exists() and recorded == {"context": self._search.include_context}:
+            self._search.load()
+        else:
+            # New index, one written by an older version, or other settings
+            self.rebuild_search_index()
+
+    def _adopt_search_index(self, recorded: Optional[dict]):
+        if recorded is not None and (self.data_path / "search_index.json").exists():
+            self._search = SearchIndex(self.data_path, recorded["context"], self._file_lock)
+            self._search.load()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._readers is not None:
+                self._readers.shutdown()
+                self._readers = None
+
+    # --- Concurrency ---
+
+    @contextmanager
+    def _locked(self, refresh: bool = True):
+        """Serialize writers across threads and, in multiprocess mode, processes."""
+        with self._lock:
+            if self._file_lock is None:
+                yield
+                return
+            with self._file_lock:
+                if refresh:
+                    self._refresh()
+                    if self._search is None and (self.data_path / "search_index.json").exists():
+                        # Another process has since built the search index
+                        self._adopt_search_index(self._read_store_info().get("search_index"))
+                yield
+
+    def _refresh(self):
+        """Apply index changes made by other processes since we last looked."""
+        if self._file_lock is None:
+            return
+        with self._lock:
+            if self.index_mode == "journal":
+                records = self._journal.changes()
+                if records is None:
+                    # Another process compacted the log
+                    self._reload_index()
+                else:
+                    for record in records:
+                        if record['op'] == 'put':
+                            self._set_meta(record['id'], record['meta'])
+                        else:
+                            self._drop_meta(record['id'])
+            elif self._journal.snapshot_changed():
+                self._reload_index()
+            if self._search is not None:
+                self._search.sync()
+            self._blobs.sync()
+
+    def _reload_index(self):
+        self._index = self._journal.load()
+        self._load_derived()
+
+    def _resolve_layout(self):
+        recorded = self._read_store_info().get("layout")
+        if recorded is None and self._index:
+            # Stores created before store.json existed
+            recorded = "monthly"
+
+        if recorded and self.layout and recorded != self.layout:
+            raise StorageError(
+                f"Store uses the {recorded!r} layout, not {self.layout!r}; "
+                f"run 'python -m workpad.maintenance migrate-layout' first"
+            )
+        self.layout = recorded or self.layout or "monthly"
+        if not self.store_path.exists():
+            self._update_store_info(layout=self.layout)
+
+    def _backfill_relations(self) -> int:
+        """Add the related ids to index entries written before they were indexed."""
+        missing = [eid for eid, meta in self._index.items() if 'related' not in meta]
+        for eid in missing:
+            entry = self._get(eid)
+            self._set_meta(eid, dict(self._index[eid], related=entry.related_entries if entry else []))
+        return len(missing)
+
+    def _read_store_info(self) -> dict:
+        if not self.store_path.exists():
+            return {}
+        with open(self.store_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _update_store_info(self, **settings):
+        """Merge `settings` into store.json; a None value removes the setting."""
+        info = self._read_store_info()
+        for key, value in settings.items():
+            if value is None:
+                info.pop(key, None)
+            else:
+                info[key] = value
+        tmp = self.store_path.with_suffix(".tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(info, f, indent=2)
+        os.replace(tmp, self.store_path)
+
     def _save_index(self):
-        with open(self.index_path, 'w', encoding='utf-8') as f:
-            json.dump(self._index, f, indent=2)
+        self._journal.checkpoint(self._index, keep_log=self.index_mode == "journal")
+
+    # In-memory structures derived from _index. All index changes go through
+    # _set_meta/_drop_meta so they stay in sync.
+
+    def _load_derived(self):
+        self._timeline.load((eid, parse_timestamp(meta['timestamp'])) for eid, meta in self._index.items())
+        for postings in (self._by_type, self._by_status, self._by_tag, self._by_related):
+            postings.clear()
+        for eid, meta in self._index.items():
+            self._post(eid, meta)
+
+    def _post(self, entry_id: str, meta: dict):
+        self._by_type.add(entry_id, [meta['type']])
+        self._by_status.add(entry_id, [meta['status']])
+        self._by_tag.add(entry_id, meta['tags'])
+        self._by_related.add(entry_id, meta.get('related', []))
+
+    def _unpost(self, entry_id: str, meta: dict):
+        self._by_type.remove(entry_id, [meta['type']])
+        self._by_status.remove(entry_id, [meta['status']])
+        self._by_tag.remove(entry_id, meta['tags'])
+        self._by_related.remove(entry_id, meta.get('related', []))
+
+    def _set_meta(self, entry_id: str, meta: dict):
+        old = self._index.get(entry_id)
+        if old is not None:
+            self._unpost(entry_id, old)
+        self._index[entry_id] = meta
+        self._post(entry_id, meta)
+        self._timeline.add(entry_id, parse_timestamp(meta['timestamp']))
+
+    def _drop_meta(self, entry_id: str):
+        meta = self._index.pop(entry_id, None)
+        if meta is not None:
+            self._unpost(entry_id, meta)
+            self._timeline.remove(entry_id)
+
+    def _commit_index(self, *records: dict):
+        """Persist index changes already applied to self._index."""
+        if self._batch_records is not None:
+            self._batch_records.extend(records)
+        elif self.index_mode == "journal":
+            self._journal.append(records)
+            if self._journal.pending >= self.compact_threshold:
+                self.compact()
+        else:
+            self._save_index()
+
+    @contextmanager
+    def batch(self):
+        """Group commit: hold the store lock and persist the index once, when the block ends.
+
+        In snapshot mode that is one metadata.json rewrite for the whole batch
+        instead of one per write.
+        """
+        with self._locked():
+            if self._batch_records is not None:
+                yield  # Nested
+                return
+            self._batch_records = []
+            try:
+                yield
+            finally:
+                records, self._batch_records = self._batch_records, None
+                if records:
+                    try:
+                        self._commit_index(*records)
+                    except Exception as e:
+                        raise StorageError(f"Failed to save index: {e}")
+
+    def _index_search(self, *entries: Entry):
+        if self._search is not None:
+            self._search.add_many(entries)
+            if self._search.pending >= self.compact_threshold:
+                self._search.checkpoint()
+
+    def _unindex_search(self, entry_id: str):
+        if self._search is not None:
+            self._search.remove(entry_id)
+
+    def _cache_store(self, entry: Entry, path: Path):
+        if self._cache is not None:
+            self._cache.put(entry, path.stat())
+
+    def cache_stats(self) -> Optional[Dict[str, int]]:
+        """Hit/miss/eviction counters of the entry cache, or None if disabled."""
+        return self._cache.stats() if self._cache is not None else None
+
+    def compact(self) -> None:
+        """Fold the index logs into fresh snapshots."""
+        try:
+            with self._locked():
+                self._save_index()
+                if self._search is not None:
+                    self._search.checkpoint()
+                if self._blobs.pending:
+                    self._blobs.checkpoint()
+        except Exception as e:
+            raise StorageError(f"Failed to compact index: {e}")
+
+    def rebuild_search_index(self) -> None:
+        """(Re)build the inverted index from the entry files."""
+        if self._search is None:
+            raise StorageError("Search index is not enabled for this storage")
+        try:
+            with self._locked():
+                # Not current until the rebuild has finished
+                self._update_store_info(search_index=None)
+                self._search.rebuild(e for e in (self._get(eid) for eid in list(self._index)) if e)
+                self._update_store_info(search_index={"context": self._search.include_context})
+        except StorageError:
+            raise
+        except Exception as e:
+            raise StorageError(f"Failed to rebuild search index: {e}")
     
+    def _write_entry_file(self, path: Path, entry: Entry):
+        """Write an entry file, taking blob references for deduplicated context."""
+        large = [
+            c for c in entry.context_items
+            if self.dedup_context and len(c.content.encode('utf-8')) >= self.dedup_min_bytes
+        ]
+        if large:
+            refs = dict(zip((c.id for c in large), self._blobs.incref(c.content for c in large)))
+            if self._blobs.pending >= self.compact_threshold:
+                self._blobs.checkpoint()
+            stored = entry.model_dump(mode='json')
+            for item in stored['context_items']:
+                if item['id'] in refs:
+                    item['content'] = ""
+                    item['content_ref'] = refs[item['id']]
+            data = json.dumps(stored, indent=2).encode('utf-8')
+        else:
+            data = entry.model_dump_json(indent=2).encode('utf-8')
+
+        if self.compression and len(data) >= self.compression_min_bytes:
+            if large:
+                compact = json.dumps(stored, separators=(',', ':')).encode('utf-8')
+            else:
+                compact = entry.model_dump_json().encode('utf-8')
+            data = compress(compact, self.compression)
+        # Readers take no lock: they must see the old file or the new one, never a partial one
+        tmp_path = path.with_name(path.name + '.tmp')
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+    def _read_entry_file(self, path: Path) -> Entry:
+        with open(path, 'rb') as f:
+            data = decompress(f.read())
+        if b'"content_ref"' not in data:
+            return Entry.model_validate_json(data)
+        stored = json.loads(data)
+        for item in stored['context_items']:
+            if 'content_ref' in item:
+                item['content'] = self._blobs.read(item.pop('content_ref'))
+        return Entry.model_validate(stored)
+
+    def _release_blobs(self, refs: List[str]):
+        if refs:
+            self._blobs.decref(refs)
+            if self._blobs.pending >= self.compact_threshold:
+                self._blobs.checkpoint()
+
+    def _file_refs(self, path: Path) -> List[str]:
+        """Blob references held by an entry file."""
+        if not self._blobs.refcounts:
+            return []
+        with open(path, 'rb') as f:
+            data = decompress(f.read())
+        if b'"content_ref"' not in data:
+            return []
+        return [c['content_ref'] for c in json.loads(data)['context_items'] if 'content_ref' in c]
+
+    def _layout_path(self, entry: Entry, layout: str) -> Path:
+        if layout == "sharded":
+            digest = hashlib.sha1(entry.id.encode('utf-8')).hexdigest()
+            return self.entries_path / digest[:2] / digest[2:4] / f"{entry.id}.json"
+        # entries/YYYY-MM/uuid.json
+        return self.entries_path / entry.timestamp.strftime("%Y-%m") / f"{entry.id}.json"
+
     def _get_entry_path(self, entry_id: str) -> Path:
-        # We could shard by date, but for now simple flat structure or yyyy-mm as per doc
-        # Doc suggested yyyy-mm. Let's try to look up date in index or just search?
-        # If we have index, we can store relative path there.
-        # But if we create, we need to decide where to put it.
-        # Let's check index first.
         meta = self._index.get(entry_id)
         if meta and 'path' in meta:
             return self.data_path / meta['path']
+
+        if self.layout == "sharded":
+            digest = hashlib.sha1(entry_id.encode('utf-8')).hexdigest()
+            return self.entries_path / digest[:2] / digest[2:4] / f"{entry_id}.json"
         
-        # Fallback search if not in index (should not happen if consistent)
+        # Monthly layout: fallback search if not in index (should not happen if consistent)
         matches = list(self.entries_path.rglob(f"{entry_id}.json"))
         if matches:
             return matches[0]
         return None
 
+    def _write_new(self, entry: Entry) -> dict:
+        """Write a new entry file and add it to the in-memory index."""
+        file_path = self._layout_path(entry, self.layout)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        # Save file
+        self._write_entry_file(file_path, entry)
+        self._cache_store(entry, file_path)
+        
+        # Update index
+        rel_path = file_path.relative_to(self.data_path)
+        self._set_meta(entry.id, {
+            "path": str(rel_path),
+            "timestamp": entry.timestamp.isoformat(),
+            "type": entry.type.value,
+            "status": entry.status.value,
+            "tags": entry.tags,
+            "related": entry.related_entries
+        })
+        return put_record(entry.id, self._index[entry.id])
+
     def create(self, entry: Entry) -> Entry:
         try:
-            # Determine path: entries/YYYY-MM/uuid.json
-            ym = entry.timestamp.strftime("%Y-%m")
-            folder = self.entries_path / ym
-            folder.mkdir(parents=True, exist_ok=True)
-            
-            file_path = folder / f"{entry.id}.json"
-            
-            # Save file
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(entry.model_dump_json(indent=2))
-            
-            # Update index
-            rel_path = file_path.relative_to(self.data_path)
-            self._index[entry.id] = {
-                "path": str(rel_path),
-                "timestamp": entry.timestamp.isoformat(),
-                "type": entry.type.value,
-                "status": entry.status.value,
-                "tags": entry.tags
-            }
-            self._save_index()
+            with self._locked():
+                self._commit_index(self._write_new(entry))
+                self._index_search(entry)
             return entry
         except Exception as e:
             raise StorageError(f"Failed to create entry: {e}")
 
+    def create_many(self, entries: List[Entry]) -> List[Entry]:
+        """Write all entry files, then flush the index once."""
+        try:
+            with self._locked():
+                records = [self._write_new(entry) for entry in entries]
+                self._commit_index(*records)
+                self._index_search(*entries)
+            return entries
+        except Exception as e:
+            raise StorageError(f"Failed to create entries: {e}")
+
     def get(self, entry_id: str) -> Optional[Entry]:
-        path = self._get_entry_path(entry_id)
-        if not path or not path.exists():
+        self._refresh()
+        return self._get(entry_id)
+
+    def _get(self, entry_id: str) -> Optional[Entry]:
+        # The index is read under the store lock, the file outside it
+        with self._lock:
+            path = self._get_entry_path(entry_id)
+        if not path:
             return None
-        
         try:
-            with open(path, 'r', encoding='utf-8') as f:
-                data = f.read()
-                return Entry.model_validate_json(data)
+            stat = path.stat()
+        except FileNotFoundError:
+            if self._cache is not None:
+                self._cache.invalidate(entry_id)
+            return None
+
+        if self._cache is not None:
+            cached = self._cache.get(entry_id, stat)
+            if cached is not None:
+                return cached
+
+        try:
+            entry = self._read_entry_file(path)
+            if self._cache is not None:
+                self._cache.put(entry, stat)
+            return entry
         except Exception as e:
             raise StorageError(f"Failed to read entry {entry_id}: {e}")
 
-    def list(self, filters: EntryFilter) -> List[Entry]:
-        results = []
-        # First filter by index to avoid reading all files
-        candidates = []
-        for eid, meta in self._index.items():
-            # Apply filters on metadata
-            if filters.type and meta['type'] != filters.type.value:
-                continue
-            if filters.status and meta['status'] != filters.status.value:
-                continue
-            if filters.tags:
-                if not any(tag in meta['tags'] for tag in filters.tags):
-                   continue
-            # Date filter
-            dt = datetime.fromisoformat(meta['timestamp'])
-            if filters.from_date and dt < filters.from_date:
+    def get_many(self, entry_ids: Iterable[str]) -> List[Entry]:
+        ids = list(dict.fromkeys(entry_ids))
+        self._refresh()
+        found = self._get_many(ids, parallel=True)
+        return [found[eid] for eid in ids if eid in found]
+
+    def _reader_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._readers is None:
+                self._readers = ThreadPoolExecutor(self.read_workers, thread_name_prefix="workpad-read")
+            return self._readers
+
+    def _get_many(self, entry_ids: Iterable[str], parallel: bool = False) -> Dict[str, Entry]:
+        """Like _get() for several ids: cache hits first, then the remaining files, read in parallel if asked."""
+        found: Dict[str, Entry] = {}
+        pending = []
+        with self._lock:
+            paths = [(eid, self._get_entry_path(eid)) for eid in dict.fromkeys(entry_ids)]
+        for eid, path in paths:
+            if not path:
                 continue
-            if filters.to_date and dt > filters.to_date:
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                if self._cache is not None:
+                    self._cache.invalidate(eid)
                 continue
-            
-            candidates.append(eid)
-        
-        # Sort by timestamp desc
-        candidates.sort(key=lambda x: self._index[x]['timestamp'], reverse=True)
-        
-        # Pagination - optimization: apply offset/limit on candidates
-        # BUT search requires reading content.
+            cached = self._cache.get(eid, stat) if self._cache is not None else None
+            if cached is not None:
+                found[eid] = cached
+            else:
+                pending.append((eid, path, stat))
+
+        def read(item):
+            try:
+                return self._read_entry_file(item[1])
+            except FileNotFoundError:
+                return None  # Deleted since the stat
+
+        try:
+            if parallel and len(pending) > 1 and self.read_workers > 1:
+                entries = list(self._reader_pool().map(read, pending))
+            else:
+                entries = [read(item) for item in pending]
+        except Exception as e:
+            raise StorageError(f"Failed to read entries: {e}")
+
+        # Worker threads only read files; the cache is filled here
+        for (eid, _, stat), entry in zip(pending, entries):
+            if entry is not None:
+                if self._cache is not None:
+                    self._cache.put(entry, stat)
+                found[eid] = entry
+        return found
+
+    def _filtered_ids(self, filters: EntryFilter, matched_ids: Optional[set] = None):
+        """Ids matching the index-level filters, newest first.
+
+        Type, status and tag filters are answered from posting lists. When
+        even the smallest list is selective, the intersection is sorted
+        directly; otherwise the timeline is walked newest first and checked
+        for membership in every list, so the caller can stop after a page
+        without the lists being copied.
+        """
+        sets = []
+        if filters.type:
+            sets.append(self._by_type.get(filters.type.value))
+        if filters.status:
+            sets.append(self._by_status.get(filters.status.value))
+        if filters.tags:
+            if filters.tags_mode == TagsMode.all:
+                sets.extend(self._by_tag.get(tag) for tag in filters.tags)
+            else:
+                sets.append(self._by_tag.union(filters.tags))
+        if matched_ids is not None:
+            sets.append(matched_ids)
+
+        after = filters.after
+        if not sets:
+            return self._timeline.iter_desc(filters.from_date, filters.to_date, after)
+        sets.sort(key=len)
+        if len(sets[0]) * 4 < len(self._timeline):
+            return self._timeline.sort_desc(intersect(sets), filters.from_date, filters.to_date, after)
+        return (
+            eid for eid in self._timeline.iter_desc(filters.from_date, filters.to_date, after)
+            if all(eid in s for s in sets)
+        )
+
+    def list(self, filters: EntryFilter) -> List[Entry]:
+        wanted = filters.offset + filters.limit
+        with self._lock:
+            self._refresh()
+            matched_ids = None
+            if filters.search and self._search is not None:
+                matched_ids = self._search.search(filters.search)
+            scan_content = bool(filters.search) and matched_ids is None
+            ids = self._filtered_ids(filters, matched_ids)
+            candidates = list(ids) if scan_content else list(islice(ids, wanted))
         
-        if filters.search:
-            # If search is requested, we must read files.
-            # We can still use the filtered candidates list as a starting point.
+        if scan_content:
+            # Without the search index, search needs the entry content
+            needle = filters.search.lower()
             matched_entries = []
             for eid in candidates:
-                entry = self.get(eid)
-                if entry and filters.search.lower() in entry.content.lower():
+                entry = self._get(eid)
+                if entry and needle in entry.content.lower():
                     matched_entries.append(entry)
-            
-            # Now apply pagination on matched_entries
-            start = filters.offset
-            end = filters.offset + filters.limit
-            return matched_entries[start:end]
+                    if len(matched_entries) >= wanted:
+                        break
+            return matched_entries[filters.offset:wanted]
         else:
-            # No search, just apply pagination on candidates and load them
-            start = filters.offset
-            end = filters.offset + filters.limit
-            paginated_ids = candidates[start:end]
-            
-            entries = []
-            for eid in paginated_ids:
-                entry = self.get(eid)
-                if entry:
-                    entries.append(entry)
-            return entries
+            return self._load_page(candidates, filters)
+
+    def list_summaries(self, filters: EntryFilter) -> List[EntrySummary]:
+        """Answered from the index alone, unless a search has to scan entry content."""
+        with self._lock:
+            self._refresh()
+            matched_ids = None
+            if filters.search:
+                if self._search is not None:
+                    matched_ids = self._search.search(filters.search)
+                if matched_ids is None:
+                    return super().list_summaries(filters)
+            ids = self._filtered_ids(filters, matched_ids)
+            return [
+                EntrySummary(
+                    id=eid,
+                    timestamp=self._timeline.timestamp(eid),
+                    type=self._index[eid]['type'],
+                    status=self._index[eid]['status'],
+                    tags=self._index[eid].get('tags', [])
+                )
+                for eid in islice(ids, filters.offset, filters.offset + filters.limit)
+            ]
+
+    def _index_matches(self, filters: EntryFilter) -> Optional[Iterator[str]]:
+        """Ids matching `filters` apart from pagination, newest first, or None if a search must scan entry content."""
+        matched_ids = None
+        if filters.search:
+            if self._search is not None:
+                matched_ids = self._search.search(filters.search)
+            if matched_ids is None:
+                return None
+        return iter(self._filtered_ids(filters.model_copy(update={"cursor": None}), matched_ids))
+
+    def aggregate(self, filters: Optional[EntryFilter] = None) -> EntryStats:
+        """Unfiltered counts come straight from the posting lists, so their cost does not grow with the store.
+
+        Filtered counts walk the matching index entries; only a search
+        without the search index falls back to reading entry files.
+        """
+        with self._lock:
+            self._refresh()
+            if filters is None or not (filters.type or filters.status or filters.tags or filters.search
+                                       or filters.from_date or filters.to_date):
+                return EntryStats(
+                    total=len(self._index),
+                    by_type=self._by_type.counts(),
+                    by_status=self._by_status.counts(),
+                    by_tag=self._by_tag.counts(),
+                    oldest=self._timeline.oldest(),
+                    newest=self._timeline.newest()
+                )
+            ids = self._index_matches(filters)
+            if ids is None:
+                return super().aggregate(filters)
+            stats = EntryStats()
+            for eid in ids:
+                meta = self._index[eid]
+                stats.total += 1
+                stats.by_type[meta['type']] = stats.by_type.get(meta['type'], 0) + 1
+                stats.by_status[meta['status']] = stats.by_status.get(meta['status'], 0) + 1
+                for tag in dict.fromkeys(meta['tags']):
+                    stats.by_tag[tag] = stats.by_tag.get(tag, 0) + 1
+                # Ids come newest first
+                stats.oldest = self._timeline.timestamp(eid)
+                if stats.newest is None:
+                    stats.newest = stats.oldest
+            return stats
+
+    def histogram(self, interval: Interval, filters: Optional[EntryFilter] = None,
+                  group_by: Optional[HistogramGroup] = None) -> List[HistogramBucket]:
+        """Bucketed from the pre-parsed timestamps of the index; no entry file is read unless a search scans content."""
+        filters = filters or EntryFilter()
+        with self._lock:
+            self._refresh()
+            ids = self._index_matches(filters)
+            if ids is None:
+                return super().histogram(interval, filters, group_by)
+            return count_buckets(
+                ((self._timeline.timestamp(eid), self._index[eid][group_by.value] if group_by else None) for eid in ids),
+                interval
+            )
+
+    def _load_page(self, candidates: List[str], filters: EntryFilter) -> List[Entry]:
+        start = filters.offset
+        end = filters.offset + filters.limit
+        paginated_ids = candidates[start:end]
+
+        found = self._get_many(paginated_ids)
+        return [found[eid] for eid in paginated_ids if eid in found]
 
     def update(self, entry_id: str, updates: EntryUpdate) -> Optional[Entry]:
-        entry = self.get(entry_id)
-        if not entry:
-            return None
-        
-        # Apply updates
-        updated = False
-        if updates.content is not None:
-            entry.content = updates.content
-            updated = True
-        if updates.type is not None:
-            entry.type = updates.type
-            updated = True
-        if updates.status is not None:
-            entry.status = updates.status
-            updated = True
-        if updates.tags is not None:
-            entry.tags = updates.tags
-            updated = True
-        if updates.metadata is not None:
-            entry.metadata.update(updates.metadata)
-            updated = True
-        if updates.context_items is not None:
-            entry.context_items = updates.context_items
-            updated = True
-        if updates.related_entries is not None:
-            entry.related_entries = updates.related_entries
-            updated = True
+        with self._locked():
+            entry = self._get(entry_id)
+            if not entry:
+                return None
             
-        if updated:
-            entry.updated_at = datetime.now(timezone.utc) # Should use utc now
-            # re-save
-            try:
-                path = self._get_entry_path(entry_id)
-                with open(path, 'w', encoding='utf-8') as f:
-                    f.write(entry.model_dump_json(indent=2))
+            updated = apply_update(entry, updates)
                 
-                # Update index
-                self._index[entry.id]['type'] = entry.type.value
-                self._index[entry.id]['status'] = entry.status.value
-                self._index[entry.id]['tags'] = entry.tags
-                self._save_index()
+            if updated:
+                entry.updated_at = datetime.now(timezone.utc) # Should use utc now
+                # re-save
+                try:
+                    self._rewrite_entry(entry)
+                    
+                    # Update index
+                    self._set_meta(entry.id, dict(
+                        self._index[entry.id],
+                        type=entry.type.value,
+                        status=entry.status.value,
+                        tags=entry.tags,
+                        related=entry.related_entries
+                    ))
+                    self._commit_index(put_record(entry.id, self._index[entry.id]))
+                    if updates.content is not None or updates.context_items is not None:
+                        self._index_search(entry)
+                except Exception as e:
+                    raise StorageError(f"Failed to update entry: {e}")
+                    
+            return entry
+
+    def _rewrite_entry(self, entry: Entry):
+        """Replace an existing entry file, moving blob references to the new content."""
+        path = self._get_entry_path(entry.id)
+        old_refs = self._file_refs(path)
+        self._write_entry_file(path, entry)
+        self._release_blobs(old_refs)
+        self._cache_store(entry, path)
+
+    def _mutate(self, entry_id: str, change: Callable[[Entry], bool], reindex: bool = False,
+                relink: bool = False) -> Optional[bool]:
+        """Apply `change` to an entry under the store lock and rewrite its file if it returns True.
+
+        Context items are not in the index; `relink` updates its related ids.
+        Returns None if the entry does not exist, otherwise what `change` returned.
+        """
+        with self._locked():
+            entry = self._get(entry_id)
+            if entry is None:
+                return None
+            if not change(entry):
+                return False
+            try:
+                entry.updated_at = datetime.now(timezone.utc)
+                self._rewrite_entry(entry)
+                if relink:
+                    self._set_meta(entry.id, dict(self._index[entry.id], related=entry.related_entries))
+                    self._commit_index(put_record(entry.id, self._index[entry.id]))
+                if reindex:
+                    self._index_search(entry)
+                return True
             except Exception as e:
                 raise StorageError(f"Failed to update entry: {e}")
-                
-        return entry
 
-    def delete(self, entry_id: str) -> bool:
-        path = self._get_entry_path(entry_id)
-        if not path or not path.exists():
-            return False
-        
+    def add_context(self, entry_id: str, item: ContextItem) -> bool:
+        def change(entry):
+            entry.context_items.append(item)
+            return True
+        return self._mutate(entry_id, change, reindex=self._search is not None and self._search.include_context) is not None
+
+    def remove_context(self, entry_id: str, context_id: str) -> bool:
+        def change(entry):
+            remaining = [c for c in entry.context_items if c.id != context_id]
+            removed = len(remaining) < len(entry.context_items)
+            entry.context_items = remaining
+            return removed
+        return bool(self._mutate(entry_id, change, reindex=self._search is not None and self._search.include_context))
+
+    def add_relation(self, entry_id: str, related_id: str) -> bool:
+        def change(entry):
+            if related_id in entry.related_entries:
+                return False
+            entry.related_entries.append(related_id)
+            return True
+        return self._mutate(entry_id, change, relink=True) is not None
+
+    def remove_relation(self, entry_id: str, related_id: str) -> bool:
+        def change(entry):
+            if related_id not in entry.related_entries:
+                return False
+            entry.related_entries = [r for r in entry.related_entries if r != related_id]
+            return True
+        return self._mutate(entry_id, change, relink=True) is not None
+
+    def neighbors(self, entry_ids: Iterable[str]) -> Dict[str, Set[str]]:
+        """Answered from the index: an entry's own related ids plus the entries that list it."""
+        with self._lock:
+            self._refresh()
+            result = {}
+            for eid in entry_ids:
+                meta = self._index.get(eid)
+                if meta is not None:
+                    adjacent = set(meta.get('related', [])) | self._by_related.get(eid)
+                    result[eid] = {r for r in adjacent if r != eid and r in self._index}
+            return result
+
+    def relation_edges(self) -> Iterator[Tuple[str, str]]:
+        with self._lock:
+            self._refresh()
+            return iter([
+                (eid, rid)
+                for eid, meta in self._index.items()
+                for rid in meta.get('related', [])
+                if rid != eid and rid in self._index
+            ])
+
+    def migrate_layout(self, layout: str) -> int:
+        """Move every entry file to `layout` and rewrite the index. Offline only.
+
+        Safe to re-run after an interruption. Returns the number of files moved.
+        """
+        if layout not in LAYOUTS:
+            raise ValueError(f"Unknown layout {layout!r}, expected one of {LAYOUTS}")
         try:
-            path.unlink()
-            if entry_id in self._index:
-                del self._index[entry_id]
+            with self._locked():
+                moved = 0
+                for path in list(self.entries_path.rglob("*.json")):
+                    entry = self._read_entry_file(path)
+                    target = self._layout_path(entry, layout)
+                    if target != path:
+                        target.parent.mkdir(parents=True, exist_ok=True)
+                        os.replace(path, target)
+                        moved += 1
+                    meta = self._index.get(entry.id)
+                    if meta is not None:
+                        meta['path'] = str(target.relative_to(self.data_path))
+
+                # Drop folders emptied by the move, deepest first
+                for folder in sorted(self.entries_path.rglob("*"), key=lambda p: len(p.parts), reverse=True):
+                    if folder.is_dir() and not any(folder.iterdir()):
+                        folder.rmdir()
+
                 self._save_index()
-            return True
+                self.layout = layout
+                self._update_store_info(layout=layout)
+                if self._cache is not None:
+                    self._cache.clear()
+                return moved
         except Exception as e:
-            raise StorageError(f"Failed to delete entry: {e}")
+            raise StorageError(f"Failed to migrate layout: {e}")
+
+    def delete(self, entry_id: str) -> bool:
+        with self._locked():
+            path = self._get_entry_path(entry_id)
+            if not path or not path.exists():
+                return False
+            
+            try:
+                old_refs = self._file_refs(path)
+                path.unlink()
+                self._release_blobs(old_refs)
+                if self._cache is not None:
+                    self._cache.invalidate(entry_id)
+                if entry_id in self._index:
+                    self._drop_meta(entry_id)
+                    self._commit_index(delete_record(entry_id))
+                self._unindex_search(entry_id)
+                return True
+            except Exception as e:
+                raise StorageError(f"Failed to delete entry: {e}")
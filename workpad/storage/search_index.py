@@ -0,0 +1,133 @@
+import re
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from ..models import Entry
+from .journal import IndexJournal, put_record, delete_record
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> Set[str]:
+    """Split text into lowercase word tokens."""
+    return {t.casefold() for t in TOKEN_RE.findall(text)}
+
+
+class SearchIndex:
+    """Token-level inverted index over entry content.
+
+    The persisted form maps entry id -> token list (search_index.json plus
+    search_index.log); postings (token -> entry ids) are derived in memory.
+    A query matches entries that contain, for every query word, a token
+    starting with that word.
+    """
+
+    def __init__(self, data_path: Path, include_context: bool = False, lock=None):
+        self.snapshot_path = Path(data_path) / "search_index.json"
+        self.include_context = include_context
+        self._journal = IndexJournal(self.snapshot_path, Path(data_path) / "search_index.log", lock=lock)
+        self._tokens: Dict[str, List[str]] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        self._vocab: Optional[List[str]] = None  # Sorted tokens, rebuilt lazily
+
+    @property
+    def pending(self) -> int:
+        return self._journal.pending
+
+    def exists(self) -> bool:
+        return self.snapshot_path.exists()
+
+    def load(self) -> None:
+        self._set_all(self._journal.load())
+
+    def sync(self) -> None:
+        """Apply changes other processes appended to the index log."""
+        records = self._journal.changes()
+        if records is None:
+            self.load()
+            return
+        for record in records:
+            if record['op'] == 'put':
+                self._put(record['id'], record['meta'])
+            else:
+                self._drop(record['id'])
+
+    def _set_all(self, tokens: Dict[str, List[str]]) -> None:
+        self._tokens = {}
+        self._postings = {}
+        self._vocab = None
+        for entry_id, toks in tokens.items():
+            self._put(entry_id, toks)
+
+    def _entry_tokens(self, entry: Entry) -> List[str]:
+        tokens = tokenize(entry.content)
+        if self.include_context:
+            for item in entry.context_items:
+                tokens |= tokenize(item.content)
+        return sorted(tokens)
+
+    def _put(self, entry_id: str, tokens: List[str]) -> None:
+        self._drop(entry_id)
+        self._tokens[entry_id] = tokens
+        for tok in tokens:
+            if tok not in self._postings:
+                self._postings[tok] = set()
+                self._vocab = None
+            self._postings[tok].add(entry_id)
+
+    def _drop(self, entry_id: str) -> None:
+        for tok in self._tokens.pop(entry_id, ()):
+            ids = self._postings.get(tok)
+            if ids is not None:
+                ids.discard(entry_id)
+                if not ids:
+                    del self._postings[tok]
+                    self._vocab = None
+
+    def add(self, entry: Entry) -> None:
+        self.add_many([entry])
+
+    def add_many(self, entries: Iterable[Entry]) -> None:
+        records = []
+        for entry in entries:
+            tokens = self._entry_tokens(entry)
+            self._put(entry.id, tokens)
+            records.append(put_record(entry.id, tokens))
+        self._journal.append(records)
+
+    def remove(self, entry_id: str) -> None:
+        if entry_id in self._tokens:
+            self._drop(entry_id)
+            self._journal.append([delete_record(entry_id)])
+
+    def rebuild(self, entries: Iterable[Entry]) -> None:
+        self._set_all({e.id: self._entry_tokens(e) for e in entries})
+        self.checkpoint()
+
+    def checkpoint(self) -> None:
+        self._journal.checkpoint(self._tokens)
+
+    def _prefix_matches(self, prefix: str) -> Set[str]:
+        if self._vocab is None:
+            self._vocab = sorted(self._postings)
+        matched: Set[str] = set()
+        i = bisect_left(self._vocab, prefix)
+        while i < len(self._vocab) and self._vocab[i].startswith(prefix):
+            matched |= self._postings[self._vocab[i]]
+            i += 1
+        return matched
+
+    def search(self, query: str) -> Optional[Set[str]]:
+        """Return ids matching every word of the query, or None if it has no words."""
+        words = tokenize(query)
+        if not words:
+            return None
+        result: Optional[Set[str]] = None
+        # Narrowest words first so the intersection shrinks quickly
+        for word in sorted(words, key=len, reverse=True):
+            ids = self._prefix_matches(word)
+            result = ids if result is None else result & ids
+            if not result:
+                return set()
+        return result
@@ -0,0 +1,376 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, List, Optional
+from datetime import datetime, timezone
+
+from ..models import Entry, EntryFilter, EntrySummary, EntryUpdate
+from ..enums import TagsMode
+from ..errors import StorageError
+from .base import StorageInterface, apply_update
+
+class SegmentStorage(StorageInterface):
+    """Log-structured storage: entries are appended to large segment files.
+
+    Layout:
+        segments/00000001.seg   one JSON record per line (put or del)
+        segments/00000001.hint  offset index of a sealed segment
+
+    An in-memory index maps each live ID to (segment, offset, length) plus
+    the metadata used for filtering. It is rebuilt on initialize() from the
+    hint files of sealed segments and by scanning the active one. Updates and
+    deletes append new records; compact() rewrites the live records, newest
+    first, into fresh segments and drops the old ones.
+    """
+
+    def __init__(self, data_path: str, segment_size: int = 64 * 1024 * 1024,
+                 compact_ratio: float = 0.5, compact_min_bytes: int = 16 * 1024 * 1024):
+        """
+        segment_size:
+            Roll over to a new segment once the active one reaches this size.
+        compact_ratio / compact_min_bytes:
+            Compact automatically after a write once dead records make up more
+            than `compact_ratio` of all segment bytes and at least
+            `compact_min_bytes`.
+        """
+        self.data_path = Path(data_path)
+        self.segments_path = self.data_path / "segments"
+        self.segment_size = segment_size
+        self.compact_ratio = compact_ratio
+        self.compact_min_bytes = compact_min_bytes
+        self._index: Dict[str, dict] = {}
+        self._active: Optional[int] = None
+        self._writer: Optional[BinaryIO] = None
+        self._hint_rows: List[list] = []  # Offset index of the active segment
+        self._readers: Dict[int, BinaryIO] = {}
+        self._total_bytes = 0
+        self._dead_bytes = 0
+        self._lock = threading.RLock()
+
+    # --- Segment files ---
+
+    def _segment_file(self, seg: int) -> Path:
+        return self.segments_path / f"{seg:08d}.seg"
+
+    def _hint_file(self, seg: int) -> Path:
+        return self.segments_path / f"{seg:08d}.hint"
+
+    def _segment_numbers(self) -> List[int]:
+        return sorted(int(p.stem) for p in self.segments_path.glob("*.seg"))
+
+    def _reader(self, seg: int) -> BinaryIO:
+        f = self._readers.get(seg)
+        if f is None:
+            f = open(self._segment_file(seg), 'rb')
+            self._readers[seg] = f
+        return f
+
+    def _close_files(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        for f in self._readers.values():
+            f.close()
+        self._readers = {}
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_files()
+
+    # --- Loading ---
+
+    def initialize(self) -> None:
+        with self._lock:
+            try:
+                self._close_files()
+                self.segments_path.mkdir(parents=True, exist_ok=True)
+                self._index = {}
+                self._total_bytes = 0
+                self._dead_bytes = 0
+
+                segments = self._segment_numbers() or [1]
+                self._segment_file(segments[-1]).touch()
+                for seg in segments:
+                    if seg == segments[-1]:
+                        self._hint_rows = self._scan_segment(seg)
+                    elif self._hint_file(seg).exists():
+                        self._load_hint(seg)
+                    else:
+                        # Sealed before its hint was written
+                        self._write_hint(seg, self._scan_segment(seg))
+                    self._total_bytes += self._segment_file(seg).stat().st_size
+
+                self._open_active(segments[-1])
+            except Exception as e:
+                raise StorageError(f"Failed to initialize segment storage: {e}")
+
+    def _apply(self, entry_id: str, loc: Optional[dict], record_len: int):
+        old = self._index.pop(entry_id, None)
+        if old is not None:
+            self._dead_bytes += old['length']
+        if loc is None:
+            self._dead_bytes += record_len  # The tombstone itself
+        else:
+            self._index[entry_id] = loc
+
+    def _load_hint(self, seg: int):
+        with open(self._hint_file(seg), 'r', encoding='utf-8') as f:
+            for entry_id, offset, length, meta in json.load(f):
+                loc = None if meta is None else dict(meta, seg=seg, offset=offset, length=length)
+                self._apply(entry_id, loc, length)
+
+    def _scan_segment(self, seg: int) -> List[list]:
+        """Replay a segment without a hint file; returns its hint rows."""
+        path = self._segment_file(seg)
+        rows = []
+        offset = 0
+        with open(path, 'rb') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # Torn write from a crash
+                if record['op'] == 'put':
+                    entry = Entry.model_validate(record['entry'])
+                    rows.append([entry.id, offset, len(line), self._meta(entry)])
+                else:
+                    rows.append([record['id'], offset, len(line), None])
+                offset += len(line)
+        if offset < path.stat().st_size:
+            with open(path, 'r+b') as f:
+                f.truncate(offset)
+
+        for entry_id, row_offset, length, meta in rows:
+            loc = None if meta is None else dict(meta, seg=seg, offset=row_offset, length=length)
+            self._apply(entry_id, loc, length)
+        return rows
+
+    def _write_hint(self, seg: int, rows: List[list]):
+        tmp = self._hint_file(seg).with_suffix('.hint.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(rows, f)
+        os.replace(tmp, self._hint_file(seg))
+
+    def _open_active(self, seg: int):
+        self._active = seg
+        self._writer = open(self._segment_file(seg), 'ab')
+        if self._writer.tell() == 0:
+            self._hint_rows = []
+
+    # --- Records ---
+
+    @staticmethod
+    def _meta(entry: Entry) -> dict:
+        return {
+            "timestamp": entry.timestamp.isoformat(),
+            "type": entry.type.value,
+            "status": entry.status.value,
+            "tags": entry.tags,
+        }
+
+    def _append(self, entry_id: str, line: bytes, meta: Optional[dict]):
+        if self._writer.tell() >= self.segment_size:
+            self._writer.close()
+            self._write_hint(self._active, self._hint_rows)
+            self._open_active(self._active + 1)
+        offset = self._writer.tell()
+        self._writer.write(line)
+        self._writer.flush()
+        self._total_bytes += len(line)
+        self._hint_rows.append([entry_id, offset, len(line), meta])
+
+        loc = None if meta is None else dict(meta, seg=self._active, offset=offset, length=len(line))
+        self._apply(entry_id, loc, len(line))
+
+    def _append_put(self, entry: Entry):
+        line = b'{"op":"put","entry":' + entry.model_dump_json().encode('utf-8') + b'}\n'
+        self._append(entry.id, line, self._meta(entry))
+
+    def _read_runs(self, locs: List[dict]) -> Dict[str, Entry]:
+        """Read records, coalescing neighbours in the same segment into one read."""
+        entries: Dict[str, Entry] = {}
+        ordered = sorted(locs, key=lambda m: (m['seg'], m['offset']))
+        i = 0
+        while i < len(ordered):
+            start = ordered[i]
+            end = i + 1
+            stop = start['offset'] + start['length']
+            while (end < len(ordered) and ordered[end]['seg'] == start['seg']
+                   and ordered[end]['offset'] == stop):
+                stop += ordered[end]['length']
+                end += 1
+            f = self._reader(start['seg'])
+            f.seek(start['offset'])
+            for line in f.read(stop - start['offset']).splitlines():
+                entry = Entry.model_validate(json.loads(line)['entry'])
+                entries[entry.id] = entry
+            i = end
+        return entries
+
+    def _maybe_compact(self):
+        if (self._dead_bytes >= self.compact_min_bytes
+                and self._dead_bytes > self.compact_ratio * self._total_bytes):
+            self.compact()
+
+    # --- StorageInterface ---
+
+    def create(self, entry: Entry) -> Entry:
+        with self._lock:
+            try:
+                self._append_put(entry)
+                return entry
+            except Exception as e:
+                raise StorageError(f"Failed to create entry: {e}")
+
+    def get(self, entry_id: str) -> Optional[Entry]:
+        with self._lock:
+            loc = self._index.get(entry_id)
+            if loc is None:
+                return None
+            try:
+                return self._read_runs([loc]).get(entry_id)
+            except Exception as e:
+                raise StorageError(f"Failed to read entry {entry_id}: {e}")
+
+    def get_many(self, entry_ids: Iterable[str]) -> List[Entry]:
+        """Records stored next to each other are read together (see _read_runs)."""
+        ids = list(dict.fromkeys(entry_ids))
+        with self._lock:
+            try:
+                loaded = self._read_runs([self._index[eid] for eid in ids if eid in self._index])
+            except Exception as e:
+                raise StorageError(f"Failed to read entries: {e}")
+        return [loaded[eid] for eid in ids if eid in loaded]
+
+    def _candidates(self, filters: EntryFilter) -> List[str]:
+        """Ids matching the index-level filters, newest first."""
+        after = filters.after
+        if after is not None:
+            after = (after[0].astimezone(timezone.utc) if after[0].tzinfo else after[0].replace(tzinfo=timezone.utc), after[1])
+        candidates = []
+        for eid, meta in self._index.items():
+            if filters.type and meta['type'] != filters.type.value:
+                continue
+            if filters.status and meta['status'] != filters.status.value:
+                continue
+            if filters.tags:
+                match = all if filters.tags_mode == TagsMode.all else any
+                if not match(tag in meta['tags'] for tag in filters.tags):
+                    continue
+            dt = datetime.fromisoformat(meta['timestamp'])
+            if filters.from_date and dt < filters.from_date:
+                continue
+            if filters.to_date and dt > filters.to_date:
+                continue
+            if after is not None and (dt, eid) >= after:
+                continue
+            candidates.append(eid)
+        candidates.sort(key=lambda x: (self._index[x]['timestamp'], x), reverse=True)
+        return candidates
+
+    def list(self, filters: EntryFilter) -> List[Entry]:
+        with self._lock:
+            try:
+                candidates = self._candidates(filters)
+
+                start = filters.offset
+                end = filters.offset + filters.limit
+                if not filters.search:
+                    page = candidates[start:end]
+                    loaded = self._read_runs([self._index[eid] for eid in page])
+                    return [loaded[eid] for eid in page]
+
+                # Search needs the content: read candidates in batches until the page is full
+                needle = filters.search.lower()
+                matched = []
+                batch = filters.limit
+                for i in range(0, len(candidates), batch):
+                    chunk = candidates[i:i + batch]
+                    loaded = self._read_runs([self._index[eid] for eid in chunk])
+                    matched.extend(loaded[eid] for eid in chunk if needle in loaded[eid].content.lower())
+                    if len(matched) >= end:
+                        break
+                return matched[start:end]
+            except Exception as e:
+                raise StorageError(f"Failed to list entries: {e}")
+
+    def list_summaries(self, filters: EntryFilter) -> List[EntrySummary]:
+        if filters.search:
+            return super().list_summaries(filters)
+        with self._lock:
+            try:
+                page = self._candidates(filters)[filters.offset:filters.offset + filters.limit]
+                return [
+                    EntrySummary(
+                        id=eid,
+                        timestamp=self._index[eid]['timestamp'],
+                        type=self._index[eid]['type'],
+                        status=self._index[eid]['status'],
+                        tags=self._index[eid]['tags']
+                    )
+                    for eid in page
+                ]
+            except Exception as e:
+                raise StorageError(f"Failed to list entries: {e}")
+
+    def update(self, entry_id: str, updates: EntryUpdate) -> Optional[Entry]:
+        with self._lock:
+            entry = self.get(entry_id)
+            if not entry:
+                return None
+            if apply_update(entry, updates):
+                entry.updated_at = datetime.now(timezone.utc)
+                try:
+                    self._append_put(entry)
+                    self._maybe_compact()
+                except Exception as e:
+                    raise StorageError(f"Failed to update entry: {e}")
+            return entry
+
+    def delete(self, entry_id: str) -> bool:
+        with self._lock:
+            if entry_id not in self._index:
+                return False
+            try:
+                line = json.dumps({"op": "del", "id": entry_id}).encode('utf-8') + b'\n'
+                self._append(entry_id, line, None)
+                self._maybe_compact()
+                return True
+            except Exception as e:
+                raise StorageError(f"Failed to delete entry: {e}")
+
+    def compact(self) -> None:
+        """Rewrite live records into new segments and delete the old ones.
+
+        Records are written newest first, so a page of list() results is
+        mostly one contiguous read. If interrupted, the old segments are
+        still present and simply replayed before the new ones.
+        """
+        with self._lock:
+            try:
+                old_segments = self._segment_numbers()
+                old_index = self._index
+                ordered = sorted(old_index, key=lambda x: old_index[x]['timestamp'], reverse=True)
+
+                self._writer.close()
+                self._open_active(self._active + 1)
+                self._index = {}
+                self._total_bytes = 0
+                self._dead_bytes = 0
+
+                batch = 1000
+                for i in range(0, len(ordered), batch):
+                    chunk = ordered[i:i + batch]
+                    loaded = self._read_runs([old_index[eid] for eid in chunk])
+                    for eid in chunk:
+                        self._append_put(loaded[eid])
+
+                for seg in old_segments:
+                    reader = self._readers.pop(seg, None)
+                    if reader is not None:
+                        reader.close()
+                    self._segment_file(seg).unlink()
+                    self._hint_file(seg).unlink(missing_ok=True)
+            except Exception as e:
+                raise StorageError(f"Failed to compact segments: {e}")
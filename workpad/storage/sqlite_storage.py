@@ -1,21 +1,42 @@
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Iterable, Iterator, Set, Tuple
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime, timezone
+import hashlib
 import json
+import re
 
 from sqlmodel import SQLModel, Field, Session, create_engine, select, Relationship
-from sqlalchemy import JSON 
+from sqlalchemy import JSON, Index, bindparam, column, delete, event, func, insert, inspect, table, text, tuple_, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import selectinload
 
 from ..models import (
-    Entry, EntryCreate, EntryUpdate, EntryFilter, 
-    ContextItem, EntryType, EntryStatus, ContextType
+    Entry, EntryUpdate, EntryFilter, EntryStats, EntrySummary, HistogramBucket,
+    ContextItem, EntryType, EntryStatus, ContextType, SortBy, TagsMode
 )
+from ..enums import Interval, HistogramGroup
 from ..storage.base import StorageInterface
-from ..errors import StorageError, NotFoundError
+from ..errors import StorageError
+from .compression import check_codec, compress, decompress
+from .blob_store import content_key
+from .search_index import tokenize
+from .indexes import as_utc
 
 # --- DB Models ---
 
 class EntryTable(SQLModel, table=True):
     __tablename__ = "entries"
+    # Every list() query orders by timestamp; these let filtered queries
+    # read rows in that order instead of sorting a full scan
+    # The id column breaks timestamp ties, so cursor pagination is an index range too
+    __table_args__ = (
+        Index("ix_entries_timestamp_id", "timestamp", "id"),
+        Index("ix_entries_type_timestamp_id", "type", "timestamp", "id"),
+        Index("ix_entries_status_timestamp_id", "status", "timestamp", "id"),
+        Index("ix_entries_status_type_timestamp_id", "status", "type", "timestamp", "id"),
+    )
 
     id: str = Field(primary_key=True)
     type: str # Store enum as string
@@ -35,19 +56,251 @@ class ContextItemTable(SQLModel, table=True):
     __tablename__ = "context_items"
 
     id: str = Field(primary_key=True)
-    entry_id: str = Field(foreign_key="entries.id")
+    entry_id: str = Field(foreign_key="entries.id", index=True)
     type: str
     source: str
     content: str
+    content_compressed: Optional[bytes] = None # Set instead of content when compressed
+    blob_hash: Optional[str] = Field(default=None, foreign_key="context_blobs.hash") # Set instead of content when deduplicated
     metadata_json: str = Field(default="{}")
     created_at: datetime
 
     entry: EntryTable = Relationship(back_populates="context_items")
+    blob: Optional["ContextBlobTable"] = Relationship()
+
+class EntryTagTable(SQLModel, table=True):
+    """One row per (entry, tag), so tag filters are index lookups. tags_json stays the source for reads."""
+    __tablename__ = "entry_tags"
+    __table_args__ = (Index("ix_entry_tags_tag", "tag", "entry_id"),)
+
+    entry_id: str = Field(primary_key=True, foreign_key="entries.id")
+    tag: str = Field(primary_key=True)
+
+class EntryRelationTable(SQLModel, table=True):
+    """One row per (entry, related id), so the relation graph can be walked in SQL. related_entries_json stays the source for reads."""
+    __tablename__ = "entry_relations"
+    __table_args__ = (Index("ix_entry_relations_related", "related_id", "entry_id"),)
+
+    entry_id: str = Field(primary_key=True, foreign_key="entries.id")
+    related_id: str = Field(primary_key=True) # May name an entry that does not exist (yet)
+
+class ContextBlobTable(SQLModel, table=True):
+    __tablename__ = "context_blobs"
+
+    hash: str = Field(primary_key=True) # SHA-256 of the content
+    content: str
+    content_compressed: Optional[bytes] = None
+    refcount: int = 0
+
+# --- Connection profiles ---
+# PRAGMAs applied to every new connection. WAL lets readers run alongside
+# a writer; busy_timeout makes a blocked writer wait instead of failing
+# with "database is locked". The presets trade durability for speed:
+#   safe      every commit is synced to disk
+#   balanced  commits survive a crash of the process, but the last few may
+#             be lost on power failure (synchronous=NORMAL in WAL mode)
+#   fast      no syncs at all; for rebuildable data and bulk loads
+#   none      SQLite's own defaults
+
+SQLITE_PROFILES: Dict[str, Dict[str, object]] = {
+    "safe": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "busy_timeout": 5000,
+    },
+    "balanced": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "cache_size": -64 * 1024,  # KiB
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+    },
+    "fast": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "busy_timeout": 5000,
+        "cache_size": -256 * 1024,
+        "mmap_size": 1024 * 1024 * 1024,
+        "temp_store": "MEMORY",
+    },
+    "none": {},
+}
+
+_PRAGMAS = {
+    "journal_mode", "synchronous", "busy_timeout", "cache_size", "mmap_size",
+    "temp_store", "foreign_keys", "wal_autocheckpoint",
+}
+_PRAGMA_VALUE = re.compile(r"^-?\w+$")
+
+def connection_pragmas(profile: str, overrides: Optional[Dict[str, object]] = None) -> Dict[str, object]:
+    """The PRAGMAs of a profile with `overrides` applied, validated."""
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown SQLite profile {profile!r}, expected one of {tuple(SQLITE_PROFILES)}")
+    pragmas = dict(SQLITE_PROFILES[profile], **(overrides or {}))
+    for name, value in pragmas.items():
+        if name not in _PRAGMAS:
+            raise ValueError(f"Unsupported SQLite pragma {name!r}, expected one of {sorted(_PRAGMAS)}")
+        if not _PRAGMA_VALUE.match(str(value)):
+            raise ValueError(f"Invalid value {value!r} for SQLite pragma {name!r}")
+    return pragmas
+
+def parse_pragmas(text: str) -> Dict[str, str]:
+    """Parse "name=value,name=value" (e.g. from an environment variable)."""
+    pragmas = {}
+    for item in text.split(","):
+        if item.strip():
+            name, _, value = item.partition("=")
+            pragmas[name.strip()] = value.strip()
+    return pragmas
+
+# --- Full-text search ---
+# entry_fts is an FTS5 table over entry content (and, with search_context,
+# context item content). create_all() does not know about virtual tables,
+# so initialize() creates it. Each row's rowid is derived from the entry id,
+# which lets writes replace a row by primary key and survives VACUUM.
+
+ENTRY_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS entry_fts USING fts5("
+    "entry_id UNINDEXED, content, context, tokenize = \"unicode61 tokenchars '_'\")"
+)
+
+entry_fts = table("entry_fts", column("entry_id"), column("rank"))
+
+# Loads the context items (and their blobs) of a whole page of entries in
+# one IN-query per table, instead of one lazy load per entry
+LOAD_CONTEXT = selectinload(EntryTable.context_items).selectinload(ContextItemTable.blob)
+
+# Ids per get_many() query, well below SQLite's bound-parameter limit
+GET_MANY_CHUNK = 500
+
+def fts_rowid(entry_id: str) -> int:
+    return int.from_bytes(hashlib.sha1(entry_id.encode('utf-8')).digest()[:8], 'big', signed=True)
+
+def fts_query(search: str) -> Optional[str]:
+    """An FTS5 query matching entries with a word starting with each query word."""
+    words = sorted(tokenize(search))
+    if not words:
+        return None
+    return " AND ".join(f'"{w}"*' for w in words)
+
+# --- Schema migrations ---
+# Databases created by older versions are upgraded step by step on
+# initialize(); PRAGMA user_version records how many steps have run.
+# New databases get the full schema from create_all() and start at the end.
+
+def _add_content_compressed(conn):
+    conn.execute(text("ALTER TABLE context_items ADD COLUMN content_compressed BLOB"))
+
+def _add_blob_hash(conn):
+    # context_blobs itself is created by create_all()
+    conn.execute(text("ALTER TABLE context_items ADD COLUMN blob_hash VARCHAR"))
+
+def _populate_entry_fts(conn):
+    # Entry content only; rebuild_search_index() adds context items
+    rows = conn.execute(text("SELECT id, content FROM entries")).all()
+    if rows:
+        conn.execute(
+            text("INSERT INTO entry_fts(rowid, entry_id, content, context) VALUES (:rowid, :entry_id, :content, '')"),
+            [dict(rowid=fts_rowid(r.id), entry_id=r.id, content=r.content) for r in rows]
+        )
+
+def _populate_entry_tags(conn):
+    # entry_tags itself is created by create_all()
+    rows = conn.execute(text("SELECT id, tags_json FROM entries")).all()
+    tag_rows = [dict(entry_id=r.id, tag=tag) for r in rows for tag in dict.fromkeys(json.loads(r.tags_json))]
+    if tag_rows:
+        conn.execute(text("INSERT INTO entry_tags(entry_id, tag) VALUES (:entry_id, :tag)"), tag_rows)
+
+def _add_list_indexes(conn):
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_entries_timestamp ON entries (timestamp)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_entries_type_timestamp ON entries (type, timestamp)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_entries_status_timestamp ON entries (status, timestamp)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_entries_status_type_timestamp ON entries (status, type, timestamp)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_context_items_entry_id ON context_items (entry_id)"))
+
+def _add_id_to_list_indexes(conn):
+    for columns in ("timestamp", "type_timestamp", "status_timestamp", "status_type_timestamp"):
+        conn.execute(text(f"DROP INDEX IF EXISTS ix_entries_{columns}"))
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_entries_{columns}_id ON entries ({columns.replace('_', ', ')}, id)"
+        ))
+
+def _populate_entry_relations(conn):
+    # entry_relations itself is created by create_all()
+    conn.execute(text(
+        "INSERT OR IGNORE INTO entry_relations(entry_id, related_id) "
+        "SELECT entries.id, json_each.value FROM entries, json_each(entries.related_entries_json)"
+    ))
+
+MIGRATIONS = [
+    _add_content_compressed,
+    _add_blob_hash,
+    _populate_entry_fts,
+    _populate_entry_tags,
+    _add_list_indexes,
+    _add_id_to_list_indexes,
+    _populate_entry_relations,
+]
+
+# strftime() arguments giving the start of each timestamp's bucket. Weeks
+# start on Monday: the next Sunday (or the day itself), less six days.
+BUCKET_FORMATS: Dict[Interval, Tuple[str, ...]] = {
+    Interval.hour: ("%Y-%m-%d %H:00:00",),
+    Interval.day: ("%Y-%m-%d 00:00:00",),
+    Interval.week: ("%Y-%m-%d 00:00:00", "weekday 0", "-6 days"),
+    Interval.month: ("%Y-%m-01 00:00:00",),
+}
+
+# --- Relation graph ---
+# Breadth-first walk over entry_relations in both directions, one recursive
+# term per direction so each uses an index. Related ids that name no entry
+# are not followed. Rows repeat per depth reached; callers take MIN(depth).
+
+GRAPH_WALK = """
+WITH RECURSIVE walk(id, depth) AS (
+    SELECT id, 0 FROM entries WHERE id = :root
+    UNION
+    SELECT r.related_id, walk.depth + 1 FROM walk
+        JOIN entry_relations r ON r.entry_id = walk.id
+        JOIN entries e ON e.id = r.related_id
+        WHERE walk.depth < :depth
+    UNION
+    SELECT r.entry_id, walk.depth + 1 FROM walk
+        JOIN entry_relations r ON r.related_id = walk.id
+        WHERE walk.depth < :depth
+)
+SELECT id, MIN(depth) AS depth FROM walk GROUP BY id
+"""
 
 # --- Implementation ---
 
 class SQLiteStorage(StorageInterface):
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, compression: Optional[str] = None, compression_min_bytes: int = 4096,
+                 dedup_context: bool = False, dedup_min_bytes: int = 1024, search_context: bool = False,
+                 profile: str = "balanced", pragmas: Optional[Dict[str, object]] = None):
+        """
+        profile / pragmas:
+            Connection profile from SQLITE_PROFILES ("safe", "balanced",
+            "fast" or "none"), applied to every new connection. `pragmas`
+            overrides individual settings, e.g. {"synchronous": "FULL"}.
+        search_context:
+            Also index context item content for `EntryFilter.search`. Run
+            rebuild_search_index() after turning it on for an existing database.
+        compression / compression_min_bytes:
+            "zlib" or "lzma" compresses context item content of at least
+            `compression_min_bytes` bytes. Entry content stays plain text so
+            it remains searchable.
+        dedup_context / dedup_min_bytes:
+            Store context item content of at least `dedup_min_bytes` bytes
+            once in context_blobs, keyed by hash and reference-counted.
+        """
+        self.compression = check_codec(compression)
+        self.compression_min_bytes = compression_min_bytes
+        self.dedup_context = dedup_context
+        self.dedup_min_bytes = dedup_min_bytes
+        self.search_context = search_context
+        self.pragmas = connection_pragmas(profile, pragmas)
         # Allow in-memory for tests or file path
         if db_path == ":memory:":
             self.db_url = "sqlite://" 
@@ -57,21 +310,221 @@ class SQLiteStorage(StorageInterface):
         # We delay engine creation to initialize? No, usually in init.
         # But initialize() method is expected by interface.
         self.engine = None
+        self._write_engine = None
+        # Session of the batch() open in the current thread or task
+        self._batch_session: ContextVar[Optional[Session]] = ContextVar("sqlite_batch_session", default=None)
 
     def initialize(self) -> None:
         try:
             self.engine = create_engine(self.db_url)
+            event.listen(self.engine, "connect", self._apply_pragmas)
+            event.listen(self.engine, "begin", self._begin)
+            self._write_engine = self.engine.execution_options(workpad_write=True)
+            existed = inspect(self.engine).has_table(EntryTable.__tablename__)
             SQLModel.metadata.create_all(self.engine)
+            with self.engine.begin() as conn:
+                conn.execute(text(ENTRY_FTS_DDL))
+            self._migrate(existed)
         except Exception as e:
             raise StorageError(f"Failed to initialize SQLite storage: {e}")
 
+    def close(self) -> None:
+        if self.engine is not None:
+            self.engine.dispose()
+
+    def _apply_pragmas(self, dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in self.pragmas.items():
+                cursor.execute(f"PRAGMA {name} = {value}")
+        finally:
+            cursor.close()
+        # Transactions are begun by _begin, not by the sqlite3 module, which
+        # would otherwise let the first SAVEPOINT of a batch() commit on release
+        dbapi_connection.isolation_level = None
+
+    @staticmethod
+    def _begin(conn):
+        # Writers take the write lock up front (waiting up to busy_timeout):
+        # a deferred transaction that has read could not upgrade once another
+        # writer commits
+        conn.exec_driver_sql("BEGIN IMMEDIATE" if conn.get_execution_options().get("workpad_write") else "BEGIN")
+
+    @contextmanager
+    def _session(self, write: bool = False) -> Iterator[Session]:
+        """The session of the open batch(), or a new one that a `write` commits when the block ends.
+
+        In a batch, each write runs in a savepoint, so a failed one is rolled
+        back without the writes before it.
+        """
+        session = self._batch_session.get()
+        if session is None:
+            with Session(self._write_engine if write else self.engine) as session:
+                yield session
+                if write:
+                    session.commit()
+        elif write:
+            with session.begin_nested():
+                yield session
+            # Some writes are plain UPDATE statements the loaded objects do not see
+            session.expire_all()
+        else:
+            yield session
+
+    @contextmanager
+    def _connection(self):
+        session = self._batch_session.get()
+        if session is None:
+            with self.engine.connect() as conn:
+                yield conn
+        else:
+            yield session.connection()
+
+    @contextmanager
+    def batch(self):
+        """Run every write in the block in one transaction, committed when the block ends.
+
+        Reads in the block see its writes. An exception escaping the block
+        rolls all of them back.
+        """
+        if self._batch_session.get() is not None:
+            yield  # Nested
+            return
+        with Session(self._write_engine) as session:
+            token = self._batch_session.set(session)
+            try:
+                yield
+                try:
+                    session.commit()
+                except Exception as e:
+                    raise StorageError(f"Failed to commit batch: {e}")
+            finally:
+                self._batch_session.reset(token)
+
+    def _migrate(self, existed: bool):
+        with self.engine.begin() as conn:
+            version = conn.execute(text("PRAGMA user_version")).scalar()
+            if existed:
+                for step in MIGRATIONS[version:]:
+                    step(conn)
+            if version != len(MIGRATIONS):
+                conn.execute(text(f"PRAGMA user_version = {len(MIGRATIONS)}"))
+
+    def _pack(self, content: str) -> Tuple[str, Optional[bytes]]:
+        """(content, content_compressed) column values for a payload."""
+        raw = content.encode('utf-8')
+        if self.compression and len(raw) >= self.compression_min_bytes:
+            return "", compress(raw, self.compression)
+        return content, None
+
+    def _dedups(self, c: ContextItem) -> bool:
+        return self.dedup_context and len(c.content.encode('utf-8')) >= self.dedup_min_bytes
+
+    def _context_row(self, entry_id: str, c: ContextItem) -> dict:
+        if self._dedups(c):
+            content, packed, blob_hash = "", None, content_key(c.content)
+        else:
+            (content, packed), blob_hash = self._pack(c.content), None
+        return dict(
+            id=c.id,
+            entry_id=entry_id,
+            type=c.type.value,
+            source=c.source,
+            content=content,
+            content_compressed=packed,
+            blob_hash=blob_hash,
+            metadata_json=json.dumps(c.metadata),
+            created_at=c.created_at
+        )
+
+    def _incref_blobs(self, session: Session, items: Iterable[ContextItem]):
+        """Take a reference on each deduplicated payload, inserting new blobs."""
+        counts = Counter()
+        contents = {}
+        for c in items:
+            if self._dedups(c):
+                key = content_key(c.content)
+                counts[key] += 1
+                contents[key] = c.content
+        for key, n in counts.items():
+            content, packed = self._pack(contents[key])
+            statement = sqlite_insert(ContextBlobTable).values(
+                hash=key, content=content, content_compressed=packed, refcount=n
+            ).on_conflict_do_update(
+                index_elements=["hash"], set_={"refcount": ContextBlobTable.refcount + n}
+            )
+            session.execute(statement)
+
+    def _decref_blobs(self, session: Session, keys: Iterable[str]):
+        """Drop references, deleting blobs nothing points at any more."""
+        counts = Counter(k for k in keys if k)
+        for key, n in counts.items():
+            session.execute(
+                update(ContextBlobTable).where(ContextBlobTable.hash == key)
+                .values(refcount=ContextBlobTable.refcount - n)
+            )
+        if counts:
+            session.execute(
+                delete(ContextBlobTable)
+                .where(ContextBlobTable.hash.in_(list(counts)))
+                .where(ContextBlobTable.refcount <= 0)
+            )
+
+    def _set_tags(self, session: Session, entry_id: str, tags: List[str], replace: bool = True):
+        if replace:
+            session.execute(delete(EntryTagTable).where(EntryTagTable.entry_id == entry_id))
+        if tags:
+            session.execute(insert(EntryTagTable), [dict(entry_id=entry_id, tag=tag) for tag in dict.fromkeys(tags)])
+
+    def _set_relations(self, session: Session, entry_id: str, related: List[str], replace: bool = True):
+        if replace:
+            session.execute(delete(EntryRelationTable).where(EntryRelationTable.entry_id == entry_id))
+        if related:
+            session.execute(
+                insert(EntryRelationTable),
+                [dict(entry_id=entry_id, related_id=r) for r in dict.fromkeys(related)]
+            )
+
+    def _fts_row(self, entry: Entry) -> dict:
+        context = "\n".join(c.content for c in entry.context_items) if self.search_context else ""
+        return dict(rowid=fts_rowid(entry.id), entry_id=entry.id, content=entry.content, context=context)
+
+    def _index_search(self, session: Session, entries: List[Entry]):
+        """Insert or replace the full-text rows of entries."""
+        rows = [self._fts_row(e) for e in entries]
+        if rows:
+            session.execute(text("DELETE FROM entry_fts WHERE rowid = :rowid"), [dict(rowid=r['rowid']) for r in rows])
+            session.execute(
+                text("INSERT INTO entry_fts(rowid, entry_id, content, context) VALUES (:rowid, :entry_id, :content, :context)"),
+                rows
+            )
+
+    def rebuild_search_index(self) -> int:
+        """Rebuild entry_fts from the entries table. Returns the number of entries indexed."""
+        try:
+            with self._session(write=True) as session:
+                session.execute(text("DELETE FROM entry_fts"))
+                count = 0
+                for db_entry in session.exec(select(EntryTable).options(LOAD_CONTEXT)):
+                    self._index_search(session, [self._to_domain(db_entry)])
+                    count += 1
+                return count
+        except Exception as e:
+            raise StorageError(f"Failed to rebuild search index: {e}")
+
+    def _context_content(self, c: ContextItemTable) -> str:
+        source = c.blob if c.blob_hash is not None else c
+        if source.content_compressed is not None:
+            return decompress(source.content_compressed).decode('utf-8')
+        return source.content
+
     def _to_domain(self, db_entry: EntryTable) -> Entry:
         context_items = [
             ContextItem(
                 id=c.id,
                 type=ContextType(c.type),
                 source=c.source,
-                content=c.content,
+                content=self._context_content(c),
                 metadata=json.loads(c.metadata_json),
                 created_at=c.created_at.replace(tzinfo=timezone.utc) if c.created_at.tzinfo is None else c.created_at
             ) for c in db_entry.context_items
@@ -108,71 +561,226 @@ class SQLiteStorage(StorageInterface):
             
             # Context items
             for c in entry.context_items:
-                db_context = ContextItemTable(
-                    id=c.id,
-                    entry_id=entry.id,
-                    type=c.type.value,
-                    source=c.source,
-                    content=c.content,
-                    metadata_json=json.dumps(c.metadata),
-                    created_at=c.created_at
-                )
-                db_entry.context_items.append(db_context)
+                db_entry.context_items.append(ContextItemTable(**self._context_row(entry.id, c)))
 
-            with Session(self.engine) as session:
+            with self._session(write=True) as session:
+                self._incref_blobs(session, entry.context_items)
+                self._index_search(session, [entry])
                 session.add(db_entry)
-                session.commit()
+                session.flush()
+                self._set_tags(session, entry.id, entry.tags, replace=False)
+                self._set_relations(session, entry.id, entry.related_entries, replace=False)
+                session.flush()
                 session.refresh(db_entry)
                 return self._to_domain(db_entry)
         except Exception as e:
             raise StorageError(f"Failed to create entry: {e}")
 
+    def create_many(self, entries: List[Entry]) -> List[Entry]:
+        """Insert all entries and their context items in one transaction."""
+        try:
+            entry_rows = []
+            context_rows = []
+            tag_rows = []
+            relation_rows = []
+            for entry in entries:
+                entry_rows.append(dict(
+                    id=entry.id,
+                    type=entry.type.value,
+                    content=entry.content,
+                    status=entry.status.value,
+                    timestamp=entry.timestamp,
+                    created_at=entry.created_at,
+                    updated_at=entry.updated_at,
+                    tags_json=json.dumps(entry.tags),
+                    metadata_json=json.dumps(entry.metadata),
+                    related_entries_json=json.dumps(entry.related_entries)
+                ))
+                for c in entry.context_items:
+                    context_rows.append(self._context_row(entry.id, c))
+                tag_rows.extend(dict(entry_id=entry.id, tag=tag) for tag in dict.fromkeys(entry.tags))
+                relation_rows.extend(dict(entry_id=entry.id, related_id=r) for r in dict.fromkeys(entry.related_entries))
+
+            with self._session(write=True) as session:
+                self._incref_blobs(session, (c for entry in entries for c in entry.context_items))
+                self._index_search(session, entries)
+                # executemany: one prepared statement per table
+                if entry_rows:
+                    session.execute(insert(EntryTable), entry_rows)
+                if context_rows:
+                    session.execute(insert(ContextItemTable), context_rows)
+                if tag_rows:
+                    session.execute(insert(EntryTagTable), tag_rows)
+                if relation_rows:
+                    session.execute(insert(EntryRelationTable), relation_rows)
+            return entries
+        except Exception as e:
+            raise StorageError(f"Failed to create entries: {e}")
+
     def get(self, entry_id: str) -> Optional[Entry]:
         try:
-            with Session(self.engine) as session:
-                db_entry = session.get(EntryTable, entry_id)
+            with self._session() as session:
+                db_entry = session.get(EntryTable, entry_id, options=[LOAD_CONTEXT])
                 if not db_entry:
                     return None
                 return self._to_domain(db_entry)
         except Exception as e:
             raise StorageError(f"Failed to get entry: {e}")
 
-    def list(self, filters: EntryFilter) -> List[Entry]:
+    def get_many(self, entry_ids: Iterable[str]) -> List[Entry]:
+        """One IN query per GET_MANY_CHUNK ids, context items loaded in bulk."""
+        ids = list(dict.fromkeys(entry_ids))
         try:
-            statement = select(EntryTable)
-            
-            if filters.type:
-                statement = statement.where(EntryTable.type == filters.type.value)
-            if filters.status:
-                statement = statement.where(EntryTable.status == filters.status.value)
-            if filters.from_date:
-                statement = statement.where(EntryTable.timestamp >= filters.from_date)
-            if filters.to_date:
-                statement = statement.where(EntryTable.timestamp <= filters.to_date)
-            if filters.search:
+            found: Dict[str, Entry] = {}
+            with self._session() as session:
+                for i in range(0, len(ids), GET_MANY_CHUNK):
+                    statement = select(EntryTable).where(EntryTable.id.in_(ids[i:i + GET_MANY_CHUNK])).options(LOAD_CONTEXT)
+                    for db_entry in session.exec(statement):
+                        found[db_entry.id] = self._to_domain(db_entry)
+            return [found[eid] for eid in ids if eid in found]
+        except Exception as e:
+            raise StorageError(f"Failed to get entries: {e}")
+
+    def _where(self, statement, filters: EntryFilter):
+        """Apply the filter conditions, without order or pagination, to a select."""
+        if filters.type:
+            statement = statement.where(EntryTable.type == filters.type.value)
+        if filters.status:
+            statement = statement.where(EntryTable.status == filters.status.value)
+        if filters.from_date:
+            statement = statement.where(EntryTable.timestamp >= filters.from_date)
+        if filters.to_date:
+            statement = statement.where(EntryTable.timestamp <= filters.to_date)
+        if filters.search:
+            query = fts_query(filters.search)
+            if query is None:
+                # No words to match (punctuation only): fall back to a substring scan
                 statement = statement.where(EntryTable.content.contains(filters.search))
-                
-            # Tags filter is tricky with JSON string storage in SQLite
-            # Simple mostly-working approach: LIKE '%"tag"%'
-            if filters.tags:
-                for tag in filters.tags:
-                    statement = statement.where(EntryTable.tags_json.contains(f'"{tag}"'))
-
-            # Sort desc
-            statement = statement.order_by(EntryTable.timestamp.desc())
+            else:
+                statement = statement.join(entry_fts, entry_fts.c.entry_id == EntryTable.id).where(
+                    text("entry_fts MATCH :fts_query").bindparams(fts_query=query)
+                )
             
-            # Pagination
-            statement = statement.offset(filters.offset).limit(filters.limit)
+        if filters.tags:
+            tags = list(dict.fromkeys(filters.tags))
+            tagged = select(EntryTagTable.entry_id).where(EntryTagTable.tag.in_(tags))
+            if filters.tags_mode == TagsMode.all and len(tags) > 1:
+                tagged = tagged.group_by(EntryTagTable.entry_id).having(func.count() == len(tags))
+            statement = statement.where(EntryTable.id.in_(tagged))
+        return statement
 
-            with Session(self.engine) as session:
+    def _filter_statement(self, statement, filters: EntryFilter):
+        """Apply the filters, newest-first order and pagination to a select."""
+        statement = self._where(statement, filters)
+        if filters.cursor:
+            timestamp, entry_id = filters.after
+            statement = statement.where(tuple_(EntryTable.timestamp, EntryTable.id) < tuple_(timestamp, entry_id))
+        if filters.sort_by == SortBy.relevance and filters.search and fts_query(filters.search) is not None:
+            statement = statement.order_by(entry_fts.c.rank)
+
+        # Sort desc (after the rank, when sorting by relevance)
+        statement = statement.order_by(EntryTable.timestamp.desc(), EntryTable.id.desc())
+        
+        # Pagination
+        return statement.offset(filters.offset).limit(filters.limit)
+
+    def query_plan(self, filters: EntryFilter) -> List[str]:
+        """The EXPLAIN QUERY PLAN steps of the list() query for `filters`."""
+        compiled = self._filter_statement(select(EntryTable), filters).compile(
+            self.engine, compile_kwargs={"literal_binds": True}
+        )
+        with self._connection() as conn:
+            rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}").all()
+        return [row.detail for row in rows]
+
+    def list(self, filters: EntryFilter) -> List[Entry]:
+        try:
+            statement = self._filter_statement(select(EntryTable), filters).options(LOAD_CONTEXT)
+
+            with self._session() as session:
                 results = session.exec(statement).all()
                 return [self._to_domain(e) for e in results]
         except Exception as e:
             raise StorageError(f"Failed to list entries: {e}")
 
+    def list_summaries(self, filters: EntryFilter) -> List[EntrySummary]:
+        """Selects only the summary columns; context items are never loaded."""
+        try:
+            statement = self._filter_statement(
+                select(EntryTable.id, EntryTable.timestamp, EntryTable.type, EntryTable.status, EntryTable.tags_json),
+                filters
+            )
+            with self._session() as session:
+                return [
+                    EntrySummary(
+                        id=row.id,
+                        timestamp=row.timestamp.replace(tzinfo=timezone.utc) if row.timestamp.tzinfo is None else row.timestamp,
+                        type=row.type,
+                        status=row.status,
+                        tags=json.loads(row.tags_json)
+                    )
+                    for row in session.exec(statement).all()
+                ]
+        except Exception as e:
+            raise StorageError(f"Failed to list entries: {e}")
+
+    def aggregate(self, filters: Optional[EntryFilter] = None) -> EntryStats:
+        """GROUP BY queries over the matching rows, answered from the list indexes."""
+        try:
+            matched = self._where(
+                select(EntryTable.id, EntryTable.type, EntryTable.status, EntryTable.timestamp),
+                filters or EntryFilter()
+            ).subquery()
+            with self._connection() as conn:
+                total, oldest, newest = conn.execute(
+                    select(func.count(), func.min(matched.c.timestamp), func.max(matched.c.timestamp))
+                ).one()
+                by_type = conn.execute(select(matched.c.type, func.count()).group_by(matched.c.type)).all()
+                by_status = conn.execute(select(matched.c.status, func.count()).group_by(matched.c.status)).all()
+                by_tag = conn.execute(
+                    select(EntryTagTable.tag, func.count())
+                    .join(matched, matched.c.id == EntryTagTable.entry_id)
+                    .group_by(EntryTagTable.tag)
+                ).all()
+            return EntryStats(
+                total=total,
+                by_type=dict(by_type),
+                by_status=dict(by_status),
+                by_tag=dict(by_tag),
+                oldest=as_utc(oldest) if oldest else None,
+                newest=as_utc(newest) if newest else None
+            )
+        except Exception as e:
+            raise StorageError(f"Failed to aggregate entries: {e}")
+
+    def histogram(self, interval: Interval, filters: Optional[EntryFilter] = None,
+                  group_by: Optional[HistogramGroup] = None) -> List[HistogramBucket]:
+        """Grouped by strftime() bucket (see BUCKET_FORMATS) in the database."""
+        try:
+            matched = self._where(
+                select(EntryTable.timestamp, EntryTable.type, EntryTable.status), filters or EntryFilter()
+            ).subquery()
+            fmt, *modifiers = BUCKET_FORMATS[interval]
+            bucket = func.strftime(fmt, matched.c.timestamp, *modifiers).label("bucket")
+            columns = [bucket] + ([matched.c[group_by.value]] if group_by else [])
+            statement = select(*columns, func.count()).group_by(*columns).order_by(bucket)
+            buckets: Dict[str, HistogramBucket] = {}
+            with self._connection() as conn:
+                for row in conn.execute(statement):
+                    result = buckets.get(row[0])
+                    if result is None:
+                        start = datetime.fromisoformat(row[0]).replace(tzinfo=timezone.utc)
+                        result = buckets[row[0]] = HistogramBucket(start=start)
+                    result.count += row[-1]
+                    if group_by:
+                        result.groups[row[1]] = row[-1]
+            return list(buckets.values())
+        except Exception as e:
+            raise StorageError(f"Failed to build histogram: {e}")
+
     def update(self, entry_id: str, updates: EntryUpdate) -> Optional[Entry]:
         try:
-            with Session(self.engine) as session:
+            with self._session(write=True) as session:
                 db_entry = session.get(EntryTable, entry_id)
                 if not db_entry:
                     return None
@@ -185,6 +793,7 @@ class SQLiteStorage(StorageInterface):
                     db_entry.status = updates.status.value
                 if updates.tags is not None:
                     db_entry.tags_json = json.dumps(updates.tags)
+                    self._set_tags(session, entry_id, updates.tags)
                 if updates.metadata is not None:
                     # Merge metadata
                     current = json.loads(db_entry.metadata_json)
@@ -192,6 +801,7 @@ class SQLiteStorage(StorageInterface):
                     db_entry.metadata_json = json.dumps(current)
                 if updates.related_entries is not None:
                     db_entry.related_entries_json = json.dumps(updates.related_entries)
+                    self._set_relations(session, entry_id, updates.related_entries)
                 
                 # Context items update (replace all if provided? Or merge?)
                 # Service implementation for remove_context/add_context updates the WHOLE list on entry
@@ -208,37 +818,171 @@ class SQLiteStorage(StorageInterface):
                     # For cascade delete-orphan, removing from list should suffice IF loaded.
                     # But db_entry.context_items might be lazy loaded.
                     # Let's try clearing the list on the object.
+                    old_blobs = [c.blob_hash for c in db_entry.context_items]
                     db_entry.context_items = []
+                    session.flush()
+                    self._decref_blobs(session, old_blobs)
+                    self._incref_blobs(session, updates.context_items)
                     
                     # Create new items
                     for c in updates.context_items:
-                        new_item = ContextItemTable(
-                            id=c.id,
-                            entry_id=entry_id,
-                            type=c.type.value,
-                            source=c.source,
-                            content=c.content,
-                            metadata_json=json.dumps(c.metadata),
-                            created_at=c.created_at
-                        )
-                        db_entry.context_items.append(new_item)
+                        db_entry.context_items.append(ContextItemTable(**self._context_row(entry_id, c)))
 
                 db_entry.updated_at = datetime.now(timezone.utc)
                 session.add(db_entry)
-                session.commit()
+                if updates.content is not None or (self.search_context and updates.context_items is not None):
+                    session.flush()
+                    self._index_search(session, [self._to_domain(db_entry)])
+                session.flush()
                 session.refresh(db_entry)
                 return self._to_domain(db_entry)
         except Exception as e:
             raise StorageError(f"Failed to update entry: {e}")
 
+    # --- Fine-grained mutations: one transaction touching only the affected rows ---
+
+    def _touch(self, session: Session, entry_id: str):
+        session.execute(
+            update(EntryTable).where(EntryTable.id == entry_id).values(updated_at=datetime.now(timezone.utc))
+        )
+
+    def _reindex_context(self, session: Session, entry_id: str):
+        if self.search_context:
+            session.flush()
+            self._index_search(session, [self._to_domain(session.get(EntryTable, entry_id, populate_existing=True))])
+
+    def add_context(self, entry_id: str, item: ContextItem) -> bool:
+        try:
+            with self._session(write=True) as session:
+                if session.get(EntryTable, entry_id) is None:
+                    return False
+                self._incref_blobs(session, [item])
+                session.add(ContextItemTable(**self._context_row(entry_id, item)))
+                self._touch(session, entry_id)
+                self._reindex_context(session, entry_id)
+                return True
+        except Exception as e:
+            raise StorageError(f"Failed to add context item: {e}")
+
+    def remove_context(self, entry_id: str, context_id: str) -> bool:
+        try:
+            with self._session(write=True) as session:
+                db_item = session.get(ContextItemTable, context_id)
+                if db_item is None or db_item.entry_id != entry_id:
+                    return False
+                blob_hash = db_item.blob_hash
+                session.delete(db_item)
+                session.flush()
+                self._decref_blobs(session, [blob_hash])
+                self._touch(session, entry_id)
+                self._reindex_context(session, entry_id)
+                return True
+        except Exception as e:
+            raise StorageError(f"Failed to remove context item: {e}")
+
+    def _update_relations(self, entry_id: str, *statements) -> bool:
+        try:
+            with self._session(write=True) as session:
+                for statement in statements:
+                    session.execute(statement)
+                return session.execute(select(EntryTable.id).where(EntryTable.id == entry_id)).first() is not None
+        except Exception as e:
+            raise StorageError(f"Failed to update relations: {e}")
+
+    def add_relation(self, entry_id: str, related_id: str) -> bool:
+        # A single UPDATE, so concurrent edits to the list cannot be lost
+        return self._update_relations(entry_id, text(
+            "UPDATE entries SET related_entries_json = json_insert(related_entries_json, '$[#]', :related_id), "
+            "updated_at = :now WHERE id = :entry_id AND NOT EXISTS "
+            "(SELECT 1 FROM json_each(entries.related_entries_json) WHERE value = :related_id)"
+        ).bindparams(entry_id=entry_id, related_id=related_id, now=self._now()), text(
+            "INSERT OR IGNORE INTO entry_relations(entry_id, related_id) "
+            "SELECT id, :related_id FROM entries WHERE id = :entry_id"
+        ).bindparams(entry_id=entry_id, related_id=related_id))
+
+    def remove_relation(self, entry_id: str, related_id: str) -> bool:
+        return self._update_relations(entry_id, text(
+            "UPDATE entries SET related_entries_json = "
+            "(SELECT json_group_array(value) FROM json_each(entries.related_entries_json) WHERE value != :related_id), "
+            "updated_at = :now WHERE id = :entry_id AND EXISTS "
+            "(SELECT 1 FROM json_each(entries.related_entries_json) WHERE value = :related_id)"
+        ).bindparams(entry_id=entry_id, related_id=related_id, now=self._now()), delete(EntryRelationTable).where(
+            EntryRelationTable.entry_id == entry_id, EntryRelationTable.related_id == related_id
+        ))
+
+    # --- Relation graph ---
+
+    def neighbors(self, entry_ids: Iterable[str]) -> Dict[str, Set[str]]:
+        ids = list(dict.fromkeys(entry_ids))
+        try:
+            with self._connection() as conn:
+                result = {
+                    eid: set()
+                    for eid in conn.execute(select(EntryTable.id).where(EntryTable.id.in_(ids))).scalars()
+                }
+                rows = conn.execute(text(
+                    "SELECT r.entry_id, r.related_id FROM entry_relations r "
+                    "JOIN entries e ON e.id = r.related_id WHERE r.entry_id IN :ids "
+                    "UNION SELECT related_id, entry_id FROM entry_relations WHERE related_id IN :ids"
+                ).bindparams(bindparam("ids", ids, expanding=True)))
+                for a, b in rows:
+                    if a in result and a != b:
+                        result[a].add(b)
+                return result
+        except Exception as e:
+            raise StorageError(f"Failed to read relations: {e}")
+
+    def relation_edges(self) -> Iterator[Tuple[str, str]]:
+        try:
+            with self._connection() as conn:
+                return iter([tuple(row) for row in conn.execute(text(
+                    "SELECT r.entry_id, r.related_id FROM entry_relations r "
+                    "JOIN entries e ON e.id = r.related_id WHERE r.entry_id != r.related_id"
+                ))])
+        except Exception as e:
+            raise StorageError(f"Failed to read relations: {e}")
+
+    def neighborhood(self, entry_id: str, depth: int) -> Dict[str, int]:
+        """One recursive query, see GRAPH_WALK."""
+        try:
+            with self._connection() as conn:
+                return dict(conn.execute(text(GRAPH_WALK).bindparams(root=entry_id, depth=depth)).all())
+        except Exception as e:
+            raise StorageError(f"Failed to walk relations: {e}")
+
+    def shortest_path(self, source_id: str, target_id: str, max_depth: int) -> Optional[List[str]]:
+        """Distances from the source in one recursive query, then walk back from the target.
+
+        Each step back moves to the smallest-id neighbor one hop closer to the source.
+        """
+        distances = self.neighborhood(source_id, max_depth)
+        if target_id not in distances:
+            return None
+        path = [target_id]
+        while distances[path[-1]] > 0:
+            closer = distances[path[-1]] - 1
+            adjacent = self.neighbors([path[-1]])[path[-1]]
+            path.append(min(r for r in adjacent if distances.get(r) == closer))
+        return path[::-1]
+
+    @staticmethod
+    def _now() -> str:
+        # Same text format SQLAlchemy uses for DateTime columns on SQLite
+        return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")
+
     def delete(self, entry_id: str) -> bool:
         try:
-            with Session(self.engine) as session:
+            with self._session(write=True) as session:
                 db_entry = session.get(EntryTable, entry_id)
                 if not db_entry:
                     return False
+                old_blobs = [c.blob_hash for c in db_entry.context_items]
+                session.execute(delete(EntryTagTable).where(EntryTagTable.entry_id == entry_id))
+                session.execute(delete(EntryRelationTable).where(EntryRelationTable.entry_id == entry_id))
                 session.delete(db_entry)
-                session.commit()
+                session.flush()
+                self._decref_blobs(session, old_blobs)
+                session.execute(text("DELETE FROM entry_fts WHERE rowid = :rowid"), dict(rowid=fts_rowid(entry_id)))
                 return True
         except Exception as e:
             raise StorageError(f"Failed to delete entry: {e}")
@@ -1,5 +1,10 @@
+import base64
+import json
 import uuid
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from typing import Tuple
+
+from .enums import Interval
 
 def generate_uuid() -> str:
     """Generate a UUID4 string."""
@@ -12,3 +17,41 @@ def now_utc() -> datetime:
 def format_iso(dt: datetime) -> str:
     """Format datetime to ISO 8601 string."""
     return dt.isoformat()
+
+def encode_cursor(timestamp: datetime, entry_id: str) -> str:
+    """Opaque cursor for the position just after (timestamp, entry_id) in newest-first order."""
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    raw = json.dumps([timestamp.astimezone(timezone.utc).isoformat(), entry_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Inverse of encode_cursor(). Raises ValueError for a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        timestamp, entry_id = json.loads(raw)
+        return datetime.fromisoformat(timestamp), str(entry_id)
+    except Exception:
+        raise ValueError(f"Invalid cursor {cursor!r}")
+
+def bucket_start(dt: datetime, interval: Interval) -> datetime:
+    """Start of the UTC hour, day, ISO week or month containing dt."""
+    dt = dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+    if interval == Interval.hour:
+        return dt.replace(minute=0, second=0, microsecond=0)
+    day = dt.replace(hour=0, minute=0, second=0, microsecond=0)
+    if interval == Interval.week:
+        return day - timedelta(days=day.weekday())
+    if interval == Interval.month:
+        return day.replace(day=1)
+    return day
+
+def next_bucket(start: datetime, interval: Interval) -> datetime:
+    """Start of the bucket after the one starting at `start`."""
+    if interval == Interval.hour:
+        return start + timedelta(hours=1)
+    if interval == Interval.week:
+        return start + timedelta(weeks=1)
+    if interval == Interval.month:
+        return start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+    return start + timedelta(days=1)